@@ -1,22 +1,78 @@
 # -*- coding: utf-8 -*-
 import sys
 from logging import getLogger
+from types import ModuleType
 
+log = getLogger(__name__)
 
-from .logger import log_file_location, setup_ab_logging
-from .mod import bw2data
-from .application import application
-from .signals import signals
-from .settings import ab_settings, project_settings
-from .info import __version__ as version
-from .layouts.main import MainWindow
-from .plugin import Plugin
-from .controllers import *
+# The application and everything importing Qt are only imported when first
+# used (PEP 562). The worker processes of the parallel calculations (see
+# bwutils.parallel) import this package to find the function they run and
+# must not build the application.
+_APPLICATION_NAMES = {
+    "log_file_location",
+    "setup_ab_logging",
+    "bw2data",
+    "application",
+    "signals",
+    "ab_settings",
+    "project_settings",
+    "version",
+    "MainWindow",
+    "Plugin",
+    "plugin_controller",
+}
+_imported = False
 
-log = getLogger(__name__)
+
+def _import_application() -> None:
+    """Import the application and bind its objects in the order the rest of
+    the Activity Browser expects them.
+
+    The `application` and `signals` objects share their names with the modules
+    defining them, see `_Package`.
+    """
+    global _imported, log_file_location, setup_ab_logging, bw2data
+    global application, signals, ab_settings, project_settings, version
+    global MainWindow, Plugin, plugin_controller
+    if _imported:
+        return
+    _imported = True
+    from .logger import log_file_location, setup_ab_logging
+    from .mod import bw2data
+    from .application import application
+    from .signals import signals
+    from .settings import ab_settings, project_settings
+    from .info import __version__ as version
+    from .layouts.main import MainWindow
+    from .plugin import Plugin
+    from .controllers import plugin_controller
+
+
+class _Package(ModuleType):
+    """The import system binds a submodule on its package when importing it,
+    which would hide the `application` and `signals` objects behind the
+    modules of the same name.
+    """
+
+    def __setattr__(self, name, value):
+        if name in ("application", "signals") and isinstance(value, ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name: str):
+    if name in _APPLICATION_NAMES and not _imported:
+        _import_application()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def load_settings() -> None:
+    _import_application()
     if ab_settings.settings:
         bw2data.projects.switch_dir(ab_settings.current_bw_dir)
         bw2data.projects.set_current(ab_settings.startup_project)
@@ -25,6 +81,7 @@ def load_settings() -> None:
 
 
 def run_activity_browser():
+    _import_application()
     setup_ab_logging()
     log.info(f"Activity Browser version: {version}")
     if log_file_location:
@@ -3,13 +3,33 @@
 bwutils is a collection of methods that build upon brightway2 and are generic enough to provide here so that we avoid
 re-typing the same code in different parts of the Activity Browser.
 """
-from .commontasks import cleanup_deleted_bw_projects as cleanup
-from .metadata import AB_metadata
-from .montecarlo import MonteCarloLCA
-from .multilca import MLCA, Contributions
-from .pedigree import PedigreeMatrix
-from .sensitivity_analysis import GlobalSensitivityAnalysis
-from .superstructure import SuperstructureContributions, SuperstructureMLCA
-from .uncertainty import (CFUncertaintyInterface, ExchangeUncertaintyInterface,
-                          ParameterUncertaintyInterface,
-                          get_uncertainty_interface)
+
+from importlib import import_module
+
+# The names below are only imported when first used (PEP 562), the worker
+# processes of the parallel calculations import the Qt-free bwutils.parallel
+# without the Qt-dependent modules, see activity_browser/__init__.py.
+_LAZY_NAMES = {
+    "cleanup": (".commontasks", "cleanup_deleted_bw_projects"),
+    "AB_metadata": (".metadata", "AB_metadata"),
+    "MonteCarloLCA": (".montecarlo", "MonteCarloLCA"),
+    "MLCA": (".multilca", "MLCA"),
+    "Contributions": (".multilca", "Contributions"),
+    "PedigreeMatrix": (".pedigree", "PedigreeMatrix"),
+    "GlobalSensitivityAnalysis": (".sensitivity_analysis", "GlobalSensitivityAnalysis"),
+    "SuperstructureContributions": (".superstructure", "SuperstructureContributions"),
+    "SuperstructureMLCA": (".superstructure", "SuperstructureMLCA"),
+    "CFUncertaintyInterface": (".uncertainty", "CFUncertaintyInterface"),
+    "ExchangeUncertaintyInterface": (".uncertainty", "ExchangeUncertaintyInterface"),
+    "ParameterUncertaintyInterface": (".uncertainty", "ParameterUncertaintyInterface"),
+    "get_uncertainty_interface": (".uncertainty", "get_uncertainty_interface"),
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _LAZY_NAMES[name]
+    value = getattr(import_module(module, __name__), attribute)
+    globals()[name] = value
+    return value
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from logging import getLogger
+from typing import Iterable
+
+import numpy as np
+
+from activity_browser.mod import bw2data as bd
+from activity_browser.mod.bw2data.backends import ExchangeDataset
+
+log = getLogger(__name__)
+
+
+class AdjacencyIndex(object):
+    """Index of the technosphere exchanges between activities.
+
+    The technosphere (and substitution) exchanges of a database are read once
+    from the `ExchangeDataset` table, without loading the exchange data
+    itself. They are stored as arrays of input and output activity ids, with
+    CSR offsets to slice the exchanges by consuming (output) and by supplying
+    (input) activity. The index of a database is rebuilt when the database
+    has been modified since, and the whole index is reset when the project
+    changes.
+
+    The amounts and units of the exchanges are read in bulk when exchanges
+    are requested, and kept until their database is modified.
+    """
+
+    # Types of exchanges between activities, `Activity.technosphere` includes
+    # substitution while `Activity.upstream` does not.
+    TECHNOSPHERE = ("technosphere", "substitution")
+    # Maximum number of exchange ids in a single query
+    QUERY_CHUNK = 500
+
+    def __init__(self):
+        self._ids = dict()  # {key: activity id}
+        self._keys = []  # activity keys by id
+        self._databases = dict()  # {database: ('modified' timestamp, arrays)}
+        self._data = dict()  # {database: {exchange id: (amount, unit)}}
+
+        bd.projects.current_changed.connect(self.reset)
+
+    def reset(self) -> None:
+        self._ids = dict()
+        self._keys = []
+        self._databases = dict()
+        self._data = dict()
+
+    def _activity_ids(self, keys: Iterable[tuple]) -> np.ndarray:
+        """Return the ids of the activity keys, registering new keys."""
+        ids = []
+        for key in keys:
+            if key not in self._ids:
+                self._ids[key] = len(self._keys)
+                self._keys.append(key)
+            ids.append(self._ids[key])
+        return np.array(ids, dtype=np.int64)
+
+    @staticmethod
+    def _csr(ids: np.ndarray, count: int) -> tuple:
+        """Return the order of the exchanges sorted by activity id (keeping
+        the order of the exchanges of each activity) and the offsets of the
+        exchanges of each activity in that order.
+        """
+        order = np.argsort(ids, kind="stable")
+        indptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ids, minlength=count), out=indptr[1:])
+        return order, indptr
+
+    def _database(self, db_name: str) -> dict:
+        """Return the (re)built index arrays of the database."""
+        modified = bd.databases.get(db_name, {}).get("modified")
+        if db_name in self._databases:
+            built, arrays = self._databases[db_name]
+            if built == modified:
+                return arrays
+
+        log.debug(f"Indexing exchanges of: {db_name}")
+        query = (
+            ExchangeDataset.select(
+                ExchangeDataset.id,
+                ExchangeDataset.input_database,
+                ExchangeDataset.input_code,
+                ExchangeDataset.output_code,
+                ExchangeDataset.type,
+            )
+            .where(
+                (ExchangeDataset.output_database == db_name)
+                & (ExchangeDataset.type << self.TECHNOSPHERE)
+            )
+            .order_by(ExchangeDataset.id)
+            .tuples()
+        )
+        rows = list(query.iterator())
+        exchanges, input_dbs, input_codes, output_codes, types = (
+            zip(*rows) if rows else ((), (), (), (), ())
+        )
+        inputs = self._activity_ids(zip(input_dbs, input_codes))
+        outputs = self._activity_ids((db_name, code) for code in output_codes)
+        # ids registered after this point are not part of this database
+        count = len(self._keys)
+        by_output, output_ptr = self._csr(outputs, count)
+        by_input, input_ptr = self._csr(inputs, count)
+        arrays = {
+            "exchanges": np.array(exchanges, dtype=np.int64),
+            "inputs": inputs,
+            "outputs": outputs,
+            "technosphere": np.array(types, dtype=object) == "technosphere",
+            "by_output": by_output,
+            "output_ptr": output_ptr,
+            "by_input": by_input,
+            "input_ptr": input_ptr,
+        }
+        self._databases[db_name] = (modified, arrays)
+        self._data[db_name] = dict()
+        return arrays
+
+    @staticmethod
+    def _slice(order: np.ndarray, indptr: np.ndarray, activity: int) -> np.ndarray:
+        """Return the positions of the exchanges of the activity."""
+        if activity >= len(indptr) - 1:
+            return order[:0]
+        return order[indptr[activity] : indptr[activity + 1]]
+
+    def _edges(self, db_name: str, arrays: dict, positions: np.ndarray) -> list:
+        """Return the exchanges at the positions of the database index as
+        dictionaries with their input and output keys, amount and unit.
+        """
+        data = self._data[db_name]
+        exchanges = arrays["exchanges"][positions].tolist()
+        new = [e for e in exchanges if e not in data]
+        for i in range(0, len(new), self.QUERY_CHUNK):
+            query = (
+                ExchangeDataset.select(ExchangeDataset.id, ExchangeDataset.data)
+                .where(ExchangeDataset.id.in_(new[i : i + self.QUERY_CHUNK]))
+                .tuples()
+            )
+            data.update(
+                (id_, (ds.get("amount"), ds.get("unit")))
+                for id_, ds in query.iterator()
+            )
+        keys = self._keys
+        edges = []
+        for exchange, i, o in zip(
+            exchanges,
+            arrays["inputs"][positions].tolist(),
+            arrays["outputs"][positions].tolist(),
+        ):
+            amount, unit = data[exchange]
+            edge = {
+                "id": exchange,
+                "input": keys[i],
+                "output": keys[o],
+                "amount": amount,
+            }
+            if unit is not None:
+                edge["unit"] = unit
+            edges.append(edge)
+        return edges
+
+    def inputs(self, key: tuple) -> list:
+        """Return the technosphere and substitution exchanges of the activity,
+        like `Activity.technosphere`.
+        """
+        arrays = self._database(key[0])
+        if key not in self._ids:
+            return []
+        positions = self._slice(
+            arrays["by_output"], arrays["output_ptr"], self._ids[key]
+        )
+        return self._edges(key[0], arrays, positions)
+
+    def consumers(self, key: tuple) -> list:
+        """Return the technosphere exchanges of all databases that consume
+        the activity, like `Activity.upstream`.
+        """
+        indexes = {db: self._database(db) for db in bd.databases}
+        if key not in self._ids:
+            return []
+        edges = []
+        for db_name, arrays in indexes.items():
+            positions = self._slice(
+                arrays["by_input"], arrays["input_ptr"], self._ids[key]
+            )
+            positions = positions[arrays["technosphere"][positions]]
+            edges.extend(self._edges(db_name, arrays, positions))
+        return sorted(edges, key=lambda edge: edge["id"])
+
+    def exchanges_between(self, keys: Iterable[tuple]) -> list:
+        """Return the technosphere and substitution exchanges between all of
+        the given activities.
+        """
+        keys = set(keys)
+        edges = []
+        for db_name in {key[0] for key in keys}:
+            arrays = self._database(db_name)
+            ids = np.array(
+                [self._ids[key] for key in keys if key in self._ids], dtype=np.int64
+            )
+            inner = np.isin(arrays["outputs"], ids) & np.isin(arrays["inputs"], ids)
+            edges.extend(self._edges(db_name, arrays, np.flatnonzero(inner)))
+        return sorted(edges, key=lambda edge: edge["id"])
+
+
+adjacency_index = AdjacencyIndex()
@@ -7,6 +7,7 @@ from PySide2.QtWidgets import QApplication
 from ..bwutils import (MLCA, Contributions, MonteCarloLCA,
                        SuperstructureContributions, SuperstructureMLCA)
 from .errors import CriticalCalculationError, ScenarioExchangeNotFoundError
+from .result_cache import lca_result_cache
 
 log = getLogger(__name__)
 
@@ -15,17 +16,25 @@ def do_LCA_calculations(data: dict):
     """Perform the MLCA calculation."""
     cs_name = data.get("cs_name", "new calculation")
     calculation_type = data.get("calculation_type", "simple")
+    if calculation_type not in ("simple", "scenario"):
+        log.error(f"Calculation type must be: simple or scenario. Given: {cs_name}")
+        raise ValueError
+
+    # Look for the results of an identical earlier calculation first, the
+    # (Superstructure)MLCA then only loads the LCI data when it is needed
+    scenario_df = data.get("data") if calculation_type == "scenario" else None
+    cache_key = lca_result_cache.calculation_key(cs_name, scenario_df)
+    cached = lca_result_cache.load(cache_key)
 
     if calculation_type == "simple":
         try:
-            mlca = MLCA(cs_name)
+            mlca = MLCA(cs_name, cached)
             contributions = Contributions(mlca)
         except KeyError as e:
             raise BW2CalcError("LCA Failed", str(e)).with_traceback(e.__traceback__)
-    elif calculation_type == "scenario":
+    else:
         try:
-            df = data.get("data")
-            mlca = SuperstructureMLCA(cs_name, df)
+            mlca = SuperstructureMLCA(cs_name, scenario_df, cached)
             contributions = SuperstructureContributions(mlca)
         except AssertionError as e:
             # This occurs if the superstructure itself detects something is wrong.
@@ -50,11 +59,14 @@ def do_LCA_calculations(data: dict):
         except ScenarioExchangeNotFoundError as e:
             QApplication.restoreOverrideCursor()
             raise CriticalCalculationError
-    else:
-        log.error(f"Calculation type must be: simple or scenario. Given: {cs_name}")
-        raise ValueError
 
-    mlca.calculate()
+    mlca.calculation_key = cache_key
+    if cached is None:
+        if calculation_type == "scenario":
+            mlca.calculate(workers=data.get("workers", 1))
+        else:
+            mlca.calculate()
+        lca_result_cache.save(cache_key, mlca.results_to_arrays())
     mc = MonteCarloLCA(cs_name)
 
     return mlca, contributions, mc
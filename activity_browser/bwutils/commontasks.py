@@ -4,10 +4,9 @@ from logging import getLogger
 
 import arrow
 
+import activity_browser.bwutils.metadata as meta
 from activity_browser.mod import bw2data as bd
 
-from .metadata import AB_metadata
-
 log = getLogger(__name__)
 
 """
@@ -212,8 +211,12 @@ def build_activity_group_name(key: tuple, name: str = None) -> str:
 
 
 def identify_activity_type(activity):
-    """Return the activity type based on its naming."""
-    name = activity["name"]
+    """Return the activity type based on its naming.
+
+    Also accepts the (possibly empty) metadata records of the navigators,
+    in which the name can be missing or None.
+    """
+    name = activity.get("name") or ""
     if "treatment of" in name:
         return "treatment"
     elif "market for" in name:
@@ -229,7 +232,7 @@ def identify_activity_type(activity):
 def generate_copy_code(key: tuple) -> str:
     """Generate a new code to use when copying an activity"""
     db, code = key
-    metadata = AB_metadata.get_database_metadata(db)
+    metadata = meta.AB_metadata.get_database_metadata(db)
     if "_copy" in code:
         code = code.split("_copy")[0]
     copies = (
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Storage of dataframes in the feather (Arrow IPC) format, used for the metadata
+snapshots and the scenario file cache.
+
+Feather files are read memory-mapped and column by column, and unlike pickles
+they cannot execute code when they are read. Feather stores plain columns
+only, so the index is reset into columns before writing and restored after
+reading. Tuples (e.g. keys and categories) come back from Arrow as arrays and
+columns that mix types are stored as JSON, see `write_frame`.
+"""
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+# The schema metadata entry holding the layout and the metadata of the caller
+METADATA_KEY = b"activity_browser"
+
+
+def _is_mixed(series: pd.Series) -> bool:
+    """Whether the object column holds values Arrow cannot store in a single
+    column type, e.g. numbers and strings.
+    """
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    return kind not in ("string", "empty", "bytes") and not _holds_tuples(series)
+
+
+def _holds_tuples(series: pd.Series) -> bool:
+    values = series.dropna()
+    return (
+        not values.empty
+        and all(isinstance(v, tuple) for v in values)
+        and pd.api.types.infer_dtype([x for v in values for x in v], skipna=True)
+        in ("string", "empty")
+    )
+
+
+def _to_json(value) -> Optional[str]:
+    if not isinstance(value, (tuple, list, dict)) and pd.isna(value):
+        return None
+    # numpy scalars are stored as the equivalent python value
+    return json.dumps(value, default=lambda v: v.item())
+
+
+def _from_json(value):
+    if value is None:
+        return np.nan
+    value = json.loads(value)
+    return tuple(value) if isinstance(value, list) else value
+
+
+def write_frame(path: str, df: pd.DataFrame, **metadata) -> None:
+    """Store the dataframe and its index as a feather file at `path`.
+
+    The keyword arguments are stored (as JSON) in the schema of the file, see
+    `read_metadata`. The file is written next to `path` first and then moved,
+    so readers never see an incomplete file.
+    """
+    if isinstance(df.index, pd.RangeIndex) and df.index.equals(pd.RangeIndex(len(df))):
+        frame, index = df.reset_index(drop=True), []
+    else:
+        # named like the index columns of pyarrow, to not clash with columns
+        index = [f"__index_level_{i}__" for i in range(df.index.nlevels)]
+        frame = df.rename_axis(index).reset_index()
+    tuples, mixed = [], []
+    columns = dict()
+    for col in frame.columns:
+        series = frame[col]
+        if series.dtype != object:
+            continue
+        if _holds_tuples(series):
+            tuples.append(col)
+        elif _is_mixed(series):
+            mixed.append(col)
+            columns[col] = [_to_json(v) for v in series.values]
+    frame = frame.assign(**columns)
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    layout = {
+        "index": index,
+        "index_names": list(df.index.names),
+        "tuples": tuples,
+        "json": mixed,
+        "metadata": metadata,
+    }
+    table = table.replace_schema_metadata(
+        {**table.schema.metadata, METADATA_KEY: json.dumps(layout).encode()}
+    )
+    feather.write_feather(table, path + ".tmp", compression="uncompressed")
+    os.replace(path + ".tmp", path)
+
+
+def _layout(schema: pa.Schema) -> dict:
+    return json.loads(schema.metadata[METADATA_KEY])
+
+
+def read_metadata(path: str) -> dict:
+    """Return the metadata stored with the dataframe, without reading it."""
+    with pa.memory_map(path) as source:
+        return _layout(pa.ipc.open_file(source).schema)["metadata"]
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Read the dataframe stored with `write_frame`."""
+    table = feather.read_table(path, memory_map=True)
+    layout = _layout(table.schema)
+    df = table.to_pandas()
+
+    columns = dict()
+    for col in layout["tuples"]:
+        columns[col] = [
+            tuple(v) if isinstance(v, np.ndarray) else np.nan for v in df[col].values
+        ]
+    for col in layout["json"]:
+        columns[col] = [_from_json(v) for v in df[col].values]
+    for col in df.columns[df.dtypes == object].difference(columns):
+        # Arrow returns missing values as None
+        columns[col] = df[col].where(df[col].notna(), np.nan)
+    df = df.assign(**columns)
+    if layout["index"]:
+        df = df.set_index(layout["index"])
+        df.index.names = layout["index_names"]
+    return df
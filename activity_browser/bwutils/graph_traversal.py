@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+from heapq import heappop, heappush
+from logging import getLogger
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import SuperLU, spsolve
+
+from activity_browser.mod import bw2data as bd
+
+log = getLogger(__name__)
+
+
+class MatrixGraphTraversal(object):
+    """Traverse a supply chain, following the paths of greatest impact.
+
+    Gives the same results as brightway's `GraphTraversal`, but works on an
+    already calculated LCA object (e.g. the one of an `MLCA`) instead of
+    constructing and factorizing a new one.
+
+    The cumulative score of an activity is the characterized biosphere row
+    vector times the inverse technosphere matrix. Instead of solving the
+    technosphere for every activity that is visited, the scores of all
+    activities are found at once by solving the transposed system a single
+    time with the existing factorization. The traversal itself is then a walk
+    over the columns of the technosphere matrix.
+
+    Should be used by calling the `calculate` method.
+    """
+
+    def calculate(
+        self, lca, cutoff: float = 0.005, max_calc: float = 1e5, skip_coproducts=False
+    ) -> dict:
+        """Traverse the supply chain graph of the LCA.
+
+        Parameters
+        ----------
+        lca : LCA object for which the LCI and LCIA have been calculated
+        cutoff : Relative score of the total score below which activities are
+            not traversed further, i.e. 0.005 cuts off at 0.5 percent
+        max_calc : Maximum number of activities to assess
+        skip_coproducts : Skip inputs with negative amounts
+
+        Returns
+        -------
+        Dictionary of nodes, edges, the LCA object and the number of assessed
+        activities, formatted like the results of brightway's `GraphTraversal`
+
+        """
+        score = lca.score
+        if score == 0:
+            raise ValueError("Zero total LCA score makes traversal impossible")
+
+        technosphere = sparse.csc_matrix(lca.technosphere_matrix)
+        technosphere.sum_duplicates()
+        technosphere.sort_indices()
+        supply = np.asarray(lca.supply_array)
+        diagonal = technosphere.diagonal()
+
+        # The unit score of each activity, the LCIA CFs times its biosphere flows
+        characterized_biosphere = np.asarray(
+            (lca.characterization_matrix * lca.biosphere_matrix).sum(axis=0)
+        ).ravel()
+        # Cumulative score of each activity when producing its supply
+        cumulative = (
+            self.cumulative_unit_scores(lca, technosphere, characterized_biosphere)
+            * diagonal
+            * supply
+        )
+
+        heap, nodes, edges = self.initialize_heap(
+            lca, supply, characterized_biosphere, cumulative
+        )
+        nodes, edges, counter = self.traverse(
+            heap,
+            nodes,
+            edges,
+            max_calc,
+            cutoff,
+            score,
+            supply,
+            characterized_biosphere,
+            cumulative,
+            technosphere,
+            self.static_activities(lca),
+            skip_coproducts,
+        )
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "lca": lca,
+            "counter": counter,
+        }
+
+    @staticmethod
+    def cumulative_unit_scores(
+        lca, technosphere: sparse.csc_matrix, characterized_biosphere: np.ndarray
+    ) -> np.ndarray:
+        """Return the cumulative score of producing one unit of the reference
+        product of every activity.
+
+        This solves the transposed technosphere system, reusing the factorized
+        technosphere of the LCA where the solver supports it.
+        """
+        solver = getattr(lca, "solver", None)
+        factorization = getattr(solver, "__self__", None)
+        if isinstance(factorization, SuperLU):
+            return factorization.solve(characterized_biosphere, trans="T")
+        # Not every solver backend (e.g. umfpack) can solve the transposed system
+        return spsolve(technosphere.T.tocsc(), characterized_biosphere)
+
+    @staticmethod
+    def static_activities(lca):
+        """Return a mask of the activities that are part of static databases,
+        or None if there are no static databases.
+        """
+        static = {name for name in bd.databases if bd.databases[name].get("static")}
+        if not static:
+            return None
+        reverse = lca.reverse_dict()[0]
+        return np.array(
+            [reverse[i][0] in static for i in range(lca.technosphere_matrix.shape[1])]
+        )
+
+    @staticmethod
+    def activity_index(lca, key) -> int:
+        """Return the technosphere column of the activity."""
+        try:
+            return lca.activity_dict[key]
+        except AttributeError:
+            # bw25 compatibility requires activity id instead of activity key
+            return lca.dicts.activity[bd.get_activity(key).id]
+
+    def initialize_heap(
+        self,
+        lca,
+        supply: np.ndarray,
+        characterized_biosphere: np.ndarray,
+        cumulative: np.ndarray,
+    ) -> tuple:
+        """Create a heap of activities to assess, sorted by LCA score, starting
+        with each activity in the demand.
+
+        The functional unit is an abstract dataset which is not part of the
+        matrices, it is assigned the index -1.
+        """
+        heap, edges = [], []
+        nodes = {-1: {"amount": 1, "cum": lca.score, "ind": 1e-6 * lca.score}}
+        for activity_key, activity_amount in lca.demand.items():
+            index = self.activity_index(lca, activity_key)
+            cum_score = float(cumulative[index])
+            heappush(heap, (abs(1 / cum_score), index))
+            nodes[index] = {
+                "amount": float(supply[index]),
+                "cum": cum_score,
+                "ind": float(characterized_biosphere[index] * supply[index]),
+            }
+            edges.append(
+                {
+                    "to": -1,
+                    "from": index,
+                    "amount": activity_amount,
+                    "exc_amount": activity_amount,
+                    "impact": cum_score * activity_amount / float(supply[index]),
+                }
+            )
+        return heap, nodes, edges
+
+    @staticmethod
+    def traverse(
+        heap: list,
+        nodes: dict,
+        edges: list,
+        max_calc: float,
+        cutoff: float,
+        total_score: float,
+        supply: np.ndarray,
+        characterized_biosphere: np.ndarray,
+        cumulative: np.ndarray,
+        technosphere: sparse.csc_matrix,
+        static=None,
+        skip_coproducts=False,
+    ) -> tuple:
+        """Build a directed graph by traversing the supply chain, the activity
+        with the greatest impact is assessed first.
+
+        Node ids are technosphere row/column indices.
+
+        Returns
+        -------
+        The nodes, edges and number of assessed activities
+
+        """
+        counter = 0
+        limit = abs(total_score * cutoff)
+        diagonal = technosphere.diagonal().tolist()
+        indptr, indices, data = (
+            technosphere.indptr,
+            technosphere.indices,
+            technosphere.data,
+        )
+        supply_list = supply.tolist()
+        cumulative_list = cumulative.tolist()
+
+        while heap:
+            if counter >= max_calc:
+                log.warning("Stopping traversal due to calculation count.")
+                break
+            parent_index = heappop(heap)[1]
+            # Skip links from static databases
+            if static is not None and static[parent_index]:
+                continue
+
+            # Assume that this activity produces its reference product
+            scale_value = diagonal[parent_index]
+            if scale_value == 0:
+                raise ValueError(
+                    "Can't rescale activities that produce zero reference product"
+                )
+            start, end = indptr[parent_index], indptr[parent_index + 1]
+            for activity, value in zip(
+                indices[start:end].tolist(), data[start:end].tolist()
+            ):
+                # Skip values on technosphere diagonal
+                if activity == parent_index:
+                    continue
+                # Multiply by -1 because technosphere values are negative
+                # (consumption of inputs) and rescale
+                amount = -1 * value / scale_value
+                # Skip negative coproducts
+                if skip_coproducts and amount <= 0:
+                    continue
+                counter += 1
+                cumulative_score = cumulative_list[activity]
+                if abs(cumulative_score) < limit:
+                    continue
+
+                # flow between activity and parent
+                flow = -1.0 * value * supply_list[parent_index]
+                total_activity_output = diagonal[activity] * supply_list[activity]
+                edges.append(
+                    {
+                        "to": parent_index,
+                        "from": activity,
+                        # Amount of this link * amount of parent demanding link
+                        "amount": flow,
+                        # Raw exchange value
+                        "exc_amount": amount,
+                        # Impact related to this flow
+                        "impact": flow / total_activity_output * cumulative_score,
+                    }
+                )
+                # Want multiple incoming edges, but don't add existing node
+                if activity in nodes:
+                    continue
+                nodes[activity] = {
+                    # Total amount of this flow supplied
+                    "amount": total_activity_output,
+                    # Cumulative score from all flows of this activity
+                    "cum": cumulative_score,
+                    # Individual score attributable to environmental flows
+                    # coming directly from or to this activity
+                    "ind": float(characterized_biosphere[activity])
+                    * supply_list[activity],
+                }
+                heappush(heap, (abs(1 / cumulative_score), activity))
+
+        return nodes, edges, counter
@@ -1,15 +1,211 @@
+import ast
 from abc import abstractmethod
 from collections.abc import Iterator
-from typing import Iterable, List, Optional, Tuple
+from logging import getLogger
+from types import CodeType
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 from bw2calc import LCA
+from bw2data.parameters import *
 from stats_arrays import MCRandomNumberGenerator, UncertaintyBase
 
-from activity_browser.mod.bw2data.backends import ExchangeDataset
-from activity_browser.mod.bw2data.parameters import *
+from .utils import (ExchangeDataset, Index, Indices, Parameters,
+                    StaticParameters)
+
+log = getLogger(__name__)
+
+# The syntax allowed in compiled formulas, anything else (e.g. attribute
+# access, subscripts or lambdas) is left to the asteval interpreter.
+COMPILED_NODES = (
+    ast.Expression,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Call,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.BoolOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.operator,
+    ast.unaryop,
+    ast.boolop,
+    ast.cmpop,
+)
+
+
+class Formula(NamedTuple):
+    """A formula and its compiled code, `code` is None if the formula can
+    only be evaluated by the asteval interpreter.
+    """
+
+    text: str
+    code: Optional[CodeType] = None
+
+
+class Scope(NamedTuple):
+    """The (project, database or activity) parameters of a single group."""
+
+    group: str
+    needed: set
+    order: List[str]
+    formulas: Dict[str, Formula]
+    amounts: Dict[str, float]
 
-from .utils import Index, Indices, Parameters, StaticParameters
+
+class CompiledParameters(object):
+    """Compiled evaluation of the parameters and parameterized exchanges in
+    a project.
+
+    The evaluation order of the parameters is determined once, and all the
+    formulas are compiled to Python code objects. The formulas are evaluated
+    with arrays of parameter values, so any number of samples is evaluated
+    in a single pass. Formulas that cannot be evaluated element-wise (e.g.
+    using `min` or a conditional expression) are evaluated per sample by the
+    asteval interpreter instead, like brightway does.
+    """
+
+    def __init__(self, initial: StaticParameters, parameters: Parameters):
+        # Only element-wise functions and constants are used in compiled
+        # formulas, anything else is left to the interpreter.
+        self.functions = {
+            k: v
+            for k, v in Interpreter().symtable.items()
+            if isinstance(v, (np.ufunc, float)) or k == "abs"
+        }
+        self.positions = {(p.group, p.name): i for i, p in enumerate(parameters)}
+
+        self.project = self.compile_scope("project", initial.project(), set())
+        self.databases = {
+            db: self.compile_scope(db, initial.by_database(db), set(self.project.order))
+            for db in initial.databases
+        }
+        self.groups: List[Tuple[Scope, str, List[Formula]]] = []
+        for p in initial.act_by_group_db:
+            combination = set(self.project.order)
+            if p.database in self.databases:
+                combination.update(self.databases[p.database].order)
+            scope = self.compile_scope(
+                p.group, initial.act_by_group(p.group), combination
+            )
+            combination.update(scope.order)
+            exchanges = [
+                self.compile(formula, combination)
+                for formula in initial.exc_by_group(p.group).values()
+            ]
+            self.groups.append((scope, p.database, exchanges))
+        self.size = sum(len(exchanges) for _, _, exchanges in self.groups)
+
+    def compile(self, formula: str, known: set) -> Formula:
+        """Compile the formula, unless it uses anything other than arithmetic,
+        comparisons, the `known` parameter names and element-wise functions.
+        """
+        try:
+            tree = ast.parse(formula.strip(), "<formula>", "eval")
+        except SyntaxError:
+            return Formula(formula)
+        allowed = known.union(self.functions)
+        for node in ast.walk(tree):
+            if not isinstance(node, COMPILED_NODES):
+                return Formula(formula)
+            if isinstance(node, ast.Name) and (
+                node.id.startswith("_") or node.id not in allowed
+            ):
+                return Formula(formula)
+            if isinstance(node, ast.Call) and (
+                not isinstance(node.func, ast.Name) or node.keywords
+            ):
+                return Formula(formula)
+        return Formula(formula, compile(tree, "<formula>", "eval"))
+
+    def compile_scope(self, group: str, data: dict, available: set) -> Scope:
+        """Determine the evaluation order of the parameters in `data`, which
+        can only use the `available` names of the enclosing groups.
+        """
+        needed = get_new_symbols(data.values(), set(data))
+        missing = needed.difference(available)
+        if missing:
+            raise MissingName(
+                "The following variables aren't defined:\n{}".format("|".join(missing))
+            )
+        order = ParameterSet(data, {k: 1.0 for k in needed}).order
+        known = needed.union(data)
+        return Scope(
+            group=group,
+            needed=needed,
+            order=[name for name in order if name in data],
+            formulas={
+                name: self.compile(d["formula"], known)
+                for name, d in data.items()
+                if d.get("formula")
+            },
+            amounts={name: d.get("amount") for name, d in data.items()},
+        )
+
+    def evaluate(self, samples: np.ndarray) -> np.ndarray:
+        """Evaluate all parameters for the given (samples x parameters) array
+        of parameter values, in the order of the `Parameters`.
+
+        Returns a (samples x exchanges) array with the amounts of the
+        parameterized exchanges, in the order of the `Indices`.
+        """
+        samples = np.atleast_2d(samples)
+        result = np.zeros((samples.shape[0], self.size))
+        project = self.evaluate_scope(self.project, {}, samples)
+        databases = {
+            db: self.evaluate_scope(scope, project, samples)
+            for db, scope in self.databases.items()
+        }
+        offset = 0
+        for scope, database, exchanges in self.groups:
+            combination = dict(project)
+            combination.update(databases.get(database, {}))
+            combination.update(self.evaluate_scope(scope, combination, samples))
+            for formula in exchanges:
+                result[:, offset] = self.evaluate_formula(
+                    formula, combination, samples.shape[0]
+                )
+                offset += 1
+        return result
+
+    def evaluate_scope(self, scope: Scope, glo: dict, samples: np.ndarray) -> dict:
+        namespace = {k: glo[k] for k in scope.needed}
+        values = {}
+        for name in scope.order:
+            if name in scope.formulas:
+                value = self.evaluate_formula(
+                    scope.formulas[name], namespace, samples.shape[0]
+                )
+            elif (scope.group, name) in self.positions:
+                value = samples[:, self.positions[(scope.group, name)]]
+            else:
+                value = np.full(samples.shape[0], scope.amounts[name], dtype=float)
+            namespace[name] = values[name] = value
+        return values
+
+    def evaluate_formula(self, formula: Formula, namespace: dict, n: int) -> np.ndarray:
+        if formula.code is not None:
+            try:
+                with np.errstate(divide="raise", invalid="raise", over="raise"):
+                    value = eval(
+                        formula.code,
+                        {"__builtins__": {}},
+                        dict(self.functions, **namespace),
+                    )
+                value = np.asarray(value, dtype=float)
+                if value.shape in ((), (n,)):
+                    return np.broadcast_to(value, (n,))
+                log.debug(f"Formula '{formula.text}' does not evaluate element-wise")
+            except (ArithmeticError, NameError, TypeError, ValueError) as e:
+                log.debug(f"Formula '{formula.text}' failed element-wise: {e!r}")
+        # Fall back to evaluating the formula per sample.
+        interpreter = Interpreter()
+        result = np.empty(n)
+        for i in range(n):
+            interpreter.symtable.update({k: v[i] for k, v in namespace.items()})
+            result[i] = interpreter(formula.text)
+        return result
 
 
 class ParameterManager(object):
@@ -21,6 +217,14 @@ class ParameterManager(object):
         self.parameters: Parameters = Parameters.from_bw_parameters()
         self.initial: StaticParameters = StaticParameters()
         self.indices: Indices = self.construct_indices()
+        self._compiled: Optional[CompiledParameters] = None
+
+    @property
+    def compiled(self) -> CompiledParameters:
+        """The compiled parameters and formulas, built on first use."""
+        if self._compiled is None:
+            self._compiled = CompiledParameters(self.initial, self.parameters)
+        return self._compiled
 
     def construct_indices(self) -> Indices:
         """Given that ParameterizedExchanges will always have the same order of
@@ -35,133 +239,15 @@ class ParameterManager(object):
             )
         return indices
 
-    def recalculate_project_parameters(self) -> dict:
-        data = self.initial.project()
-        if not data:
-            return {}
-
-        new_values = self.parameters.data_by_group("project")
-
-        for name, amount in new_values.items():
-            data[name]["amount"] = amount
-
-        ParameterSet(data).evaluate_and_set_amount_field()
-        return StaticParameters.prune_result_data(data)
-
-    def recalculate_database_parameters(
-        self, database: str, global_params: dict = None
-    ) -> dict:
-        data = self.initial.by_database(database)
-        if not data:
-            return {}
-
-        glo = global_params or {}
-        new_values = self.parameters.data_by_group(database)
-        for name, amount in new_values.items():
-            data[name]["amount"] = amount
-
-        new_symbols = get_new_symbols(data.values(), set(data))
-        missing = new_symbols.difference(glo)
-        if missing:
-            raise MissingName(
-                "The following variables aren't defined:\n{}".format("|".join(missing))
-            )
-
-        glo = Parameters.static(glo, needed=new_symbols) if new_symbols else None
-
-        ParameterSet(data, glo).evaluate_and_set_amount_field()
-        return StaticParameters.prune_result_data(data)
-
-    def process_database_parameters(self, global_params: dict = None) -> dict:
-        glo = global_params or self.recalculate_project_parameters()
-        all_db = {}
-        for database in self.initial.databases:
-            db = self.recalculate_database_parameters(database, glo)
-            all_db[database] = {x: y for x, y in db.items()} if db else {}
-        return all_db
-
-    def recalculate_activity_parameters(
-        self, group: str, global_params: dict = None
-    ) -> dict:
-        data = self.initial.act_by_group(group)
-        if not data:
-            return {}
-
-        new_values = self.parameters.data_by_group(group)
-        glo = global_params or {}
-        for name, amount in new_values.items():
-            data[name]["amount"] = amount
-
-        new_symbols = get_new_symbols(data.values(), set(data))
-        missing = new_symbols.difference(global_params)
-        if missing:
-            raise MissingName(
-                "The following variables aren't defined:\n{}".format("|".join(missing))
-            )
-
-        glo = Parameters.static(glo, needed=new_symbols) if new_symbols else None
-
-        ParameterSet(data, glo).evaluate_and_set_amount_field()
-        return StaticParameters.prune_result_data(data)
-
-    def recalculate_exchanges(
-        self, group: str, global_params: dict = None
-    ) -> Iterable[Tuple[int, float]]:
-        """Constructs a list of exc.id/amount tuples for the
-        ParameterizedExchanges in the given group.
-        """
-        params = self.initial.exc_by_group(group)
-        if not params:
-            return []
-
-        glo = global_params or {}
-        interpreter = Interpreter()
-        interpreter.symtable.update(glo)
-        return [(k, interpreter(v)) for k, v in params.items()]
-
-    def process_exchanges(
-        self,
-        global_params: dict = None,
-        db_params: dict = None,
-        build_indices: bool = True,
-    ) -> np.ndarray:
-        dbs = db_params or {}
-        complete_data = np.zeros(len(self.indices))
-
-        offset = 0
-        for p in self.initial.act_by_group_db:
-            combination = (
-                {x: y for x, y in global_params.items()} if global_params else {}
-            )
-            combination.update(dbs.get(p.database, {}))
-            combination.update(
-                self.recalculate_activity_parameters(p.group, combination)
-            )
-
-            recalculated = self.recalculate_exchanges(
-                p.group, global_params=combination
-            )
-            # If the parameter group contains no ParameterizedExchanges, skip.
-            if not recalculated:
-                continue
-            # `data` contains the recalculated amounts for the exchanges.
-            _, data = zip(*recalculated)
-            complete_data[offset : len(data) + offset] = data
-            offset += len(data)
-
-        return complete_data
-
     def calculate(self) -> np.ndarray:
         """Convenience function that takes calculates the current parameters
         and returns a fully-formed set of exchange amounts and indices.
 
         All parameter types are recalculated in turn before interpreting the
-        ParameterizedExchange formulas into amounts.
+        ParameterizedExchange formulas into amounts, see `CompiledParameters`.
         """
-        global_project = self.recalculate_project_parameters()
-        all_db = self.process_database_parameters(global_project)
-        data = self.process_exchanges(global_project, all_db)
-        return data
+        amounts = np.array([p.amount for p in self.parameters], dtype=float)
+        return self.compiled.evaluate(amounts)[0]
 
     @abstractmethod
     def recalculate(self, values: List[float]) -> np.ndarray:
@@ -309,6 +395,7 @@ class MonteCarloParameterManager(ParameterManager, Iterator):
             *[getattr(p, "data", {}) for p in parameters]
         )
         self.mc_generator = MCRandomNumberGenerator(self.uncertainties, seed=seed)
+        self.samples = np.empty((0, len(self.parameters)))
 
     def __iter__(self):
         return self
@@ -320,29 +407,50 @@ class MonteCarloParameterManager(ParameterManager, Iterator):
         assert iterations > 0, "Must have a positive amount of iterations"
         if iterations == 1:
             return self.next()
-        # Construct indices, prepare sized array and sample parameter
-        # uncertainty distributions `interations` times.
+        # Sample and recalculate all iterations at once, then format every
+        # row like the `tech_params` and `bio_params` arrays.
+        amounts = self.sample_matrix(iterations)
         all_data = np.empty((iterations, len(self.indices)), dtype=Indices.array_dtype)
-        random_bounded_values = self.mc_generator.generate(iterations)
-
-        # Now, repeatedly replace parameter amounts with sampled data and
-        # recalculate. Every processed row is added to the sized array.
         for i in range(iterations):
-            values = random_bounded_values.take(i, axis=1)
-            self.parameters.update(values)
-            data = self.calculate()
-            all_data[i] = self.indices.mock_params(data)
-
+            all_data[i] = self.indices.mock_params(amounts[i])
+        self.select_sample(iterations - 1)
         return all_data
 
+    def sample_matrix(self, iterations: int) -> np.ndarray:
+        """Sample the parameter uncertainty `iterations` times and recalculate
+        all samples at once.
+
+        Returns an (iterations x exchanges) array with the amounts of the
+        parameterized exchanges, in the order of `indices`. The parameters
+        themselves are left unchanged, the sampled values are kept in
+        `samples` (see `select_sample`).
+        """
+        assert iterations > 0, "Must have a positive amount of iterations"
+        amounts = np.array([p.amount for p in self.parameters], dtype=float)
+        samples = self.mc_generator.generate(iterations).reshape(-1, iterations).T
+        # Parameters without a sampled value keep their current amount.
+        self.samples = np.where(np.isnan(samples), amounts, samples)
+        return self.compiled.evaluate(self.samples)
+
+    def select_sample(self, index: int) -> None:
+        """Set the parameters to the values of one of the `samples` of the
+        last `sample_matrix`.
+        """
+        self.parameters.update(self.samples[index])
+
     def next(self) -> np.ndarray:
         """Similar to `recalculate` but only performs a single sampling and
         recalculation.
         """
+        return self.indices.mock_params(self.sample())
+
+    def sample(self) -> np.ndarray:
+        """Sample the parameter uncertainty once and return the recalculated
+        amounts of the parameterized exchanges, in the order of `indices`.
+        """
         values = self.mc_generator.next()
         self.parameters.update(values)
-        data = self.calculate()
-        return self.indices.mock_params(data)
+        return self.calculate()
 
     def retrieve_sampled_values(self, data: dict):
         """Enters the sampled values into the 'exchanges' list in the 'data'
@@ -1,15 +1,17 @@
 # -*- coding: utf-8 -*-
+import os
+from collections import OrderedDict
 from logging import getLogger
+from typing import Iterable, Optional, Union
 
 import numpy as np
 import pandas as pd
-from bw2data.errors import UnknownObject
 
 import activity_browser.bwutils.commontasks as bc
 from activity_browser.mod import bw2data as bd
 from activity_browser.mod.bw2data.backends import ActivityDataset
 
-# todo: extend store over several projects
+from .feather import read_frame, read_metadata, write_frame
 
 log = getLogger(__name__)
 
@@ -47,12 +49,57 @@ class MetaDataStore(object):
     # add them to `self.act_fields` there and `CLASSIFICATION_SYSTEMS` below
     CLASSIFICATION_SYSTEMS = ["ISIC rev.4 ecoinvent"]
 
+    # Metadata of each database is stored in the project directory, to be
+    # reused as long as the database is not modified
+    SNAPSHOT_DIRECTORY = "ab_metadata"
+    # Number of (recently used) other projects to keep the metadata of
+    MAX_PROJECTS = 3
+
+    # Fields not kept in the metadata, these are read from the activity itself
+    # when needed (e.g. the activity tab)
+    BLOB_FIELDS = ["classifications", "comment"]
+    # String columns are stored as categoricals when at most this share of
+    # their values is unique
+    CATEGORICAL_RATIO = 0.5
+    # Maximum number of activity codes in a single query
+    QUERY_CHUNK = 500
+
     def __init__(self):
-        self.dataframe = pd.DataFrame()
+        self._dataframe = pd.DataFrame()
         self.databases = set()
+        self.modified = dict()  # 'modified' timestamps of the databases
+        self._project: Optional[str] = None
+        self._projects = OrderedDict()
+        # activities to update (True) or delete (False) on the next read
+        self._pending = dict()
+        self._labels = dict()  # {(fields, separator): {key: label}}
+        self._keys = dict()  # {id: key}
+        self._version = 0
 
         bd.projects.current_changed.connect(self.reset_metadata)
 
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        """The metadata, with all pending updates applied."""
+        if self._pending:
+            self.flush()
+        return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, df: pd.DataFrame) -> None:
+        self._dataframe = df
+        self._labels = dict()
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """Counts the changes of the metadata, to invalidate data derived
+        from it (e.g. the aggregation matrices of `Contributions`).
+        """
+        if self._pending:
+            self.flush()
+        return self._version
+
     def add_metadata(self, db_names_list: list) -> None:
         """Include data from the brightway databases.
 
@@ -73,11 +120,14 @@ class MetaDataStore(object):
         new = set(db_names_list).difference(self.databases)
         if not new:
             return
+        if self._project is None:
+            self._project = bd.projects.dir
 
         dfs = list()
         dfs.append(self.dataframe)
         log.debug(
-            f"Current shape and databases in the MetaDataStore: {self.dataframe.shape} {self.databases}"
+            "Current shape and databases in the MetaDataStore: "
+            f"{self.dataframe.shape} {self.databases}"
         )
         for db_name in new:
             if db_name not in bd.databases:
@@ -85,33 +135,191 @@ class MetaDataStore(object):
 
             log.debug(f"Adding: {db_name}")
             self.databases.add(db_name)
-
-            # make a temporary DataFrame and index it by ('database', 'code') (like all brightway activities)
-            df = pd.DataFrame(bd.Database(db_name))
-            df["key"] = df.loc[:, ["database", "code"]].apply(tuple, axis=1)
-            df.index = pd.MultiIndex.from_tuples(df["key"])
-
-            # add unpacked classifications columns if classifications are present
-            if "classifications" in df.columns:
-                df = self.unpack_classifications(df, self.CLASSIFICATION_SYSTEMS)
-
-            # In a new 'biosphere3' database, some categories values are lists
-            if "categories" in df.columns:
-                df["categories"] = df.loc[:, "categories"].apply(list_to_tuple)
-
+            self.modified[db_name] = bd.databases[db_name].get("modified")
+            df = self._read_snapshot(db_name)
+            if df is None:
+                df = self._load_database(db_name)
+                self._write_snapshot(db_name, df)
             dfs.append(df)
 
         # add this metadata to already existing metadata
-        self.dataframe = pd.concat(dfs, sort=False)
-        self.dataframe.replace(
-            np.nan, "", regex=True, inplace=True
-        )  # replace 'nan' values with emtpy string
+        self.dataframe = self._concat(dfs)
         # print('Dimensions of the Metadata:', self.dataframe.shape)
 
+    def _concat(self, dfs: list) -> pd.DataFrame:
+        """Combine metadata frames into a single compact frame."""
+        dataframe = pd.concat(dfs, sort=False)
+        # columns that do not exist in every database are filled with NaN
+        missing = [
+            col
+            for col in dataframe.columns
+            if any(col not in df for df in dfs if not df.empty)
+        ]
+        if missing:
+            values = dataframe[missing].astype(object)
+            dataframe[missing] = values.where(values.notna(), "")
+        return self.compact(dataframe)
+
+    def _load_database(self, db_name: str, codes: list = None) -> pd.DataFrame:
+        """Read the metadata of all activities in the database with a single
+        query, without creating an `Activity` for every row.
+
+        If `codes` is given, only these activities are read.
+        """
+        if codes is None:
+            chunks = [ActivityDataset.database == db_name]
+        else:
+            chunks = [
+                (ActivityDataset.database == db_name)
+                & ActivityDataset.code.in_(codes[i : i + self.QUERY_CHUNK])
+                for i in range(0, len(codes), self.QUERY_CHUNK)
+            ]
+        codes, data = [], []
+        for where in chunks:
+            query = (
+                ActivityDataset.select(ActivityDataset.code, ActivityDataset.data)
+                .where(where)
+                .tuples()
+            )
+            for code, ds in query.iterator():
+                codes.append(code)
+                data.append(ds)
+        if not codes:
+            return pd.DataFrame()
+
+        # index the DataFrame by ('database', 'code') (like all brightway activities)
+        index = pd.MultiIndex.from_arrays([[db_name] * len(codes), codes])
+        df = pd.DataFrame.from_records(data, index=index)
+        df["database"] = db_name
+        df["code"] = codes
+        df["key"] = index.to_flat_index()
+
+        # add unpacked classifications columns if classifications are present
+        if "classifications" in df.columns:
+            df = self.unpack_classifications(df, self.CLASSIFICATION_SYSTEMS)
+
+        # In a new 'biosphere3' database, some categories values are lists
+        if "categories" in df.columns:
+            df["categories"] = [list_to_tuple(c) for c in df["categories"]]
+
+        return self.compact(df.fillna(""))  # replace 'nan' values with emtpy string
+
+    def compact(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Reduce the memory footprint of the metadata.
+
+        - fields in `BLOB_FIELDS` and fields holding nested data (dicts or
+          lists) are dropped
+        - string columns with few unique values (location, unit, database,
+          classifications, ...) become categoricals
+        - equal 'categories' tuples share a single tuple object
+        """
+        blobs = [
+            col
+            for col in df.columns
+            if col in self.BLOB_FIELDS
+            or (
+                df[col].dtype == object
+                and isinstance(self._first_value(df[col]), (dict, list, set))
+            )
+        ]
+        df = df.drop(columns=blobs)
+        if df.empty:
+            return df
+
+        columns = dict()
+        for col in df.columns:
+            if col in ("key", "code"):
+                continue
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                columns[col] = series.cat.remove_unused_categories()
+            elif col == "categories":
+                interned = dict()
+                columns[col] = [interned.setdefault(c, c) for c in series.values]
+            elif (
+                series.dtype == object
+                and series.nunique() <= self.CATEGORICAL_RATIO * len(series)
+                and pd.api.types.infer_dtype(series, skipna=False) == "string"
+            ):
+                columns[col] = series.astype("category")
+        return df.assign(**columns)
+
+    @staticmethod
+    def _first_value(series: pd.Series):
+        """Return the first value of the series that is not an empty string."""
+        return next((v for v in series.values if not isinstance(v, str) or v), "")
+
+    @staticmethod
+    def expand(df: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+        """Convert the categorical columns of (a slice of) the metadata back
+        to plain object columns.
+        """
+        if not isinstance(df, pd.DataFrame):
+            return df  # a single row holds plain values already
+        categorical = {
+            col: object
+            for col, dtype in df.dtypes.items()
+            if isinstance(dtype, pd.CategoricalDtype)
+        }
+        return df.astype(categorical) if categorical else df
+
+    def _snapshot_path(self, db_name: str) -> str:
+        directory = bd.projects.request_directory(self.SNAPSHOT_DIRECTORY)
+        return os.path.join(directory, f"{bd.utils.safe_filename(db_name)}.feather")
+
+    def _read_snapshot(self, db_name: str) -> Optional[pd.DataFrame]:
+        """Return the stored metadata of the database, or None if there is no
+        snapshot or the database was modified since it was made.
+        """
+        modified = self.modified.get(db_name)
+        path = self._snapshot_path(db_name)
+        if modified is None or not os.path.isfile(path):
+            return None
+        try:
+            snapshot = read_metadata(path)
+            if (snapshot.get("modified"), snapshot.get("systems")) != (
+                modified,
+                self.CLASSIFICATION_SYSTEMS,
+            ):
+                return None
+            df = read_frame(path)
+        except Exception as e:
+            log.warning(f"Could not read metadata snapshot of {db_name}: {e}")
+            return None
+        log.debug(f"Loaded metadata snapshot: {db_name}")
+        return df
+
+    def _write_snapshot(self, db_name: str, df: pd.DataFrame) -> None:
+        """Store the metadata of the database with its 'modified' timestamp."""
+        modified = self.modified.get(db_name)
+        if modified is None:
+            return
+        try:
+            write_frame(
+                self._snapshot_path(db_name),
+                df,
+                modified=modified,
+                systems=self.CLASSIFICATION_SYSTEMS,
+            )
+        except Exception as e:
+            log.warning(f"Could not store metadata snapshot of {db_name}: {e}")
+
     def update_metadata(self, key: tuple) -> None:
-        """Update metadata when an activity has changed.
+        """Update metadata when an activity has changed, see `update_many`.
 
-        Three situations:
+        Parameters
+        ----------
+        key : tuple
+            The specific activity to update in the MetaDataStore
+        """
+        self.update_many([key])
+
+    def update_many(self, keys: Iterable[tuple]) -> None:
+        """Update metadata when activities have changed.
+
+        The keys are buffered and the metadata is updated on the next read
+        of the dataframe (see `flush`), so bulk edits only rebuild the
+        dataframe once. Three situations:
         1. An activity has been deleted.
         2. Activity data has been modified.
         3. An activity has been added.
@@ -119,58 +327,103 @@ class MetaDataStore(object):
 
         Parameters
         ----------
-        key : tuple
-            The specific activity to update in the MetaDataStore
+        keys : Iterable[tuple]
+            The activities to update in the MetaDataStore
         """
-        try:
-            act = bd.get_activity(
-                key
-            )  # if this does not work, it has been deleted (see except:).
-        except (UnknownObject, ActivityDataset.DoesNotExist):
-            # Situation 1: activity has been deleted (metadata needs to be deleted)
-            log.debug(f"Deleting activity from metadata: {key}")
-            self.dataframe.drop(key, inplace=True, errors="ignore")
-            # print('Dimensions of the Metadata:', self.dataframe.shape)
+        for key in keys:
+            self._pending[key] = True
+
+    def delete_many(self, keys: Iterable[tuple]) -> None:
+        """Remove deleted activities from the metadata on the next read of the
+        dataframe.
+
+        Parameters
+        ----------
+        keys : Iterable[tuple]
+            The deleted activities
+        """
+        for key in keys:
+            self._pending[key] = False
+        self._keys = dict()
+
+    def flush(self) -> None:
+        """Apply all buffered updates and deletions to the metadata.
+
+        The rows of all changed activities are dropped and the current data
+        of those that still exist is read in a single query per database and
+        appended. Activities of databases that are not (yet) in the metadata
+        are skipped, these are read when their database is added.
+        """
+        pending, self._pending = self._pending, dict()
+        keys = [key for key in pending if key[0] in self.databases]
+        if not keys:
             return
+        log.debug(f"Updating {len(keys)} activities in metadata")
+
+        dfs = [self._dataframe.drop(keys, errors="ignore")]
+        updated = dict()
+        for key in keys:
+            if pending[key]:
+                updated.setdefault(key[0], []).append(key[1])
+        for db_name, codes in updated.items():
+            df = self._load_database(db_name, codes)
+            if not df.empty:
+                dfs.append(df)
+        self.dataframe = self._concat(dfs)
+
+        for db_name in {key[0] for key in keys}:
+            self._update_modified(db_name)
+        # print('Dimensions of the Metadata:', self.dataframe.shape)
 
-        db = key[0]
-        if db not in self.databases:
-            # print('Database has not been added to metadata.')
-            self.add_metadata([db])
-        else:
-            if (
-                key in self.dataframe.index
-            ):  # Situation 2: activity has been modified (metadata needs to be updated)
-                log.debug(f"Updating activity in metadata: {key}")
-                for col in self.dataframe.columns:
-                    if col in self.CLASSIFICATION_SYSTEMS:
-                        # update classification data
-                        classification = self._unpacker(
-                            classifications=[act.get('classifications', '')],
-                            system=col)
-                        self.dataframe.at[key, col] = classification[0]
-                    else:
-                        self.dataframe.at[key, col] = act.get(col, '')
-                self.dataframe.at[key, 'key'] = act.key
-
-            else:  # Situation 3: Activity has been added to database (metadata needs to be generated)
-                log.debug(f'Adding activity to metadata: {key}')
-                df_new = pd.DataFrame([act.as_dict()], index=pd.MultiIndex.from_tuples([act.key]))
-                df_new['key'] = [act.key]
-                if act.get('classifications', False):  # add classification data if present
-                    df_new = self.unpack_classifications(df_new, self.CLASSIFICATION_SYSTEMS)
-                self.dataframe = pd.concat([self.dataframe, df_new], sort=False)
-                self.dataframe.replace(
-                    np.nan, "", regex=True, inplace=True
-                )  # replace 'nan' values with emtpy string
-            # print('Dimensions of the Metadata:', self.dataframe.shape)
+    def _update_modified(self, db_name: str) -> None:
+        """Keep the 'modified' timestamp of the database in line with the
+        metadata after it was updated.
+        """
+        if db_name in self.databases:
+            self.modified[db_name] = bd.databases.get(db_name, {}).get("modified")
 
     def reset_metadata(self) -> None:
-        """Deletes metadata when the project is changed."""
-        # todo: metadata could be collected across projects...
+        """Resets metadata when the project is changed.
+
+        The metadata of the previous project is kept for the `MAX_PROJECTS`
+        most recently used projects, and restored when switching back to one
+        of them. Databases modified in the meantime are dropped, and loaded
+        again when needed.
+        """
         log.debug("Reset metadata.")
+        # buffered updates belong to the previous project, its databases were
+        # modified by them and are dropped when restoring the metadata
+        self._pending = dict()
+        if self._project is not None and self.databases:
+            self._projects[self._project] = (
+                self._dataframe,
+                self.databases,
+                self.modified,
+            )
+            self._projects.move_to_end(self._project)
+            while len(self._projects) > self.MAX_PROJECTS:
+                self._projects.popitem(last=False)
         self.dataframe = pd.DataFrame()
         self.databases = set()
+        self.modified = dict()
+        self._keys = dict()
+
+        self._project = bd.projects.dir
+        if self._project not in self._projects:
+            return
+        dataframe, databases, modified = self._projects.pop(self._project)
+        valid = {
+            db
+            for db in databases
+            if db in bd.databases and bd.databases[db].get("modified") == modified[db]
+        }
+        if valid != databases:
+            dataframe = dataframe[dataframe["database"].isin(valid)]
+        if valid:
+            log.debug(f"Restored metadata of: {valid}")
+            self.dataframe = dataframe
+            self.databases = valid
+            self.modified = {db: modified[db] for db in valid}
 
     def get_existing_fields(self, field_list: list) -> list:
         """Return a list of fieldnames that exist in the current dataframe."""
@@ -179,12 +432,13 @@ class MetaDataStore(object):
     def get_metadata(self, keys: list, columns: list) -> pd.DataFrame:
         """Return a slice of the dataframe matching row and column identifiers.
 
-        NOTE: https://pandas.pydata.org/pandas-docs/stable/user_guide/indexing.html#deprecate-loc-reindex-listlike
+        NOTE: see
+        https://pandas.pydata.org/docs/user_guide/indexing.html#deprecate-loc-reindex-listlike
         From pandas version 1.0 and onwards, attempting to select a column
         with all NaN values will fail with a KeyError.
         """
         df = self.dataframe.loc[pd.IndexSlice[keys], :]
-        return df.reindex(columns, axis="columns")
+        return self.expand(df.reindex(columns, axis="columns"))
 
     def get_database_metadata(self, db_name: str) -> pd.DataFrame:
         """Return a slice of the dataframe matching the database.
@@ -206,7 +460,115 @@ class MetaDataStore(object):
             if bc.count_database_records(db_name) == 0:
                 return pd.DataFrame()
             self.add_metadata([db_name])
-        return self.dataframe.loc[self.dataframe["database"] == db_name].copy(deep=True)
+        df = self.dataframe.loc[self.dataframe["database"] == db_name]
+        return self.expand(df.copy(deep=True))
+
+    def get_labels(
+        self, keys: Iterable[tuple], fields: list, separator: str = " | "
+    ) -> dict:
+        """Return the labels of the keys that exist in the metadata.
+
+        A label is the string values of the fields joined by the separator.
+        Labels are generated for all new keys at once and cached per fields
+        and separator until the metadata changes.
+
+        Parameters
+        ----------
+        keys : Iterable[tuple]
+            Activity keys, other values are ignored
+        fields : list
+            Column-names of the metadata to include in the labels
+        separator : str
+            Separator to join the values with
+
+        Returns
+        -------
+        dict
+            The labels of the keys found in the metadata
+        """
+        dataframe = self.dataframe  # applying pending updates resets the cache
+        cache = self._labels.setdefault((tuple(fields), separator), dict())
+        keys = set(k for k in keys if isinstance(k, tuple) and len(k) == 2)
+        new = [k for k in keys if k not in cache]
+        if new:
+            if isinstance(dataframe.index, pd.MultiIndex):
+                positions = dataframe.index.get_indexer(pd.MultiIndex.from_tuples(new))
+            else:
+                positions = np.full(len(new), -1)
+            found = positions >= 0
+            rows = dataframe.iloc[positions[found]].reindex(fields, axis="columns")
+            values = zip(*(rows[field].astype(str).tolist() for field in fields))
+            labels = (separator.join(value) for value in values)
+            cache.update(zip((k for k, f in zip(new, found) if f), labels))
+            cache.update((k, None) for k, f in zip(new, found) if not f)
+        return {k: cache[k] for k in keys if cache[k] is not None}
+
+    def get_records(self, keys: Iterable[tuple], fields: list) -> dict:
+        """Return the values of the fields for each of the activity keys.
+
+        Activities of databases that are not part of the metadata are read
+        with a single query per database, without adding these databases to
+        the metadata. Empty values are returned as None.
+
+        Parameters
+        ----------
+        keys : Iterable[tuple]
+            Activity keys, keys that do not exist are left out
+        fields : list
+            Column-names of the metadata to return
+
+        Returns
+        -------
+        dict
+            Dictionary of {key: {field: value}}
+        """
+        dataframe = self.dataframe
+        keys = list(set(keys))
+        if isinstance(dataframe.index, pd.MultiIndex) and keys:
+            positions = dataframe.index.get_indexer(pd.MultiIndex.from_tuples(keys))
+        else:
+            positions = np.full(len(keys), -1)
+        frames = [dataframe.iloc[positions[positions >= 0]]]
+        missing = dict()
+        for key, position in zip(keys, positions):
+            if position < 0:
+                missing.setdefault(key[0], []).append(key[1])
+        frames.extend(self._load_database(db, codes) for db, codes in missing.items())
+
+        records = dict()
+        for df in frames:
+            if df.empty:
+                continue
+            values = df.reindex(fields, axis="columns").astype(object)
+            values = values.where(values.notna() & (values != ""), None)
+            records.update(
+                (key, dict(zip(fields, row)))
+                for key, row in zip(df.index, values.itertuples(index=False))
+            )
+        return records
+
+    def get_keys(self, ids: Iterable) -> list:
+        """Convert activity ids into keys, any other value is kept as-is.
+
+        Ids that are not known yet are read with a single query.
+        """
+        ids = list(ids)
+        new = list({i for i in ids if isinstance(i, int) and i not in self._keys})
+        for i in range(0, len(new), self.QUERY_CHUNK):
+            query = (
+                ActivityDataset.select(
+                    ActivityDataset.id, ActivityDataset.database, ActivityDataset.code
+                )
+                .where(ActivityDataset.id.in_(new[i : i + self.QUERY_CHUNK]))
+                .tuples()
+            )
+            self._keys.update((id_, (db, code)) for id_, db, code in query.iterator())
+        return [
+            (self._keys[i] if i in self._keys else bd.get_activity(i).key)
+            if isinstance(i, int)
+            else i
+            for i in ids
+        ]
 
     @property
     def index(self):
@@ -241,33 +603,28 @@ class MetaDataStore(object):
         )
 
     def unpack_classifications(self, df: pd.DataFrame, systems: list) -> pd.DataFrame:
-        """Unpack classifications column to a new column for every classification system in 'systems'.
+        """Unpack classifications column to a new column for every classification
+        system in 'systems'.
 
         Will return dataframe with added column.
         """
         classifications = list(df['classifications'].values)
-        system_cols = []
-        for system in systems:
-            system_cols.append(self._unpacker(classifications, system))
-        # creating the DF rotated is easier so we do that and then transpose
-        unpacked = pd.DataFrame(system_cols, columns=df.index, index=systems).T
-
-        # Finally, merge the df with the new unpacked df using indexes
-        df = pd.merge(
-            df, unpacked, how='inner', left_index=True,
-            right_index=True, sort=False
-        )
-        return df
+        unpacked = {
+            system: self._unpacker(classifications, system) for system in systems
+        }
+        return df.assign(**unpacked)
 
     def _unpacker(self, classifications: list, system: str) -> list:
         """Iterate over all 'c' lists in 'classifications'
-        and add those matching 'system' to list 'system_classifications', when no matches, add empty string.
-        If 'c' is not a list, add empty string.
+        and add those matching 'system' to list 'system_classifications', when no
+        matches, add empty string. If 'c' is not a list, add empty string.
 
-        Always returns a list 'system_classifications' where len(system_classifications) == len(classifications).
+        Always returns a list 'system_classifications' where
+        len(system_classifications) == len(classifications).
 
-        Testing showed that converting to list and doing the checks on a list is ~5x faster than keeping
-        data in DF and using a df.apply() function, we do this now (difference was ~0.4s vs ~2s).
+        Testing showed that converting to list and doing the checks on a list is ~5x
+        faster than keeping data in DF and using a df.apply() function, we do this now
+        (difference was ~0.4s vs ~2s).
         """
         system_classifications = []
         for c in classifications:
@@ -4,19 +4,43 @@ from typing import Optional, Union
 from logging import getLogger
 
 import bw2calc as bc
+# Plain bw2data (patched in place by activity_browser.mod) keeps this module
+# free of Qt, see `_calculate_chunk`
+import bw2data as bd
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from stats_arrays import MCRandomNumberGenerator
 
-from activity_browser.mod import bw2data as bd
-
 from .manager import MonteCarloParameterManager
+from .parallel import init_project_worker, process_pool
 
 log = getLogger(__name__)
 
 
 class MonteCarloLCA(object):
-    """A Monte Carlo LCA for multiple reference flows and methods loaded from a calculation setup."""
+    """A Monte Carlo LCA for multiple reference flows and methods loaded from a
+    calculation setup.
+    """
+
+    # Attributes holding the results of a simulation, see `simulation_data`
+    SIMULATION_DATA = (
+        "results",
+        "A_values",
+        "B_values",
+        "A_structure",
+        "B_structure",
+        "CF_dict",
+        "parameter_exchanges",
+        "parameters",
+        "parameter_data",
+    )
+    UNIFIED_PARAMS_DTYPE = [
+        ("row", "<u4"),
+        ("col", "<u4"),
+        ("type", "u1"),
+        ("amount", "<f4"),
+    ]
 
     def __init__(self, cs_name):
         if cs_name not in bd.calculation_setups:
@@ -56,9 +80,12 @@ class MonteCarloLCA(object):
         self.method_index = {m: i for i, m in enumerate(self.methods)}
         self.rev_method_index = {i: m for i, m in enumerate(self.methods)}
 
-        # GSA calculation variables
-        self.A_matrices = list()
-        self.B_matrices = list()
+        # GSA calculation variables, the values of the technosphere and
+        # biosphere matrices are stored per iteration, see `store_matrix_values`
+        self.A_values = np.zeros((0, 0), dtype=np.float32)
+        self.B_values = np.zeros((0, 0), dtype=np.float32)
+        self.A_structure: Optional[sparse.csr_matrix] = None
+        self.B_structure: Optional[sparse.csr_matrix] = None
         self.CF_dict = defaultdict(list)
         self.parameter_exchanges = list()
         self.parameters = list()
@@ -68,6 +95,23 @@ class MonteCarloLCA(object):
 
         self.lca = bc.LCA(demand=self.func_units_dict, method=self.methods[0])
 
+    def param_exchange_rowcol(self, x) -> Optional[tuple]:
+        """Convert a parameterized exchange from input/output keys into
+        row/col values using dicts generated in bw.LCA object.
+
+        Returns None if the exchange does not exist in the current LCA matrix.
+        """
+        if x["type"] in [0, 1]:
+            row = self.lca.activity_dict.get(x["input"], None)
+            col = self.lca.product_dict.get(x["output"], None)
+        else:
+            row = self.lca.biosphere_dict.get(x["input"], None)
+            col = self.lca.activity_dict.get(x["output"], None)
+        # if either the row or the column is None, return None.
+        if row is None or col is None:
+            return None
+        return row, col, x["type"], x["amount"]
+
     def unify_param_exchanges(self, data: np.ndarray) -> np.ndarray:
         """Convert an array of parameterized exchanges from input/output keys
         into row/col values using dicts generated in bw.LCA object.
@@ -75,27 +119,75 @@ class MonteCarloLCA(object):
         If any given exchange does not exist in the current LCA matrix,
         it will be dropped from the returned array.
         """
-
-        def key_to_rowcol(x) -> Optional[tuple]:
-            if x["type"] in [0, 1]:
-                row = self.lca.activity_dict.get(x["input"], None)
-                col = self.lca.product_dict.get(x["output"], None)
-            else:
-                row = self.lca.biosphere_dict.get(x["input"], None)
-                col = self.lca.activity_dict.get(x["output"], None)
-            # if either the row or the column is None, return np.NaN.
-            if row is None or col is None:
-                return None
-            return row, col, x["type"], x["amount"]
-
         # Convert the data and store in a new array, dropping Nones.
-        converted = (key_to_rowcol(d) for d in data)
+        converted = (self.param_exchange_rowcol(d) for d in data)
         unified = np.array(
             [x for x in converted if x is not None],
-            dtype=[("row", "<u4"), ("col", "<u4"), ("type", "u1"), ("amount", "<f4")],
+            dtype=self.UNIFIED_PARAMS_DTYPE,
         )
         return unified
 
+    def index_param_exchanges(self) -> None:
+        """Match the parameterized exchanges against the `tech_params` and
+        `bio_params` arrays of the LCA.
+
+        The order of the parameterized exchanges never changes between
+        iterations, so the matching is done once and stored as index arrays:
+
+        - `param_keep`: the parameterized exchanges that exist in the LCA.
+        - `param_template`: these exchanges as a unified row/col array.
+        - `tech_param_idx` and `tech_param_src`: the positions in the
+          `tech_params` array and the matching positions in `param_template`,
+          `bio_param_idx` and `bio_param_src` likewise for `bio_params`.
+        """
+        data = self.param_rng.indices.mock_params(np.zeros(len(self.param_rng.indices)))
+        keep, rows = [], []
+        for i, x in enumerate(data):
+            rowcol = self.param_exchange_rowcol(x)
+            if rowcol is not None:
+                keep.append(i)
+                rows.append(rowcol)
+        self.param_keep = np.array(keep, dtype=int)
+        self.param_template = np.array(rows, dtype=self.UNIFIED_PARAMS_DTYPE)
+
+        is_tech = np.isin(self.param_template["type"], [0, 1])
+        self.tech_param_idx, self.tech_param_src = self._match_params(
+            self.lca.tech_params, np.flatnonzero(is_tech)
+        )
+        self.bio_param_idx, self.bio_param_src = self._match_params(
+            self.lca.bio_params, np.flatnonzero(self.param_template["type"] == 2)
+        )
+
+    def _match_params(self, params: np.ndarray, subset: np.ndarray) -> tuple:
+        """Return the positions in `params` with the same row/col/type as the
+        `subset` of `param_template`, and for each of these positions the
+        matching index in `param_template`.
+        """
+
+        def combine(array: np.ndarray) -> np.ndarray:
+            # Combine row, col and type into a single sortable integer
+            return (
+                array["row"].astype(np.int64) * n_cols + array["col"].astype(np.int64)
+            ) * 256 + array["type"].astype(np.int64)
+
+        n_cols = 1 + max(
+            int(params["col"].max(initial=0)),
+            int(self.param_template["col"].max(initial=0)),
+        )
+        params_keys = combine(params)
+        order = np.argsort(params_keys, kind="stable")
+        sorted_keys = params_keys[order]
+        subset_keys = combine(self.param_template[subset])
+        start = np.searchsorted(sorted_keys, subset_keys, side="left")
+        counts = np.searchsorted(sorted_keys, subset_keys, side="right") - start
+        # Expand the matches, a single exchange can occur more than once
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        idx = order[np.repeat(start, counts) + offsets]
+        src = np.repeat(subset, counts)
+        return idx, src
+
     def load_data(self) -> None:
         """Constructs the random number generators for all of the matrices that
         can be altered by uncertainty.
@@ -104,7 +196,7 @@ class MonteCarloLCA(object):
         amounts of the 'params' matrices are used in place of generating
         a vector
         """
-        self.lca.load_lci_data()
+        self.load_lci()
 
         self.tech_rng = (
             MCRandomNumberGenerator(self.lca.tech_params, seed=self.seed)
@@ -133,16 +225,25 @@ class MonteCarloLCA(object):
         if self.include_parameters:
             self.param_rng = MonteCarloParameterManager(seed=self.seed)
 
+    def load_lci(self) -> None:
+        """Load the LCI data of the `lca` and construct its reverse dicts."""
+        self.lca.load_lci_data()
         (
             self.lca.activity_dict_rev,
             self.lca.product_dict_rev,
             self.lca.biosphere_dict_rev,
         ) = self.lca.reverse_dict()
 
-    def calculate(self, iterations=10, seed: int = None, **kwargs):
+    def calculate(self, iterations=10, seed: int = None, workers: int = 1, **kwargs):
         """Main calculate method for the MC LCA class, allows fine-grained control
         over which uncertainties are included when running MC sampling.
+
+        If more than one worker is given, the iterations are calculated in
+        separate processes, see `calculate_parallel`.
         """
+        if workers > 1 and iterations > 1:
+            return self.calculate_parallel(iterations, seed, workers, **kwargs)
+
         start = time()
         self.iterations = iterations
         self.seed = seed or bc.utils.get_seed()
@@ -156,8 +257,10 @@ class MonteCarloLCA(object):
         self.results = np.zeros((iterations, len(self.func_units), len(self.methods)))
 
         # Reset GSA variables to empty.
-        self.A_matrices = list()
-        self.B_matrices = list()
+        self.A_structure = self.matrix_structure(self.lca.technosphere_matrix)
+        self.B_structure = self.matrix_structure(self.lca.biosphere_matrix)
+        self.A_values = np.zeros((iterations, self.A_structure.nnz), dtype=np.float32)
+        self.B_values = np.zeros((iterations, self.B_structure.nnz), dtype=np.float32)
         self.CF_dict = defaultdict(list)
         self.parameter_exchanges = list()
         self.parameters = list()
@@ -168,6 +271,9 @@ class MonteCarloLCA(object):
             # Add a values field to handle all the sampled parameter values.
             for k in self.parameter_data:
                 self.parameter_data[k]["values"] = []
+            self.index_param_exchanges()
+            # Sample and recalculate the parameters for all iterations at once
+            param_amounts = self.param_rng.sample_matrix(iterations)[:, self.param_keep]
 
         for iteration in range(iterations):
             tech_vector = (
@@ -175,39 +281,17 @@ class MonteCarloLCA(object):
             )
             bio_vector = self.bio_rng.next() if self.include_biosphere else self.bio_rng
             if self.include_parameters:
-                # Convert the input/output keys into row/col keys, and then match them against
-                # the tech_ and bio_params
-                data = self.param_rng.next()
-                param_exchanges = self.unify_param_exchanges(data)
-
-                # Select technosphere subset from param_exchanges.
-                subset = param_exchanges[np.isin(param_exchanges["type"], [0, 1])]
-                # Create index of where to insert new values from tech_params array.
-                idx = np.argwhere(
-                    np.isin(
-                        self.lca.tech_params[self.param_cols], subset[self.param_cols]
-                    )
-                ).flatten()
-                # Construct unique array of row+col+type combinations
-                uniq = np.unique(self.lca.tech_params[idx][self.param_cols])
-                # Use the unique array to sort the subset (ensures values
-                # are inserted at the correct index)
-                sort_idx = np.searchsorted(uniq, subset[self.param_cols])
-                # Finally, insert the sorted subset amounts into the tech_vector
-                # at the correct indexes.
-                tech_vector[idx] = subset[sort_idx]["amount"]
-                # Repeat the above, but for the biosphere array.
-                subset = param_exchanges[param_exchanges["type"] == 2]
-                idx = np.argwhere(
-                    np.isin(
-                        self.lca.bio_params[self.param_cols], subset[self.param_cols]
-                    )
-                ).flatten()
-                uniq = np.unique(self.lca.bio_params[idx][self.param_cols])
-                sort_idx = np.searchsorted(uniq, subset[self.param_cols])
-                bio_vector[idx] = subset[sort_idx]["amount"]
+                # Insert the recalculated amounts of the parameterized
+                # exchanges at their (precomputed) positions in the vectors
+                amounts = param_amounts[iteration]
+                tech_vector[self.tech_param_idx] = amounts[self.tech_param_src]
+                bio_vector[self.bio_param_idx] = amounts[self.bio_param_src]
+
+                param_exchanges = self.param_template.copy()
+                param_exchanges["amount"] = amounts
 
                 # Store parameter data for GSA
+                self.param_rng.select_sample(iteration)
                 self.parameter_exchanges.append(param_exchanges)
                 self.parameters.append(self.param_rng.parameters.to_gsa())
                 # Extract sampled values for parameters, store.
@@ -216,15 +300,16 @@ class MonteCarloLCA(object):
             self.lca.rebuild_technosphere_matrix(tech_vector)
             self.lca.rebuild_biosphere_matrix(bio_vector)
 
-            # store matrices for GSA
-            self.A_matrices.append(self.lca.technosphere_matrix)
-            self.B_matrices.append(self.lca.biosphere_matrix)
+            # store matrix values for GSA
+            self.A_values[iteration] = self.lca.technosphere_matrix.data
+            self.B_values[iteration] = self.lca.biosphere_matrix.data
 
             if not hasattr(self.lca, "demand_array"):
                 self.lca.build_demand_array()
             self.lca.lci_calculation()
 
-            # pre-calculating CF vectors enables the use of the SAME CF vector for each FU in a given run
+            # pre-calculating CF vectors enables the use of the SAME CF vector for
+            # each FU in a given run
             cf_vectors = {}
             for m in self.methods:
                 cf_vectors[m] = (
@@ -245,10 +330,127 @@ class MonteCarloLCA(object):
                     self.results[iteration, row, col] = self.lca.score
 
         log.info(
-            f"Monte Carlo LCA: finished {iterations} iterations for {len(self.func_units)} reference flows and "
-            f"{len(self.methods)} methods in {np.round(time() - start, 2)} seconds."
+            f"Monte Carlo LCA: finished {iterations} iterations for "
+            f"{len(self.func_units)} reference flows and {len(self.methods)} methods "
+            f"in {np.round(time() - start, 2)} seconds."
         )
 
+    def calculate_parallel(
+        self, iterations=10, seed: int = None, workers: int = 2, **kwargs
+    ):
+        """Calculate the Monte Carlo iterations in a pool of worker processes.
+
+        The iterations are split into one chunk per worker, each chunk is
+        calculated by a separate `MonteCarloLCA` with a seed derived from the
+        given seed. Results are identical for the same seed and number of
+        workers.
+        """
+        start = time()
+        self.iterations = iterations
+        self.seed = seed or bc.utils.get_seed()
+        self.include_technosphere = kwargs.get("technosphere", True)
+        self.include_biosphere = kwargs.get("biosphere", True)
+        self.include_cfs = kwargs.get("cf", True)
+        self.include_parameters = kwargs.get("parameters", True)
+        includes = {
+            "technosphere": self.include_technosphere,
+            "biosphere": self.include_biosphere,
+            "cf": self.include_cfs,
+            "parameters": self.include_parameters,
+        }
+
+        # the workers only return the simulation data, the matrices and
+        # dicts of the `lca` are loaded here
+        self.load_lci()
+
+        chunks = [
+            len(chunk)
+            for chunk in np.array_split(np.arange(iterations), workers)
+            if len(chunk)
+        ]
+        seeds = [
+            int(child.generate_state(1)[0])
+            for child in np.random.SeedSequence(self.seed).spawn(len(chunks))
+        ]
+        with process_pool(
+            len(chunks),
+            initializer=init_project_worker,
+            initargs=(bd.projects.base_dir,),
+        ) as pool:
+            outputs = list(
+                pool.map(
+                    _calculate_chunk,
+                    [bd.projects.current] * len(chunks),
+                    [self.cs_name] * len(chunks),
+                    chunks,
+                    seeds,
+                    [includes] * len(chunks),
+                )
+            )
+        self.merge_simulation_data(outputs)
+
+        log.info(
+            f"Monte Carlo LCA: finished {iterations} iterations for "
+            f"{len(self.func_units)} reference flows and {len(self.methods)} methods "
+            f"in {np.round(time() - start, 2)} seconds using {len(chunks)} processes."
+        )
+
+    def simulation_data(self) -> dict:
+        """Return the (picklable) results of the last simulation."""
+        data = {name: getattr(self, name) for name in self.SIMULATION_DATA}
+        data["CF_dict"] = dict(data["CF_dict"])
+        data["parameter_data"] = dict(data["parameter_data"])
+        return data
+
+    def merge_simulation_data(self, data: list) -> None:
+        """Combine the simulation data of several (partial) simulations, in
+        the given order.
+        """
+        self.results = np.concatenate([d["results"] for d in data], axis=0)
+        self.A_values = np.concatenate([d["A_values"] for d in data], axis=0)
+        self.B_values = np.concatenate([d["B_values"] for d in data], axis=0)
+        self.A_structure = data[0]["A_structure"]
+        self.B_structure = data[0]["B_structure"]
+        self.CF_dict = defaultdict(list)
+        for d in data:
+            for method, cfs in d["CF_dict"].items():
+                self.CF_dict[method].extend(cfs)
+        self.parameter_exchanges = [p for d in data for p in d["parameter_exchanges"]]
+        self.parameters = [p for d in data for p in d["parameters"]]
+        if self.include_parameters:
+            self.parameter_data = defaultdict(dict, data[0]["parameter_data"])
+            for d in data[1:]:
+                for key, values in d["parameter_data"].items():
+                    self.parameter_data[key]["values"].extend(values["values"])
+
+    @staticmethod
+    def matrix_structure(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Return a matrix with the sparsity structure of the given matrix,
+        where each entry holds its (1-based) position in the matrix data.
+
+        The technosphere and biosphere matrices keep the same structure in
+        every iteration, so only their data is stored, as a row in the
+        `A_values` and `B_values` arrays.
+        """
+        matrix = matrix.tocsr()
+        return sparse.csr_matrix(
+            (np.arange(1, matrix.nnz + 1), matrix.indices.copy(), matrix.indptr.copy()),
+            shape=matrix.shape,
+        )
+
+    def exchange_columns(self, indices: list, biosphere: bool = False) -> np.ndarray:
+        """Return the columns in the `A_values` (or `B_values`) array of the
+        given (row, col) matrix indices.
+        """
+        structure = self.B_structure if biosphere else self.A_structure
+        if not indices:
+            return np.zeros(0, dtype=int)
+        rows, cols = zip(*indices)
+        columns = np.asarray(structure[list(rows), list(cols)]).ravel() - 1
+        if (columns < 0).any():
+            raise ValueError("Not all exchanges are part of the simulated matrices.")
+        return columns
+
     @property
     def func_units_dict(self) -> dict:
         """Return a dictionary of reference flows (key, demand)."""
@@ -258,7 +460,8 @@ class MonteCarloLCA(object):
         """Get a slice or all of the results.
         - if a method is provided, results will be given for all reference flows and runs
         - if a reference flow is provided, results will be given for all impact categories and runs
-        - if a reference flow and impact category is provided, results will be given for all runs of that combination
+        - if a reference flow and impact category is provided, results will be given
+          for all runs of that combination
         - if nothing is given, all results are returned
         """
 
@@ -327,6 +530,22 @@ class MonteCarloLCA(object):
         return translated_keys
 
 
+def _calculate_chunk(
+    project: str,
+    cs_name: str,
+    iterations: int,
+    seed: int,
+    includes: dict,
+) -> dict:
+    """Calculate a chunk of Monte Carlo iterations in a worker process, see
+    `bwutils.parallel`.
+    """
+    bd.projects.set_current(project, writable=False, update=False)
+    mc = MonteCarloLCA(cs_name)
+    mc.calculate(iterations=iterations, seed=seed, **includes)
+    return mc.simulation_data()
+
+
 def perform_MonteCarlo_LCA(project="default", cs_name=None, iterations=10):
     """Performs Monte Carlo LCA based on a calculation setup and returns the
     Monte Carlo LCA object."""
@@ -1,11 +1,12 @@
 from collections import OrderedDict
-from typing import Iterable, Optional, Union
+from collections.abc import Mapping
+from typing import Callable, Hashable, Iterable, Optional, Tuple, Union
 from logging import getLogger
 
-import bw2analyzer as ba
 import bw2calc as bc
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from PySide2.QtWidgets import QApplication, QMessageBox
 
 from activity_browser.mod import bw2data as bd
@@ -13,9 +14,60 @@ from activity_browser.mod import bw2data as bd
 from .commontasks import wrap_text
 from .errors import ReferenceFlowValueError
 from .metadata import AB_metadata
+from .parallel import characterize, solve
 
 log = getLogger(__name__)
-ca = ba.ContributionAnalysis()
+
+
+class LazyMatrixStore(Mapping):
+    """Read-only mapping of which the values are built on request.
+
+    Only the keys are stored, values are (re)built by the given `builder`
+    callable when requested and kept in a bounded least-recently-used cache.
+    This keeps memory use flat for the large number of sparse matrices that
+    (Superstructure)MLCA can produce, which are rarely all looked at.
+
+    Parameters
+    ----------
+    builder : Callable returning the value for a given key
+    maxsize : Number of built values to keep in memory
+    """
+
+    def __init__(self, builder: Callable[[Hashable], object], maxsize: int = 16):
+        self.builder = builder
+        self.maxsize = maxsize
+        self._keys = dict()
+        self._cache = OrderedDict()
+
+    def register(self, *keys: Hashable) -> None:
+        """Make the given keys available in the store."""
+        for key in keys:
+            self._keys[key] = None
+            self._cache.pop(key, None)
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def __getitem__(self, key: Hashable):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        value = self.builder(key)
+        self._cache[key] = value
+        if len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
 
 
 class MLCA(object):
@@ -38,6 +90,10 @@ class MLCA(object):
     ----------
     cs_name : str
         Name of the calculation setup
+    results : dict, optional
+        Previously calculated results, as returned by `results_to_arrays`
+        (see `LCAResultCache`). The LCI data and characterization matrices
+        are then only loaded when they are first used, see `load_lci`.
 
     Attributes
     ----------
@@ -64,6 +120,9 @@ class MLCA(object):
         calculations
     method_matrices: list
         Contains the characterization matrix for each impact category.
+    characterization_factors: `numpy.ndarray`
+        2-dimensional array of shape (`methods`, `biosphere`) holding the
+        diagonals of `method_matrices`, stacked per impact category
     lca_scores: `numpy.ndarray`
         2-dimensional array of shape (`func_units`, `methods`) holding the
         calculated LCA scores of each combination of reference flow and
@@ -80,11 +139,11 @@ class MLCA(object):
         Contains the calculated technosphere flows per reference flow
     inventory: dict
         Life cycle inventory (biosphere flows) per reference flow
-    inventories: dict
-        Biosphere flows per reference flow and impact category combination
-    characterized_inventories: dict
+    inventories: `LazyMatrixStore`
+        Biosphere flows per reference flow, built on request
+    characterized_inventories: `LazyMatrixStore`
         Inventory multiplied by scaling (relative impact on environment) per
-        reference flow and impact category combination
+        reference flow and impact category combination, built on request
     elementary_flow_contributions: `numpy.ndarray`
         3-dimensional array of shape (`func_units`, `methods`, `biosphere`)
         which holds the characterized inventory results summed along the
@@ -108,7 +167,19 @@ class MLCA(object):
 
     """
 
-    def __init__(self, cs_name: str):
+    # Names of the result attributes, see `results_to_arrays`
+    RESULT_ARRAYS = (
+        "lca_scores",
+        "elementary_flow_contributions",
+        "process_contributions",
+    )
+    LCI_RESULTS = ("scaling_factors", "technosphere_flows", "inventory")
+    # Matrix indexes of the activities, products and biosphere flows
+    KEY_ARRAYS = ("activity_keys", "product_keys", "biosphere_keys")
+    # Attributes that only exist once the LCI data is loaded, see `__getattr__`
+    LCI_ATTRIBUTES = ("lca", "method_matrices", "characterization_factors")
+
+    def __init__(self, cs_name: str, results: Optional[dict] = None):
         try:
             cs = bd.calculation_setups[cs_name]
         except KeyError:
@@ -140,21 +211,6 @@ class MLCA(object):
         self.method_index = {m: i for i, m in enumerate(self.methods)}
         self.rev_method_index = {v: k for k, v in self.method_index.items()}
 
-        # initial LCA and prepare method matrices
-        self.lca = self._construct_lca()
-        self.lca.lci(factorize=True)
-        self.method_matrices = []
-        for method in self.methods:
-            self.lca.switch_method(method)
-            self.method_matrices.append(self.lca.characterization_matrix)
-
-        self.lca_scores = np.zeros((len(self.func_units), len(self.methods)))
-
-        # data to be stored
-        (self.rev_activity_dict, self.rev_product_dict, self.rev_biosphere_dict) = (
-            self.lca.reverse_dict()
-        )
-
         # Scaling
         self.scaling_factors = dict()
 
@@ -163,24 +219,11 @@ class MLCA(object):
         # Life cycle inventory (biosphere flows) by reference flow
         self.inventory = dict()
         # Inventory (biosphere flows) for specific reference flow (e.g. 2000x15000) and impact category.
-        self.inventories = dict()
+        # These are sparse matrices, only rebuilt from the scaling factors when requested.
+        self.inventories = LazyMatrixStore(self._build_inventory)
         # Inventory multiplied by scaling (relative impact on environment) per impact category.
-        self.characterized_inventories = dict()
-
-        # Summarized contributions for EF and processes.
-        self.elementary_flow_contributions = np.zeros(
-            (
-                len(self.func_units),
-                len(self.methods),
-                self.lca.biosphere_matrix.shape[0],
-            )
-        )
-        self.process_contributions = np.zeros(
-            (
-                len(self.func_units),
-                len(self.methods),
-                self.lca.technosphere_matrix.shape[0],
-            )
+        self.characterized_inventories = LazyMatrixStore(
+            self._build_characterized_inventory
         )
 
         self.func_unit_translation_dict = {}
@@ -202,59 +245,281 @@ class MLCA(object):
         }
         self.func_key_list = list(self.func_unit_translation_dict.keys())
 
+        # identifies the calculation and its inputs, see `LCAResultCache`
+        self.calculation_key: Optional[str] = None
+
+        self._lci_loaded = results is None
+        if results is None:
+            self.load_lci()
+            self._allocate_results()
+        else:
+            self.arrays_to_results(results)
+
+    def __getattr__(self, name: str):
+        # Only called for attributes that are not set: the LCI data of results
+        # loaded from the cache is loaded on first use.
+        if name in self.LCI_ATTRIBUTES and not self.__dict__.get("_lci_loaded", True):
+            self.load_lci()
+            return getattr(self, name)
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    def load_lci(self) -> None:
+        """Load the LCI data and prepare the method matrices, the technosphere
+        matrix is only factorized once results are actually calculated.
+        """
+        self._lci_loaded = True
+        self.lca = self._construct_lca()
+        self.lca.load_lci_data()
+        self.method_matrices = []
+        for method in self.methods:
+            self.lca.switch_method(method)
+            self.method_matrices.append(self.lca.characterization_matrix)
+        self.characterization_factors = np.vstack(
+            [cf_matrix.diagonal() for cf_matrix in self.method_matrices]
+        )
+        (self.rev_activity_dict, self.rev_product_dict, self.rev_biosphere_dict) = (
+            self.lca.reverse_dict()
+        )
+
+    def _allocate_results(self) -> None:
+        """Create the (empty) arrays for the LCA scores and the summarized
+        contributions for EF and processes.
+        """
+        self.lca_scores = np.zeros((len(self.func_units), len(self.methods)))
+        self.elementary_flow_contributions = np.zeros(
+            (
+                len(self.func_units),
+                len(self.methods),
+                self.lca.biosphere_matrix.shape[0],
+            )
+        )
+        self.process_contributions = np.zeros(
+            (
+                len(self.func_units),
+                len(self.methods),
+                self.lca.technosphere_matrix.shape[0],
+            )
+        )
+
+    def _writable_results(self) -> None:
+        """Copy result arrays loaded read-only from the cache before they
+        are calculated again.
+        """
+        for name in self.RESULT_ARRAYS:
+            array = getattr(self, name)
+            if not array.flags.writeable:
+                setattr(self, name, np.array(array))
+
     def _construct_lca(self):
         return bc.LCA(demand=self.func_units_dict, method=self.methods[0])
 
-    def _perform_calculations(self):
-        """Isolates the code which performs calculations to allow subclasses
-        to either alter the code or redo calculations after matrix substitution.
+    def _build_demand_matrix(self) -> np.ndarray:
+        """Build a dense (products, reference flows) demand matrix with a
+        single column per reference flow, ordered as `func_units`.
         """
-        for row, func_unit in enumerate(self.func_units):
-            # Do the LCA for the current reference flow
-            try:
-                self.lca.redo_lci(func_unit)
-            except:
-                # bw25 compatibility
-                key = list(func_unit.keys())[0]
-                self.lca.redo_lci({bd.get_activity(key).id: func_unit[key]})
+        demand = np.zeros((self.lca.technosphere_matrix.shape[0], len(self.func_units)))
+        for col, func_unit in enumerate(self.func_units):
+            for key, amount in func_unit.items():
+                try:
+                    demand[self.lca.product_dict[key], col] = amount
+                except AttributeError:
+                    # bw25 compatibility requires activity id instead of activity key
+                    index = self.lca.dicts.product[bd.get_activity(key).id]
+                    demand[index, col] = amount
+        return demand
+
+    def _solve_demand_matrix(self, demand: np.ndarray) -> np.ndarray:
+        """Solve the technosphere for all columns of the demand matrix at once.
+
+        The technosphere matrix is factorized once (if it wasn't already) and
+        the factorization is reused for every right-hand side. Returns the
+        supply arrays as a (activities, reference flows) matrix.
+        """
+        if not hasattr(self.lca, "solver"):
+            self.lca.decompose_technosphere()
+        return solve(self.lca.solver, demand)
+
+    def _biosphere_matrix(self, key) -> sparse.spmatrix:
+        """Return the biosphere matrix used to calculate the inventory `key`."""
+        return self.lca.biosphere_matrix
+
+    def _build_inventory(self, key) -> sparse.spmatrix:
+        """Rebuild the life-cycle inventory (disaggregated by contributing
+        process) of the given `inventories` key from its scaling factors.
+        """
+        supply = self.scaling_factors[key]
+        count = supply.shape[0]
+        return self._biosphere_matrix(key) * sparse.spdiags([supply], [0], count, count)
+
+    def _build_characterized_inventory(self, key: tuple) -> sparse.spmatrix:
+        """Rebuild the characterized inventory for the (reference flow index,
+        method index) `key`.
+        """
+        row, col = key
+        inventory = self.inventories[self._lci_key(self.func_units[row])]
+        return self.method_matrices[col] * inventory
+
+    def _lcia_calculation(self, supply: np.ndarray, inventory: np.ndarray) -> tuple:
+        """Characterize the inventories of all reference flows for all impact
+        categories at once, using the stacked `characterization_factors`.
+
+        Parameters
+        ----------
+        supply : (activities, reference flows) matrix of supply arrays
+        inventory : (biosphere, reference flows) matrix of summed inventories
 
+        Returns
+        -------
+        The LCA scores of shape (reference flows, methods), and the elementary
+        flow and process contributions of shape (reference flows, methods,
+        biosphere/technosphere)
+
+        """
+        return characterize(
+            self.characterization_factors, self.lca.biosphere_matrix, supply, inventory
+        )
+
+    def _store_lci_results(
+        self,
+        supply: np.ndarray,
+        technosphere_flows: np.ndarray,
+        inventory: np.ndarray,
+        scenario: Optional[int] = None,
+    ) -> None:
+        """Store the (activities/biosphere, reference flows) LCI result matrices
+        per reference flow.
+        """
+        for row, func_unit in enumerate(self.func_units):
+            key = self._lci_key(func_unit, scenario)
             # Now update the:
             # - Scaling factors
             # - Technosphere flows
             # - Life cycle inventory
             # - Life-cycle inventory (disaggregated by contributing process)
             # for current reference flow
-            self.scaling_factors.update({str(func_unit): self.lca.supply_array})
-            self.technosphere_flows.update(
-                {
-                    str(func_unit): np.multiply(
-                        self.lca.supply_array, self.lca.technosphere_matrix.diagonal()
-                    )
-                }
-            )
-            self.inventory.update(
-                {str(func_unit): np.array(self.lca.inventory.sum(axis=1)).ravel()}
-            )
-            self.inventories.update({str(func_unit): self.lca.inventory})
-
-            # Now, for each method, take the current reference flow and do inventory analysis
-            for col, cf_matrix in enumerate(self.method_matrices):
-                self.lca.characterization_matrix = cf_matrix
-                self.lca.lcia_calculation()
-                self.lca_scores[row, col] = self.lca.score
-                self.characterized_inventories[row, col] = (
-                    self.lca.characterized_inventory.copy()
-                )
-                self.elementary_flow_contributions[row, col] = np.array(
-                    self.lca.characterized_inventory.sum(axis=1)
-                ).ravel()
-                self.process_contributions[row, col] = (
-                    self.lca.characterized_inventory.sum(axis=0)
+            self.scaling_factors.update({key: supply[:, row]})
+            self.technosphere_flows.update({key: technosphere_flows[:, row]})
+            self.inventory.update({key: inventory[:, row]})
+            self.inventories.register(key)
+            self.characterized_inventories.register(
+                *(
+                    self._lcia_key(row, col, scenario)
+                    for col in range(len(self.methods))
                 )
+            )
+
+    @staticmethod
+    def _lci_key(func_unit: dict, scenario: Optional[int] = None):
+        """Key of a reference flow in the LCI result dictionaries."""
+        return str(func_unit)
+
+    @staticmethod
+    def _lcia_key(row: int, col: int, scenario: Optional[int] = None) -> tuple:
+        """Key of a reference flow and method in `characterized_inventories`."""
+        return row, col
+
+    def _perform_calculations(self):
+        """Isolates the code which performs calculations to allow subclasses
+        to either alter the code or redo calculations after matrix substitution.
+
+        All reference flows are solved in a single pass against the factorized
+        technosphere matrix, after which the results are stored per reference flow.
+        """
+        self._writable_results()
+        demand = self._build_demand_matrix()
+        supply = self._solve_demand_matrix(demand)
+        technosphere_flows = np.multiply(
+            supply, self.lca.technosphere_matrix.diagonal()[:, np.newaxis]
+        )
+        inventory = self.lca.biosphere_matrix @ supply
+        self._store_lci_results(supply, technosphere_flows, inventory)
+
+        # Characterize all reference flows for all impact categories at once
+        (
+            self.lca_scores[:],
+            self.elementary_flow_contributions[:],
+            self.process_contributions[:],
+        ) = self._lcia_calculation(supply, inventory)
 
     def calculate(self):
         self._perform_calculations()
 
+    def _scenarios(self) -> list:
+        """Scenario indexes the results are calculated for."""
+        return [None]
+
+    def update_lca_calculation_for_sankey(
+        self, scenario_index: Optional[int], func_unit: dict, method_index: int
+    ) -> None:
+        """Prepare the LCA object for the reference flow and impact category,
+        reusing the factorized technosphere matrix, before traversing its
+        supply chain graph.
+
+        Parameters
+        ----------
+        scenario_index : Index of the scenario, unused without scenarios
+        func_unit : The reference flow to calculate
+        method_index : Index of the impact category to calculate
+
+        """
+        try:
+            self.lca.build_demand_array(func_unit)
+        except:
+            # brightway25 compatibility
+            key = list(func_unit.keys())[0]
+            self.lca.build_demand_array({bd.get_activity(key).id: func_unit[key]})
+        self.lca.demand = func_unit
+        if not hasattr(self.lca, "solver"):
+            self.lca.decompose_technosphere()
+        self.lca.lci_calculation()
+        self.lca.characterization_matrix = self.method_matrices[method_index]
+        self.lca.lcia_calculation()
+
+    def results_to_arrays(self) -> dict:
+        """Return all calculated results as a dictionary of arrays.
+
+        LCI results are stacked into arrays of shape (activities/biosphere,
+        reference flows, scenarios), see `arrays_to_results`.
+        """
+        arrays = {name: getattr(self, name) for name in self.RESULT_ARRAYS}
+        reverse_dicts = (
+            self.rev_activity_dict,
+            self.rev_product_dict,
+            self.rev_biosphere_dict,
+        )
+        for name, reverse in zip(self.KEY_ARRAYS, reverse_dicts):
+            keys = [reverse[i] for i in range(len(reverse))]
+            arrays[name] = np.array(keys, dtype=str).reshape(-1, 2)
+        for name in self.LCI_RESULTS:
+            results = getattr(self, name)
+            arrays[name] = np.stack(
+                [
+                    np.column_stack(
+                        [results[self._lci_key(fu, scenario)] for fu in self.func_units]
+                    )
+                    for scenario in self._scenarios()
+                ],
+                axis=-1,
+            )
+        return arrays
+
+    def arrays_to_results(self, arrays: dict) -> None:
+        """Load previously calculated results, as returned by
+        `results_to_arrays`, instead of performing the calculations.
+        """
+        for name in self.RESULT_ARRAYS:
+            setattr(self, name, arrays[name])
+        (self.rev_activity_dict, self.rev_product_dict, self.rev_biosphere_dict) = (
+            dict(enumerate(map(tuple, arrays[name].tolist())))
+            for name in self.KEY_ARRAYS
+        )
+        for i, scenario in enumerate(self._scenarios()):
+            self._store_lci_results(
+                *(arrays[name][..., i] for name in self.LCI_RESULTS), scenario
+            )
+
     @property
     def func_units_dict(self) -> dict:
         """Return a dictionary of reference flow (key, demand)."""
@@ -380,18 +645,23 @@ class Contributions(object):
             ),
         }
         # aggregation: reverse index, metadata keys, metadata fields
+        # (the keys are taken from the reverse index, so results loaded from
+        # the cache don't need the LCI data of the `mlca`)
         self.aggregate_data = {
             "biosphere": (
                 self.mlca.rev_biosphere_dict,
-                self.mlca.lca.biosphere_dict,
+                {k: i for i, k in self.mlca.rev_biosphere_dict.items()},
                 self.ef_fields,
             ),
             "technosphere": (
                 self.mlca.rev_activity_dict,
-                self.mlca.lca.activity_dict,
+                {k: i for i, k in self.mlca.rev_activity_dict.items()},
                 self.act_fields,
             ),
         }
+        # aggregation matrices and mask indexes: {(inventory, parameters): (matrix, mask_index)}
+        self._aggregation = dict()
+        self._metadata_version = AB_metadata.version
 
     def normalize(self, contribution_array: np.ndarray) -> np.ndarray:
         """Normalise the contribution array.
@@ -424,31 +694,83 @@ class Contributions(object):
         FU_M_index : Dictionary which maps the reference flows or methods to their matching columns
         rev_dict : 'reverse' dictionary used to map correct activity/method to its value
         limit : Number of top-contributing items to include
-        limit_type : Either "number" or "percent", ContributionAnalysis.sort_array for complete explanation
+        limit_type : Either "number" or "percent", see `top_contributions` for complete explanation
 
         Returns
         -------
         Top-contributing flows per method or activity
 
         """
+        rows = contributions[list(FU_M_index.values()), :]
+        indices, values, counts = self.top_contributions(rows, limit, limit_type)
+        totals = rows.sum(axis=1)
+        rests = totals - np.where(
+            np.arange(values.shape[1]) < counts[:, None], values, 0
+        ).sum(axis=1)
+
         topcontribution_dict = dict()
-        for fu_or_method, col in FU_M_index.items():
-            top_contribution = ca.sort_array(
-                contributions[col, :], limit=limit, limit_type=limit_type
-            )
+        for i, fu_or_method in enumerate(FU_M_index):
             cont_per = OrderedDict()
-            cont_per.update(
-                {
-                    ("Total", ""): contributions[col, :].sum(),
-                    ("Rest", ""): contributions[col, :].sum()
-                    - top_contribution[:, 0].sum(),
-                }
-            )
-            for value, index in top_contribution:
+            cont_per.update({("Total", ""): totals[i], ("Rest", ""): rests[i]})
+            for index, value in zip(indices[i, : counts[i]], values[i, : counts[i]]):
                 cont_per.update({rev_dict[index]: value})
             topcontribution_dict.update({fu_or_method: cont_per})
         return topcontribution_dict
 
+    @staticmethod
+    def top_contributions(
+        contributions: np.ndarray, limit: Union[int, float], limit_type: str = "number"
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Find the largest (absolute) contributions of every row at once.
+
+        Same selection as `ContributionAnalysis.sort_array`: in "number" mode
+        the `limit` largest contributions are returned, in "percent" mode all
+        contributions of at least `limit` times the absolute total of the row.
+
+        Parameters
+        ----------
+        contributions : A 2-dimensional contribution array
+        limit : Number of contributions, or share of the total (0 < limit <= 1)
+        limit_type : Either "number" or "percent"
+
+        Returns
+        -------
+        indices : np.ndarray
+            Column indexes of the top contributions, rows x k, sorted from
+            largest to smallest absolute value
+        values : np.ndarray
+            The matching contributions
+        counts : np.ndarray
+            Number of top contributions in every row, the remaining entries
+            of the row are padding
+        """
+        if limit_type not in ("number", "percent"):
+            raise ValueError("limit_type must be either 'percent' or 'index'.")
+        n_rows, n_columns = contributions.shape
+        absolute = np.abs(contributions)
+        if limit_type == "percent":
+            if not 0 < limit <= 1:
+                raise ValueError("Percentage limits > 0 and <= 1.")
+            totals = absolute.sum(axis=1, keepdims=True)
+            counts = (absolute >= totals * limit).sum(axis=1)
+        else:
+            counts = np.full(n_rows, min(max(int(limit), 0), n_columns))
+        k = int(counts.max()) if n_rows else 0
+        if k == 0:
+            empty = np.empty((n_rows, 0))
+            return empty.astype(int), empty, counts
+
+        if k < n_columns:
+            candidates = np.argpartition(absolute, n_columns - k, axis=1)[:, -k:]
+        else:
+            candidates = np.tile(np.arange(n_columns), (n_rows, 1))
+        order = np.argsort(
+            -np.take_along_axis(absolute, candidates, axis=1), axis=1, kind="stable"
+        )
+        indices = np.take_along_axis(candidates, order, axis=1)
+        values = np.take_along_axis(contributions, indices, axis=1)
+        return indices, values, counts
+
     @staticmethod
     def get_labels(
         key_list: pd.MultiIndex,
@@ -479,21 +801,18 @@ class Contributions(object):
         fields = (
             fields if fields else ["name", "reference product", "location", "database"]
         )
-        keys = (
-            k for k in key_list
-        )  # need to do this as the keys come from a pd.Multiindex
+        keys = list(key_list)  # need to do this as the keys come from a pd.Multiindex
+        labels = AB_metadata.get_labels(
+            (k for k in keys if not (mask and k in mask)), fields, separator
+        )
         translated_keys = []
         for k in keys:
             if mask and k in mask:
                 translated_keys.append(k)
             elif isinstance(k, str):
                 translated_keys.append(k)
-            elif k in AB_metadata.index:
-                translated_keys.append(
-                    separator.join(
-                        [str(l) for l in list(AB_metadata.get_metadata(k, fields))]
-                    )
-                )
+            elif k in labels:
+                translated_keys.append(labels[k])
             else:
                 translated_keys.append(separator.join([i for i in k if i != ""]))
         if max_length:
@@ -736,22 +1055,54 @@ class Contributions(object):
             An optional list or dictview of the mask_index values
 
         """
-        rev_index, keys, fields = self.aggregate_data[inventory]
+        rev_index = self.aggregate_data[inventory][0]
         if not parameters:
             return contributions, rev_index, None
 
-        df = pd.DataFrame(contributions).T
-        columns = list(range(contributions.shape[0]))
-        df.index = pd.MultiIndex.from_tuples(rev_index.values())
-        metadata = AB_metadata.get_metadata(list(keys), fields)
-
-        joined = metadata.join(df)
-        joined.reset_index(inplace=True, drop=True)
-        grouped = joined.groupby(parameters)
-        aggregated = grouped[columns].sum()
-        mask_index = {i: m for i, m in enumerate(aggregated.index)}
+        matrix, mask_index = self.aggregation_matrix(inventory, parameters)
+        # contributions of all leading dimensions are aggregated in a single product
+        flat = contributions.reshape(-1, contributions.shape[-1])
+        aggregated = np.asarray(flat @ matrix).reshape(
+            contributions.shape[:-1] + (matrix.shape[1],)
+        )
+        return aggregated, mask_index, mask_index.values()
+
+    def aggregation_matrix(
+        self, inventory: str, parameters: Union[str, list]
+    ) -> Tuple[sparse.csr_matrix, dict]:
+        """Return the sparse 0/1 matrix that sums the flows of the inventory
+        into the groups given by the parameters, together with the values of
+        these groups linked to their indexes.
+
+        The matrix is built once for every inventory and set of parameters,
+        and rebuilt after the metadata has changed. Flows without metadata for
+        the parameters are not part of any group.
+        """
+        if self._metadata_version != AB_metadata.version:
+            self._aggregation = dict()
+            self._metadata_version = AB_metadata.version
+        token = (
+            inventory,
+            parameters if isinstance(parameters, str) else tuple(parameters),
+        )
+        if token in self._aggregation:
+            return self._aggregation[token]
+
+        rev_index = self.aggregate_data[inventory][0]
+        columns = [parameters] if isinstance(parameters, str) else list(parameters)
+        metadata = AB_metadata.get_metadata(list(rev_index.values()), columns)
+        metadata.reset_index(inplace=True, drop=True)
+        grouped = metadata.groupby(parameters)
+        groups = grouped.ngroup().to_numpy()
+        flows = np.flatnonzero(groups >= 0)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(flows)), (flows, groups[flows])),
+            shape=(len(rev_index), grouped.ngroups),
+        )
+        mask_index = {i: m for i, m in enumerate(grouped.size().index)}
 
-        return aggregated.T.values, mask_index, mask_index.values()
+        self._aggregation[token] = matrix, mask_index
+        return matrix, mask_index
 
     def _contribution_rows(self, contribution: str, aggregator=None):
         if aggregator is None:
@@ -895,4 +1246,4 @@ class Contributions(object):
 
 
 def ids_to_keys(index_list):
-    return [bd.get_activity(i).key if isinstance(i, int) else i for i in index_list]
+    return AB_metadata.get_keys(index_list)
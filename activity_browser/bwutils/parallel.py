@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Functions for the calculations that run in worker processes.
+
+Worker processes are started with the "spawn" method and import the module
+of the function they run. Everything imported here must therefore stay free
+of Qt, see also the lazy imports in `activity_browser/__init__.py` and
+`activity_browser/bwutils/__init__.py`.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import factorized
+
+
+def process_pool(workers: int, **kwargs) -> ProcessPoolExecutor:
+    """Return a pool of `workers` fresh processes, forking a running Qt
+    application is unsafe.
+    """
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context, **kwargs)
+
+
+def init_project_worker(base_dir: str) -> None:
+    """Point a worker process to the brightway data directory of the main
+    process, which may have been switched since start-up.
+
+    Runs before the function of the worker is imported, so before bw2data
+    reads the directory from the environment.
+    """
+    os.environ["BRIGHTWAY2_DIR"] = base_dir
+
+
+def solve(solver: Callable, demand: np.ndarray) -> np.ndarray:
+    """Solve all columns of the demand matrix with the factorized solver."""
+    try:
+        supply = solver(demand)
+        if supply.shape != demand.shape:
+            raise ValueError("Solver does not support multiple right-hand sides")
+    except (TypeError, ValueError):
+        # Not every solver backend (e.g. umfpack) accepts a 2-dimensional
+        # right-hand side, fall back to solving column by column.
+        supply = np.column_stack(
+            [solver(demand[:, col]) for col in range(demand.shape[1])]
+        )
+    return supply
+
+
+def characterize(
+    cfs: np.ndarray,
+    biosphere: sparse.spmatrix,
+    supply: np.ndarray,
+    inventory: np.ndarray,
+) -> tuple:
+    """Characterize the inventories of all reference flows for all impact
+    categories at once.
+
+    Parameters
+    ----------
+    cfs : (methods, biosphere) matrix of stacked characterization factors
+    biosphere : the biosphere matrix
+    supply : (activities, reference flows) matrix of supply arrays
+    inventory : (biosphere, reference flows) matrix of summed inventories
+
+    Returns
+    -------
+    The LCA scores of shape (reference flows, methods), and the elementary
+    flow and process contributions of shape (reference flows, methods,
+    biosphere/technosphere)
+
+    """
+    # Characterized biosphere matrix per impact category: (methods, activities)
+    characterized_biosphere = (biosphere.T @ cfs.T).T
+    scores = inventory.T @ cfs.T
+    ef_contributions = cfs[np.newaxis, :, :] * inventory.T[:, np.newaxis, :]
+    process_contributions = (
+        characterized_biosphere[np.newaxis, :, :] * supply.T[:, np.newaxis, :]
+    )
+    return scores, ef_contributions, process_contributions
+
+
+# The shared arrays of the parallel scenario calculation in a worker process
+_worker_arrays = {}
+
+
+def share_arrays(arrays: dict) -> tuple:
+    """Copy the arrays into shared memory.
+
+    Returns the shared memory blocks, which must be closed and unlinked
+    when done, and the descriptions needed to attach to them.
+    """
+    blocks, descriptions = [], {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        descriptions[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, descriptions
+
+
+def init_scenario_worker(descriptions: dict, shapes: dict, matrices: dict) -> None:
+    """Attach a worker process to the shared arrays, see `share_arrays`.
+
+    `matrices` maps the flow types of the scenario samples to the matrix
+    they change.
+    """
+    for name, (block_name, shape, dtype) in descriptions.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        _worker_arrays[f"{name}_block"] = block
+    _worker_arrays["shapes"] = shapes
+    _worker_arrays["matrices"] = matrices
+
+
+def calculate_scenario(index: int, samples: dict) -> tuple:
+    """Calculate the LCI and LCIA results of a single scenario in a worker
+    process, given the matrix values of the scenario per flow type.
+    """
+    arrays = _worker_arrays
+    matrices = {
+        name: sparse.csr_matrix(
+            (
+                arrays[f"{prefix}_data"].copy(),
+                arrays[f"{prefix}_indices"],
+                arrays[f"{prefix}_indptr"],
+            ),
+            shape=arrays["shapes"][name],
+        )
+        for name, prefix in (
+            ("technosphere_matrix", "technosphere"),
+            ("biosphere_matrix", "biosphere"),
+        )
+    }
+    for kind, sample in samples.items():
+        matrix = matrices[arrays["matrices"][kind]]
+        matrix[arrays[f"{kind}_row"], arrays[f"{kind}_col"]] = sample
+
+    technosphere = matrices["technosphere_matrix"]
+    biosphere = matrices["biosphere_matrix"]
+    supply = solve(factorized(technosphere.tocsc()), arrays["demand"])
+    technosphere_flows = np.multiply(supply, technosphere.diagonal()[:, np.newaxis])
+    inventory = biosphere @ supply
+    lcia = characterize(
+        arrays["characterization_factors"], biosphere, supply, inventory
+    )
+    return index, supply, technosphere_flows, inventory, lcia
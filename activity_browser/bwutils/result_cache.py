@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+from logging import getLogger
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from activity_browser.mod import bw2data as bd
+
+from .metadata import AB_metadata
+
+log = getLogger(__name__)
+
+
+def database_fingerprint(databases: Optional[list] = None) -> str:
+    """Return a hash of the `modified` and `processed` timestamps of the given
+    databases (or all databases in the project).
+
+    The fingerprint changes whenever any of the databases is changed.
+    """
+    databases = sorted(databases if databases is not None else bd.databases)
+    hasher = hashlib.sha256()
+    for name in databases:
+        meta = bd.databases.get(name, {})
+        hasher.update(
+            repr((name, meta.get("modified"), meta.get("processed"))).encode()
+        )
+    return hasher.hexdigest()
+
+
+# {(method, processed file): ((modification time, size), fingerprint)}
+_method_fingerprints = dict()
+
+
+def method_fingerprint(method: tuple) -> str:
+    """Return a hash of the characterization factors of the given method.
+
+    The hash is kept until the processed file of the method is modified.
+    """
+    try:
+        path = bd.Method(method).filepath_processed()
+        stat = os.stat(path)
+    except (OSError, AttributeError):
+        hasher = hashlib.sha256(repr(method).encode())
+        hasher.update(repr(bd.Method(method).load()).encode())
+        return hasher.hexdigest()
+    modified = stat.st_mtime_ns, stat.st_size
+    cached = _method_fingerprints.get((method, path))
+    if cached and cached[0] == modified:
+        return cached[1]
+    hasher = hashlib.sha256(repr(method).encode())
+    with open(path, "rb") as processed:
+        hasher.update(processed.read())
+    _method_fingerprints[(method, path)] = modified, hasher.hexdigest()
+    return hasher.hexdigest()
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Return a hash of the contents, index and columns of a dataframe."""
+    hasher = hashlib.sha256(repr(list(df.columns)).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return hasher.hexdigest()
+
+
+class LCAResultCache(object):
+    """Persistent cache of calculated (Superstructure)MLCA results.
+
+    Results are stored as `.npy` files within the project directory, one
+    sub-directory per calculation, and loaded memory-mapped. A cached
+    calculation is identified by the contents of the calculation setup, the
+    timestamps of all databases, the characterization factors of the methods
+    and the contents of the scenario data (if any), so any change to these
+    results in a new calculation.
+
+    Parameters
+    ----------
+    max_entries : Number of calculations to keep on disk, the least recently
+        used calculations are removed first.
+    """
+
+    DIRECTORY = "ab_lca_results"
+
+    def __init__(self, max_entries: int = 10):
+        self.max_entries = max_entries
+
+    @property
+    def directory(self) -> str:
+        return bd.projects.request_directory(self.DIRECTORY)
+
+    @staticmethod
+    def calculation_key(
+        cs_name: str, scenario_df: Optional[pd.DataFrame] = None
+    ) -> str:
+        """Construct the key identifying a calculation and its inputs."""
+        try:
+            cs = bd.calculation_setups[cs_name]
+        except KeyError:
+            raise ValueError(f"{cs_name} is not a known `calculation_setup`.")
+        hasher = hashlib.sha256(repr((cs["inv"], cs["ia"])).encode())
+        hasher.update(database_fingerprint().encode())
+        for method in cs["ia"]:
+            hasher.update(method_fingerprint(method).encode())
+        if scenario_df is not None:
+            hasher.update(dataframe_fingerprint(scenario_df).encode())
+        return hasher.hexdigest()
+
+    def load(self, key: str) -> Optional[dict]:
+        """Return the read-only, memory-mapped result arrays for the key, or
+        None if the calculation is not cached.
+
+        Only the parts of the results that are shown are read from disk. The
+        `MLCA` copies the arrays before it calculates them again, see
+        `MLCA._writable_results`.
+        """
+        path = os.path.join(self.directory, key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            arrays = {
+                os.path.splitext(f)[0]: np.load(os.path.join(path, f), mmap_mode="r")
+                for f in os.listdir(path)
+                if f.endswith(".npy")
+            }
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read cached LCA results, recalculating: {e}")
+            return None
+        # touch the directory so the least recently used results are pruned first
+        os.utime(path)
+        log.info(f"Loaded cached LCA results: {key}")
+        return arrays
+
+    def save(self, key: str, arrays: dict) -> None:
+        """Store the result arrays under the key."""
+        path = os.path.join(self.directory, key)
+        temp_path = path + ".tmp"
+        try:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            os.makedirs(temp_path)
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_path, f"{name}.npy"), array)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(temp_path, path)
+        except OSError as e:
+            log.warning(f"Could not cache LCA results: {e}")
+            shutil.rmtree(temp_path, ignore_errors=True)
+            return
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove the least recently used results above `max_entries`."""
+        directory = self.directory
+        entries = sorted(
+            (os.path.join(directory, d) for d in os.listdir(directory)),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for path in entries[self.max_entries :]:
+            # Move the results out of the way first, so a failed removal never
+            # leaves an incomplete calculation behind under its key.
+            trash = path if path.endswith(".old") else path + ".old"
+            try:
+                os.replace(path, trash)
+                shutil.rmtree(trash)
+            except OSError as e:
+                # Files that are still opened elsewhere cannot be removed on
+                # Windows, they are retried by the next prune.
+                log.debug(f"Could not remove cached LCA results: {e}")
+
+    def clear(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+lca_result_cache = LCAResultCache()
+
+
+class SankeyCache(object):
+    """Cache of Sankey graph traversals, shared by all result tabs.
+
+    A traversal is identified by stable identifiers: the calculation (or the
+    database and method fingerprints), the reference flow, method, scenario,
+    cutoff and max_calc, see `traversal_key`. Traversals are stored as node
+    and edge arrays, with the nodes identified by their activity keys. The
+    most recently used traversals are kept in memory, and (if `persist` is
+    set) also stored as `.npz` files within the project directory.
+
+    Parameters
+    ----------
+    max_entries : Number of traversals to keep in memory
+    max_files : Number of traversals to keep on disk
+    persist : Whether to store the traversals on disk
+    """
+
+    DIRECTORY = "ab_sankey"
+
+    def __init__(self, max_entries: int = 50, max_files: int = 200, persist=True):
+        self.max_entries = max_entries
+        self.max_files = max_files
+        self.persist = persist
+        self._entries = OrderedDict()
+
+    @property
+    def directory(self) -> str:
+        return bd.projects.request_directory(self.DIRECTORY)
+
+    @staticmethod
+    def traversal_key(*identifiers) -> str:
+        """Construct the key identifying a traversal from its identifiers."""
+        return hashlib.sha256(repr(identifiers).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the traversal data for the key, or None if the traversal
+        is not cached.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self.from_arrays(self._entries[key])
+        if not self.persist:
+            return None
+        path = os.path.join(self.directory, f"{key}.npz")
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path) as f:
+                arrays = dict(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read cached Sankey: {e}")
+            return None
+        # touch the file so the least recently used files are pruned first
+        os.utime(path)
+        self._remember(key, arrays)
+        return self.from_arrays(arrays)
+
+    def put(self, key: str, data: dict) -> None:
+        """Store the traversal data under the key."""
+        arrays = self.to_arrays(data)
+        self._remember(key, arrays)
+        if not self.persist:
+            return
+        path = os.path.join(self.directory, f"{key}.npz")
+        try:
+            with open(path + ".tmp", "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            log.warning(f"Could not cache Sankey: {e}")
+            return
+        self.prune()
+
+    def _remember(self, key: str, arrays: dict) -> None:
+        self._entries[key] = arrays
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def prune(self) -> None:
+        """Remove the least recently used files above `max_files`."""
+        directory = self.directory
+        entries = sorted(
+            (os.path.join(directory, f) for f in os.listdir(directory)),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for path in entries[self.max_files :]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        self._entries.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def to_arrays(data: dict) -> dict:
+        """Convert the traversal data, as used by the Sankey navigator, into
+        node and edge arrays.
+
+        Nodes are identified by their activity keys instead of their matrix
+        indices, the edges refer to the position of their nodes (or -1 for
+        the functional unit).
+        """
+        meta = data["metadata"]
+        reverse = {v: k for k, v in meta["act_dict"]}
+        nodes = data["nodes"]
+        indices = [idx for idx in nodes if idx != -1]
+        keys = AB_metadata.get_keys(reverse[idx] for idx in indices)
+        position = {idx: i for i, idx in enumerate(indices)}
+        position[-1] = -1
+        demand, amount = meta["demand"]
+        demand = getattr(demand, "key", demand)
+        if isinstance(demand, int):
+            demand = AB_metadata.get_keys([demand])[0]
+        return {
+            "database": np.array([key[0] for key in keys], dtype=str),
+            "code": np.array([key[1] for key in keys], dtype=str),
+            "nodes": np.array(
+                [[nodes[idx][f] for f in ("amount", "cum", "ind")] for idx in indices],
+                dtype=np.float64,
+            ).reshape(-1, 3),
+            "root": np.array(
+                [nodes[-1][f] for f in ("amount", "cum", "ind")], dtype=np.float64
+            ),
+            "edge_nodes": np.array(
+                [[position[e["from"]], position[e["to"]]] for e in data["edges"]],
+                dtype=np.int64,
+            ).reshape(-1, 2),
+            "edges": np.array(
+                [
+                    [e[f] for f in ("amount", "exc_amount", "impact")]
+                    for e in data["edges"]
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 3),
+            "counter": np.array(data["counter"]),
+            "demand": np.array(demand, dtype=str),
+            "demand_amount": np.array(amount, dtype=np.float64),
+            "score": np.array(meta["score"], dtype=np.float64),
+            "unit": np.array(meta["unit"], dtype=str),
+        }
+
+    @staticmethod
+    def from_arrays(arrays: dict) -> dict:
+        """Convert node and edge arrays back into traversal data, see
+        `to_arrays`.
+        """
+        keys = list(zip(arrays["database"].tolist(), arrays["code"].tolist()))
+        nodes = {-1: dict(zip(("amount", "cum", "ind"), arrays["root"].tolist()))}
+        nodes.update(
+            (i, dict(zip(("amount", "cum", "ind"), values)))
+            for i, values in enumerate(arrays["nodes"].tolist())
+        )
+        edges = [
+            dict(zip(("from", "to", "amount", "exc_amount", "impact"), (*ids, *values)))
+            for ids, values in zip(
+                arrays["edge_nodes"].tolist(), arrays["edges"].tolist()
+            )
+        ]
+        return {
+            "nodes": nodes,
+            "edges": edges,
+            "counter": int(arrays["counter"]),
+            "metadata": {
+                "demand": (
+                    tuple(arrays["demand"].tolist()),
+                    float(arrays["demand_amount"]),
+                ),
+                "score": float(arrays["score"]),
+                "unit": str(arrays["unit"]),
+                "act_dict": [(key, i) for i, key in enumerate(keys)],
+            },
+        }
+
+
+sankey_cache = SankeyCache()
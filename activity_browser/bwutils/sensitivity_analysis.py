@@ -237,19 +237,10 @@ def get_parameters_DF(mc):
         return pd.DataFrame()  # return emtpy df
 
 
-def get_exchange_values(matrix, indices):
-    """Get technosphere exchanges values from a list of exchanges
-    (row and column information)"""
-    return [matrix[i] for i in indices]
-
-
-def get_X(matrix_list, indices):
+def get_X(matrix_values, columns):
     """Get the input data to the GSA, i.e. A and B matrix values for each
-    model run."""
-    X = np.zeros((len(matrix_list), len(indices)))
-    for row, M in enumerate(matrix_list):
-        X[row, :] = get_exchange_values(M, indices)
-    return X
+    model run, from the stored matrix values (see `MonteCarloLCA.A_values`)."""
+    return np.asarray(matrix_values[:, columns], dtype=np.float64)
 
 
 def get_X_CF(mc, dfcf, method):
@@ -394,10 +385,13 @@ class GlobalSensitivityAnalysis(object):
         # Get X (Technosphere, Biosphere and CF values)
         X_list = list()
         if self.mc.include_technosphere and self.t_indices:
-            self.Xa = get_X(self.mc.A_matrices, self.t_indices)
+            self.Xa = get_X(self.mc.A_values, self.mc.exchange_columns(self.t_indices))
             X_list.append(self.Xa)
         if self.mc.include_biosphere and self.b_indices:
-            self.Xb = get_X(self.mc.B_matrices, self.b_indices)
+            self.Xb = get_X(
+                self.mc.B_values,
+                self.mc.exchange_columns(self.b_indices, biosphere=True),
+            )
             X_list.append(self.Xb)
         if self.mc.include_cfs and not self.dfcf.empty:
             self.Xc = get_X_CF(self.mc, self.dfcf, self.method)
@@ -2,6 +2,7 @@
 from .dataframe import (scenario_names_from_df, scenario_replace_databases,
                         superstructure_from_arrays)
 from .excel import get_sheet_names, import_from_excel
+from .file_cache import scenario_file_cache
 from .file_dialogs import ABPopup
 from .file_imports import ABCSVImporter, ABFeatherImporter, ABFileImporter
 from .manager import SuperstructureManager
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 import ast
-import sys
 from typing import List, Tuple
 
 import numpy as np
@@ -10,7 +9,6 @@ from PySide2.QtWidgets import QApplication, QPushButton
 
 from ..errors import ScenarioDatabaseNotFoundError
 from ..metadata import AB_metadata
-from ..utils import Index
 from .activities import data_from_index
 from .file_dialogs import ABPopup
 from .utils import SUPERSTRUCTURE
@@ -44,13 +42,15 @@ def superstructure_from_arrays(
 
 def arrays_from_indexed_superstructure(
     df: pd.DataFrame,
-) -> Tuple[np.ndarray, np.ndarray]:
-    result = np.zeros(df.shape[0], dtype=object)
-    for i, data in enumerate(df.index.to_flat_index()):
-        result[i] = Index.build_from_dict(
-            {"input": data[0], "output": data[1], "flow type": data[2]}
-        )
-    return result, df.to_numpy(dtype=float)
+) -> Tuple[pd.MultiIndex, np.ndarray]:
+    """Return the (input, output, flow type) index of the exchanges and the
+    scenario values as a 2-dimensional array.
+
+    The index holds every unique key once in its levels, with an integer
+    code per exchange, so the keys can be mapped to matrix indices without
+    going over the exchanges one by one.
+    """
+    return df.index.remove_unused_levels(), df.to_numpy(dtype=float)
 
 
 def filter_databases_indexed_superstructure(
@@ -59,7 +59,9 @@ def filter_databases_indexed_superstructure(
     """Filters the given superstructure so that only indexes where the output
     database is in the `include` set are valid.
     """
-    return df.loc[[x[1][0] in include for x in df.index.to_flat_index()], :]
+    outputs = df.index.levels[1]
+    included = np.array([key[0] in include for key in outputs], dtype=bool)
+    return df.loc[included[df.index.codes[1]], :]
 
 
 def scenario_columns(df: pd.DataFrame) -> pd.Index:
@@ -76,6 +78,37 @@ def scenario_names_from_df(df: pd.DataFrame) -> List[str]:
     return [str(x).replace("\n", " ").replace("\r", "") for x in cols]
 
 
+# Fields of the scenario file used to find an activity in another database
+RELINK_FIELDS = ["activity name", "categories", "reference product", "location"]
+
+
+def relink_lookups(metadata: pd.DataFrame, databases: set) -> Tuple[dict, dict]:
+    """Index the activities of the databases for relinking.
+
+    Returns a lookup of the technosphere activities on their (database, name,
+    reference product, location) and of the biosphere flows on their
+    (database, name, categories). If several activities share these fields
+    the first one is used.
+    """
+    metadata = metadata.loc[metadata["database"].isin(databases)]
+    technosphere, biosphere = dict(), dict()
+
+    def values(field: str) -> list:
+        if field not in metadata.columns:
+            return [""] * len(metadata)
+        return metadata[field].astype(object).tolist()
+
+    names, dbs, keys = values("name"), values("database"), values("key")
+    products, locations = values("reference product"), values("location")
+    for lookup, fields in (
+        (technosphere, zip(dbs, names, products, locations)),
+        (biosphere, zip(dbs, names, values("categories"))),
+    ):
+        for field, key in zip(fields, keys):
+            lookup.setdefault(field, key)
+    return technosphere, biosphere
+
+
 def scenario_replace_databases(df_: pd.DataFrame, replacements: dict) -> pd.DataFrame:
     """For a provided dataframe the function will check for the presence of a unidentified database for all rows.
     If an unidentified database is found as a key in the replacements argument the corresponding value provided is used
@@ -104,70 +137,6 @@ def scenario_replace_databases(df_: pd.DataFrame, replacements: dict) -> pd.Data
     -------
     """
 
-    def exchange_replace_database(
-        ds: pd.Series, replacements: dict, critical: list, idx: pd.Index
-    ) -> tuple:
-        """
-        For a row in the scenario dataframe check the databases involved for whether replacement is required.
-        If so use the key-value pair within the replacements dictionary to replace the dictionary names
-        and obtain the correct activity key
-
-        Raises
-        ------
-        No exception however it creates a store of five values that indicate non-linkable flows with the
-        new database
-
-        Parameters
-        ----------
-        ds: dataseries from a pandas dataframe containing the data from the scenario difference file
-        replacements: a key -- value pair containing the old -- new database names
-        critical: an initially empty list that is filled with dataseries that fail in the relinking process
-        idx: the index for the dataseries object, in the "parent" dataframe
-        """
-        ds_ = ds.copy()
-        for i, field in enumerate([FROM_FIELDS, TO_FIELDS]):
-            db_name = ds_[["from database", "to database"][i]]
-            # check for the relevance of the particular field
-            if db_name not in replacements.keys():
-                continue
-            try:
-                # try to find the matching records (after loaded into the metadata)
-                if isinstance(ds_[field[1]], float):
-                    # try to find a technosphere record
-                    key = metadata[
-                        (metadata[DB_FIELDS[0]] == ds_[field[0]])
-                        & (metadata[DB_FIELDS[2]] == ds_[field[2]])
-                        & (metadata[DB_FIELDS[3]] == ds_[field[3]])
-                    ].copy()
-                else:
-                    # try to find a biosphere record
-                    if isinstance(ds_[field[1]], str):
-                        categories = ast.literal_eval(ds_[field[1]])
-                    else:
-                        categories = ds_[field[1]]
-                    key = metadata[
-                        (metadata[DB_FIELDS[0]] == ds_[field[0]])
-                        & (metadata[DB_FIELDS[1]] == categories)
-                    ].copy()
-                # replace the records that can be found
-                for j, col in enumerate(
-                    [["from key", "from database"], ["to key", "to database"]][i]
-                ):
-                    ds_.loc[col] = (
-                        (key["database"][0], key["code"][0])
-                        if j == 0
-                        else key["database"][0]
-                    )
-            except Exception as e:
-                # if the record cannot be found add an exception (to a maximum of five)
-                if len(critical["from database"]) <= 5:
-                    critical["index"].append(idx)
-                    critical["from database"].append(ds_["from database"])
-                    critical["from activity name"].append(ds_["from activity name"])
-                    critical["to database"].append(ds_["to database"])
-                    critical["to activity name"].append(ds_["to activity name"])
-        return ds_
-
     # Create a new database from those records in the scenario files that include exchanges where a replacement database
     # is required
     df = df_.loc[
@@ -175,47 +144,48 @@ def scenario_replace_databases(df_: pd.DataFrame, replacements: dict) -> pd.Data
         | (df_["to database"].isin(replacements.keys()))
     ].copy(True)
 
-    # A LIST OF FIELDS FOR ITERATION
-    FROM_FIELDS = pd.Index(
-        [
-            "from activity name",
-            "from categories",
-            "from reference product",
-            "from location",
-        ]
-    )
-    TO_FIELDS = pd.Index(
-        ["to activity name", "to categories", "to reference product", "to location"]
-    )
-    DB_FIELDS = ["name", "categories", "reference product", "location"]
-
-    # setting up the variables in case some exchanges cannot be relinked
-    critical = {
-        "index": [],
-        "from database": [],
-        "from activity name": [],
-        "to database": [],
-        "to activity name": [],
-    }  # To be used in the exchange_replace_database internal method scope
-    changes = ["from database", "from key", "to database", "to key"]
-
-    # Load all required databases into the metadata
+    # Load all required databases into the metadata and index their activities
     AB_metadata.add_metadata(replacements.values())
-    metadata = AB_metadata.dataframe
-
-    for idx in df.index:
-        df.loc[idx, changes] = exchange_replace_database(
-            df.loc[idx, :], replacements, critical, idx
-        )[changes]
-        sys.stdout.write(
-            "\r{}".format(idx / df.shape[0])
-        )  # TODO check adaptation for the logger
-        sys.stdout.flush()
-
-    if critical["from database"]:
+    technosphere, biosphere = relink_lookups(
+        AB_metadata.dataframe, set(replacements.values())
+    )
+
+    # relink the 'from' and 'to' activities of the exchanges, and collect
+    # those that cannot be found in the new database
+    failed = np.zeros(len(df), dtype=bool)
+    for side in ("from", "to"):
+        databases = df[f"{side} database"].to_numpy(dtype=object, copy=True)
+        keys = df[f"{side} key"].to_numpy(dtype=object, copy=True)
+        relink = np.flatnonzero(df[f"{side} database"].isin(replacements.keys()))
+        fields = (
+            df[f"{side} {field}"].to_numpy(dtype=object)[relink]
+            for field in RELINK_FIELDS
+        )
+        for i, name, categories, product, location in zip(relink, *fields):
+            db_name = replacements[databases[i]]
+            if isinstance(categories, float):
+                # try to find a technosphere record
+                key = technosphere.get((db_name, name, product, location))
+            else:
+                # try to find a biosphere record
+                try:
+                    if isinstance(categories, str):
+                        categories = ast.literal_eval(categories)
+                    key = biosphere.get((db_name, name, tuple(categories)))
+                except (ValueError, SyntaxError, TypeError):
+                    key = None
+            if key is None:
+                failed[i] = True
+            else:
+                keys[i], databases[i] = key, db_name
+        df[f"{side} key"] = keys
+        df[f"{side} database"] = databases
+
+    critical = df.index[failed]
+    if len(critical):
         # prepare a warning message in case unlinkable activities were found in the scenario dataframe
         QApplication.restoreOverrideCursor()
-        if len(critical["from database"]) > 1:
+        if len(critical) > 1:
             msg = (
                 f'Multiple activities could not be "relinked" to the local database.<br> The first five are provided. '
                 f"If you want to save the dataframe you can either save those scenario exchanges where relinking failed "
@@ -230,8 +200,8 @@ def scenario_replace_databases(df_: pd.DataFrame, replacements: dict) -> pd.Data
                 default=2,
             )
             critical_message.save_options()
-            critical_message.dataframe(df.loc[critical["index"], :], SUPERSTRUCTURE)
-            critical_message.dataframe_to_file(df_, critical["index"])
+            critical_message.dataframe(df.loc[critical[:5], :], SUPERSTRUCTURE)
+            critical_message.dataframe_to_file(df_, critical)
             response = critical_message.exec_()
         else:
             msg = (
@@ -248,8 +218,8 @@ def scenario_replace_databases(df_: pd.DataFrame, replacements: dict) -> pd.Data
                 default=2,
             )
             critical_message.save_options()
-            critical_message.dataframe(df.loc[critical["index"], :], SUPERSTRUCTURE)
-            critical_message.dataframe_to_file(df_, critical["index"])
+            critical_message.dataframe(df.loc[critical[:5], :], SUPERSTRUCTURE)
+            critical_message.dataframe_to_file(df_, critical)
             response = critical_message.exec_()
         QApplication.setOverrideCursor(Qt.WaitCursor)
         raise ScenarioDatabaseNotFoundError(
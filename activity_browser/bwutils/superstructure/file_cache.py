@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+from logging import getLogger
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from activity_browser.mod import bw2data as bd
+
+from ..feather import read_frame, read_metadata, write_frame
+from ..result_cache import database_fingerprint
+
+log = getLogger(__name__)
+
+
+class ScenarioFileCache(object):
+    """Persistent cache of imported and validated scenario files.
+
+    Reading a scenario file parses every key and checks every exchange against
+    the local databases. The validated scenario dataframe is stored in the
+    project directory, identified by the contents of the file and the options
+    it was read with. It is only reused as long as none of the databases the
+    scenario file refers to have been modified since it was validated.
+
+    The matrix indices of the scenario exchanges are stored as well, see
+    `index_key`, so they are not looked up again for the same exchanges.
+
+    Parameters
+    ----------
+    max_entries : Number of scenario files and matrix indices to keep on disk,
+        the least recently used files are removed first.
+    """
+
+    DIRECTORY = "ab_scenario_files"
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, max_entries: int = 20):
+        self.max_entries = max_entries
+
+    @property
+    def directory(self) -> str:
+        return bd.projects.request_directory(self.DIRECTORY)
+
+    @staticmethod
+    def file_key(path: Union[str, Path], **options) -> str:
+        """Construct the key identifying the contents of the file and the
+        options (e.g. sheet or separator) used to read it.
+        """
+        hasher = hashlib.sha256(repr(sorted(options.items())).encode())
+        with open(path, "rb") as f:
+            while chunk := f.read(ScenarioFileCache.CHUNK_SIZE):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def database_stamps(df: pd.DataFrame) -> dict:
+        """Return the 'modified' timestamps of the databases the scenario
+        dataframe refers to.
+        """
+        names = set(df.loc[:, "from database"]).union(df.loc[:, "to database"])
+        return {name: bd.databases.get(name, {}).get("modified") for name in names}
+
+    @staticmethod
+    def index_key(indices: pd.MultiIndex) -> str:
+        """Construct the key identifying the matrix indices of the scenario
+        exchanges.
+
+        The rows and columns of the exchanges depend on the exchanges and on
+        the contents of the databases, so the key changes whenever any of the
+        databases is modified.
+        """
+        hasher = hashlib.sha256(database_fingerprint().encode())
+        for level, codes in zip(indices.levels, indices.codes):
+            hasher.update(repr(level.tolist()).encode())
+            hasher.update(np.asarray(codes, dtype=np.int64).tobytes())
+        return hasher.hexdigest()
+
+    def _path(self, key: str, extension: str = "feather") -> str:
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """Return the validated scenario dataframe for the key, or None if the
+        file is not cached or one of its databases was modified since.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            databases = read_metadata(path)["databases"]
+            if any(
+                name not in bd.databases
+                or bd.databases[name].get("modified") != modified
+                for name, modified in databases.items()
+            ):
+                return None
+            df = read_frame(path)
+        except Exception as e:
+            log.warning(f"Could not read cached scenario file, reading again: {e}")
+            return None
+        # touch the file so the least recently used files are pruned first
+        os.utime(path)
+        log.info(f"Loaded cached scenario file: {key}")
+        return df
+
+    def save(self, key: str, df: pd.DataFrame) -> None:
+        """Store the validated scenario dataframe under the key."""
+        try:
+            write_frame(self._path(key), df, databases=self.database_stamps(df))
+        except Exception as e:
+            log.warning(f"Could not cache scenario file: {e}")
+            return
+        self.prune()
+
+    def load_matrix_indices(self, key: str) -> Optional[np.ndarray]:
+        """Return the matrix indices stored under the `index_key`, or None if
+        they are not cached.
+        """
+        path = self._path(key, "npy")
+        if not os.path.isfile(path):
+            return None
+        try:
+            matrix_indices = np.load(path)
+        except (OSError, ValueError) as e:
+            log.warning(f"Could not read cached scenario matrix indices: {e}")
+            return None
+        os.utime(path)
+        return matrix_indices
+
+    def save_matrix_indices(self, key: str, matrix_indices: np.ndarray) -> None:
+        """Store the matrix indices under the `index_key`."""
+        path = self._path(key, "npy")
+        try:
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, matrix_indices)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            log.warning(f"Could not cache scenario matrix indices: {e}")
+            return
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove the least recently used files above `max_entries`."""
+        directory = self.directory
+        entries = sorted(
+            (os.path.join(directory, f) for f in os.listdir(directory)),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for path in entries[self.max_entries :]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for f in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, f))
+
+
+scenario_file_cache = ScenarioFileCache()
@@ -19,7 +19,7 @@ from ..errors import (CriticalScenarioExtensionError, ImportCanceledError,
 from .activities import fill_df_keys_with_fields, get_activities_from_keys
 from .dataframe import scenario_columns
 from .file_dialogs import ABPopup
-from .utils import SUPERSTRUCTURE, _time_it_, guess_flow_type
+from .utils import SUPERSTRUCTURE, _time_it_, guess_flow_types
 
 log = getLogger(__name__)
 
@@ -277,15 +277,7 @@ class SuperstructureManager(object):
         A pandas dataframe with the changes made to the scenario dataframe for these self referential flows
         """
         self_referential_production_flows = df.loc[
-            df.apply(
-                lambda x: (
-                    True
-                    if x["from key"] == x["to key"] and x["flow type"] == "technosphere"
-                    else False
-                ),
-                axis=1,
-            ),
-            :,
+            (df["from key"] == df["to key"]) & (df["flow type"] == "technosphere"), :
         ].copy()
         self_referential_production_flows.index = pd.MultiIndex.from_arrays(
             [
@@ -377,11 +369,11 @@ class SuperstructureManager(object):
                     unknown_flows.sum()
                 )
             )
-            df.loc[unknown_flows, "flow type"] = df.loc[
-                unknown_flows, EXCHANGE_KEYS
-            ].apply(guess_flow_type, axis=1)
-        return pd.MultiIndex.from_tuples(
-            df.loc[:, INDEX_KEYS].apply(tuple, axis=1),
+            df.loc[unknown_flows, "flow type"] = guess_flow_types(
+                df.loc[unknown_flows, EXCHANGE_KEYS]
+            )
+        return pd.MultiIndex.from_arrays(
+            [df[key] for key in INDEX_KEYS],
             names=["input", "output", "flow"],
         )
 
@@ -3,6 +3,7 @@ from typing import Iterable, Optional
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from PySide2.QtWidgets import QPushButton
 
 from activity_browser.mod import bw2data as bd
@@ -10,17 +11,15 @@ from activity_browser.mod import bw2data as bd
 from ..commontasks import format_activity_label
 from ..errors import ScenarioExchangeNotFoundError
 from ..multilca import MLCA, Contributions
+from ..parallel import (calculate_scenario, init_scenario_worker, process_pool,
+                        share_arrays)
 from ..utils import Index
 from .dataframe import (arrays_from_indexed_superstructure,
                         filter_databases_indexed_superstructure,
                         scenario_names_from_df)
+from .file_cache import scenario_file_cache
 from .file_dialogs import ABPopup
 
-try:
-    from bw2calc.matrices import TechnosphereBiosphereMatrixBuilder as MB
-except ModuleNotFoundError:
-    pass  # removed in bw25
-
 
 class SuperstructureMLCA(MLCA):
     """Subclass of the `MLCA` class which adds another dimension in the form
@@ -33,7 +32,20 @@ class SuperstructureMLCA(MLCA):
         "production": "technosphere_matrix",
     }
 
-    def __init__(self, cs_name: str, df: pd.DataFrame):
+    # The scenario data is prepared with the LCI data, see `load_lci`
+    LCI_ATTRIBUTES = MLCA.LCI_ATTRIBUTES + (
+        "default_technosphere_matrix",
+        "default_biosphere_matrix",
+        "defaults",
+        "indices",
+        "values",
+        "matrix_indices",
+        "scenario_samples",
+    )
+
+    def __init__(
+        self, cs_name: str, df: pd.DataFrame, results: Optional[dict] = None
+    ):
         assert isinstance(df, pd.DataFrame), (
             "Check if you have provided at least 1 reference flow, 1 impact category "
             "and 1 scenario file. "
@@ -42,8 +54,19 @@ class SuperstructureMLCA(MLCA):
         self.scenario_names = scenario_names_from_df(df)
         self.total = len(self.scenario_names)
         assert self.total > 0, "Cannot run analysis without scenarios"
+        self._scenario_df = df
+
+        super().__init__(cs_name, results)
 
-        super().__init__(cs_name)
+        # Construct an index dictionary similar to fu_index and method_index
+        self._current_index = 0
+        self.scenario_index = {k: i for i, k in enumerate(self.scenario_names)}
+
+    def load_lci(self) -> None:
+        """Load the LCI data and prepare the matrix indices and values of the
+        scenarios.
+        """
+        super().load_lci()
 
         # Scenarios overwrite the lca.xxx_matrix. For supporting absent values
         # in scenario files defaults are required, to prevent these from being
@@ -57,7 +80,9 @@ class SuperstructureMLCA(MLCA):
         }
 
         # Filter dataframe for keys that do not occur in the LCA matrix.
-        df = filter_databases_indexed_superstructure(df, self.all_databases)
+        df = filter_databases_indexed_superstructure(
+            self._scenario_df, self.all_databases
+        )
         assert not df.empty, "Filtering unused flows removed all of the scenario data."
 
         self.indices, self.values = arrays_from_indexed_superstructure(df)
@@ -77,13 +102,18 @@ class SuperstructureMLCA(MLCA):
                 ("type", np.uint8),
             ],
         )
-        self.indices_to_matrix()
-
-        # Construct an index dictionary similar to fu_index and method_index
-        self._current_index = 0
-        self.scenario_index = {k: i for i, k in enumerate(self.scenario_names)}
+        # The indices of the same exchanges are only looked up once
+        index_key = scenario_file_cache.index_key(self.indices)
+        matrix_indices = scenario_file_cache.load_matrix_indices(index_key)
+        if matrix_indices is not None and len(matrix_indices) == len(self.indices):
+            self.matrix_indices = matrix_indices
+        else:
+            self.indices_to_matrix()
+            scenario_file_cache.save_matrix_indices(index_key, self.matrix_indices)
+        self.build_scenario_samples()
 
-        # Rebuild numpy arrays with scenario dimension included.
+    def _allocate_results(self) -> None:
+        """Rebuild numpy arrays with scenario dimension included."""
         self.lca_scores = np.zeros(
             (len(self.func_units), len(self.methods), self.total)
         )
@@ -118,71 +148,123 @@ class SuperstructureMLCA(MLCA):
         self.current += 1
 
     def set_scenario(self, index: int) -> None:
-        """Set the current scenario index given a new index to go to"""
-        steps = self._get_steps_to_index(index)
-        # self.current = steps[-1] + 1  # Walk the steps to the new index
-        for _ in steps:
-            self.next_scenario()
+        """Set the current scenario index given a new index to go to, and
+        update the matrices to that scenario.
+        """
+        if index < 0:
+            raise ValueError("Negative indexes are not allowed")
+        elif index >= self.total:
+            raise ValueError("Given index is not possible for current scenario dataset")
+        self.update_matrices(index)
+        self.current = index
 
     def indices_to_matrix(self) -> None:
-        def convert(idx: Index) -> tuple:
-            in_dict = (
-                self.lca.biosphere_dict
-                if idx.flow_type == "biosphere"
-                else self.lca.product_dict
+        """Map the exchanges of the scenarios to matrix rows, columns and
+        exchange types.
+
+        Every unique key and flow type of the index is looked up once, the
+        exchanges are then mapped through the integer codes of the index.
+        """
+        inputs, outputs, flows = self.indices.levels
+        input_codes, output_codes, flow_codes = (
+            np.asarray(codes) for codes in self.indices.codes
+        )
+        biosphere = np.asarray(flows == "biosphere")[flow_codes]
+
+        def lookup(mapping: dict, keys: pd.Index, used: np.ndarray) -> np.ndarray:
+            positions = np.full(len(keys), -1, dtype=np.int64)
+            for i in np.flatnonzero(used):
+                position = mapping.get(keys[i])
+                if position is None:
+                    try:
+                        # bw25 compatibility
+                        position = mapping.get(bd.get_activity(keys[i]).id)
+                    except Exception:
+                        pass
+                positions[i] = -1 if position is None else position
+            return positions
+
+        def used(codes: np.ndarray, size: int) -> np.ndarray:
+            return np.bincount(codes, minlength=size) > 0
+
+        product_rows = lookup(
+            self.lca.product_dict, inputs, used(input_codes[~biosphere], len(inputs))
+        )
+        biosphere_rows = lookup(
+            self.lca.biosphere_dict, inputs, used(input_codes[biosphere], len(inputs))
+        )
+        cols = lookup(self.lca.activity_dict, outputs, used(output_codes, len(outputs)))
+        types = np.array(
+            [bd.utils.TYPE_DICTIONARY.get(flow, -1) for flow in flows], dtype=np.int64
+        )
+
+        rows = np.where(
+            biosphere, biosphere_rows[input_codes], product_rows[input_codes]
+        )
+        cols = cols[output_codes]
+        missing = (rows < 0) | (cols < 0)
+        if missing.any():
+            # This is to be used as a fail safe for the case where we don't catch a bad exchange during the import
+            # process, or if something else causes an issue with the exchange
+            i = np.flatnonzero(missing)[0]
+            index = Index.build_from_dict(
+                dict(zip(("input", "output", "flow type"), self.indices[i]))
             )
-            try:
-                return (
-                    in_dict.get(idx.input),
-                    self.lca.activity_dict.get(idx.output),
-                    idx.exchange_type,
-                )
-            except:
-                # bw25 compatibility
-                return (
-                    in_dict.get(bd.get_activity(idx.input).id),
-                    self.lca.activity_dict.get(bd.get_activity(idx.output).id),
-                    idx.exchange_type,
-                )
+            msg = f"One of the activities in the exchange between ({index.input.database}, {index.input.code}) and ({index.output.database}, {index.output.code}) from the scenario file is not present within the designated database. Please check both keys for this exchange within your scenario file with the corresponding databases."
+            critical = ABPopup.abCritical(
+                "Scenario Key Error", msg, QPushButton("Cancel")
+            )
+            critical.exec_()
+            raise ScenarioExchangeNotFoundError
 
-        for i, index in enumerate(self.indices):
-            try:
-                self.matrix_indices[i] = convert(index)
-            except (ValueError, KeyError) as e:
-                # This is to be used as a fail safe for the case where we don't catch a bad exchange during the import
-                # process, or if something else causes an issue with the exchange
-                msg = f"One of the activities in the exchange between ({index.input.database}, {index.input.code}) and ({index.output.database}, {index.output.code}) from the scenario file is not present within the designated database. Please check both keys for this exchange within your scenario file with the corresponding databases."
-                critical = ABPopup.abCritical(
-                    "Scenario Key Error", msg, QPushButton("Cancel")
+        self.matrix_indices["row"] = rows
+        self.matrix_indices["col"] = cols
+        self.matrix_indices["type"] = types[flow_codes]
+
+    def build_scenario_samples(self) -> None:
+        """Prepare the matrix indices and matrix values of all scenarios, per
+        flow type, so a scenario can be set with a single assignment.
+
+        Absent (NaN) values in the scenarios are replaced with the defaults
+        from the databases, and technosphere inputs are negated the same way
+        as in the technosphere matrix.
+        """
+        types = np.asarray(self.indices.get_level_values(2))
+        self.scenario_samples = {}
+        for kind in set(types.tolist()):
+            idx = self.matrix_indices[types == kind]
+            values = np.array(self.values[types == kind], dtype=np.float64)
+            values[idx["type"] == 1] *= -1
+            missing = np.isnan(values)
+            if missing.any():
+                default = getattr(self, self.defaults[kind])
+                rows = np.flatnonzero(missing.any(axis=1))
+                defaults = np.asarray(
+                    default[idx["row"][rows], idx["col"][rows]]
+                ).ravel()
+                values[rows] = np.where(
+                    missing[rows], defaults[:, np.newaxis], values[rows]
                 )
-                critical.exec_()
-                raise ScenarioExchangeNotFoundError
-            except Exception as e:
-                continue
+            self.scenario_samples[kind] = (idx, values)
 
-    def update_matrices(self) -> None:
+    def _scenario_sample(self, kind: str, index: int) -> tuple:
+        """Return the matrix indices and matrix values of the given flow type
+        for the scenario at `index`.
+        """
+        idx, values = self.scenario_samples[kind]
+        return idx, values[:, index]
+
+    def update_matrices(self, index: Optional[int] = None) -> None:
         """A Simplified version of the `PackagesDataLoader.update_matrices` method.
         In this case, we expect to only replace technosphere and biosphere
         values, leaving out characterization factor values.
+
+        Updates the matrices to the scenario at `index`, or the current
+        scenario if no index is given.
         """
-        kinds = set([idx[2] for idx in self.indices])
-        types = np.array([idx[2] for idx in self.indices])
-        for kind in kinds:
-            idx = self.matrix_indices[types == kind]
-            sample = self.values[types == kind, self.current]
-            # Previously filtered sample and idx for NaN values in samples.
-            # Currently replaces sample NaN values with defaults from the databases
-            if np.isnan(sample).any():
-                default = getattr(self, self.defaults[kind])
-                na_idx = idx[np.isnan(sample)]
-                if kind == "technosphere":
-                    sample[np.isnan(sample)] = np.multiply(
-                        default[na_idx["row"], na_idx["col"]].tolist()[0], -1
-                    )
-                else:
-                    sample[np.isnan(sample)] = default[
-                        na_idx["row"], na_idx["col"]
-                    ].tolist()[0]
+        index = self.current if index is None else index
+        for kind in self.scenario_samples:
+            idx, sample = self._scenario_sample(kind, index)
             try:
                 matrix = getattr(self.lca, self.matrices[kind])
             except AttributeError:
@@ -195,88 +277,140 @@ class SuperstructureMLCA(MLCA):
                 if hasattr(self.lca, "solver"):
                     delattr(self.lca, "solver")
 
-            # TODO: Check if this doesnt break stuff
-            # TODO: Update: It does..
-            try:
-                if kind == "technosphere":
-                    MB.fix_supply_use(idx, sample)
-            except:
-                # removed in BW25
-                mask = np.where(idx["type"] == 1)
-                sample[mask] = -1 * sample[mask]
             matrix[
                 idx["row"],
                 idx["col"],
             ] = sample
 
+    def calculate(self, workers: int = 1):
+        """Calculate the results of all scenarios.
+
+        If more than one worker is given, the scenarios are calculated in
+        separate processes, see `_perform_calculations_parallel`.
+        """
+        if workers > 1 and self.total > 1:
+            self._perform_calculations_parallel(workers)
+        else:
+            self._perform_calculations()
+
+    def _perform_calculations_parallel(self, workers: int) -> None:
+        """Calculate the scenarios in a pool of worker processes.
+
+        The default matrices, demand and characterization factors are shared
+        with the workers once through shared memory, every task only consists
+        of the values of a single scenario.
+        """
+        self._writable_results()
+        technosphere = self.default_technosphere_matrix.tocsr()
+        biosphere = self.default_biosphere_matrix.tocsr()
+        arrays = {
+            "technosphere_data": technosphere.data,
+            "technosphere_indices": technosphere.indices,
+            "technosphere_indptr": technosphere.indptr,
+            "biosphere_data": biosphere.data,
+            "biosphere_indices": biosphere.indices,
+            "biosphere_indptr": biosphere.indptr,
+            "demand": self._build_demand_matrix(),
+            "characterization_factors": self.characterization_factors,
+        }
+        for kind, (idx, _) in self.scenario_samples.items():
+            arrays[f"{kind}_row"] = idx["row"]
+            arrays[f"{kind}_col"] = idx["col"]
+        shapes = {
+            "technosphere_matrix": technosphere.shape,
+            "biosphere_matrix": biosphere.shape,
+        }
+        samples = (
+            {kind: values[:, i] for kind, (_, values) in self.scenario_samples.items()}
+            for i in range(self.total)
+        )
+
+        blocks, descriptions = share_arrays(arrays)
+        try:
+            with process_pool(
+                min(workers, self.total),
+                initializer=init_scenario_worker,
+                initargs=(descriptions, shapes, self.matrices),
+            ) as pool:
+                results = pool.map(calculate_scenario, range(self.total), samples)
+                for ps_col, supply, technosphere_flows, inventory, lcia in results:
+                    self._store_lci_results(
+                        supply, technosphere_flows, inventory, ps_col
+                    )
+                    (
+                        self.lca_scores[:, :, ps_col],
+                        self.elementary_flow_contributions[:, :, ps_col],
+                        self.process_contributions[:, :, ps_col],
+                    ) = lcia
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
     def _perform_calculations(self):
-        """Near copy of `MLCA` class, but includes a loop for all scenarios."""
+        """Near copy of `MLCA` class, but includes a loop for all scenarios.
+
+        The technosphere is factorized once per scenario, after which all
+        reference flows of that scenario are solved in a single pass.
+        """
+        self._writable_results()
+        demand = self._build_demand_matrix()
         for ps_col in range(self.total):
             self.next_scenario()
-            for row, func_unit in enumerate(self.func_units):
-                try:
-                    self.lca.redo_lci(func_unit)
-                except:
-                    # bw25 compatibility requires activity id instead of activity key
-                    key = list(func_unit.keys())[0]
-                    self.lca.redo_lci({bd.get_activity(key).id: func_unit[key]})
-
-                self.scaling_factors.update(
-                    {(str(func_unit), ps_col): self.lca.supply_array}
-                )
-                self.technosphere_flows.update(
-                    {
-                        (str(func_unit), ps_col): np.multiply(
-                            self.lca.supply_array,
-                            self.lca.technosphere_matrix.diagonal(),
-                        )
-                    }
-                )
-                self.inventory.update(
-                    {
-                        (str(func_unit), ps_col): np.array(
-                            self.lca.inventory.sum(axis=1)
-                        ).ravel()
-                    }
-                )
-                self.inventories.update({(str(func_unit), ps_col): self.lca.inventory})
-
-                for col, cf_matrix in enumerate(self.method_matrices):
-                    self.lca.characterization_matrix = cf_matrix
-                    self.lca.lcia_calculation()
-                    self.lca_scores[row, col, ps_col] = self.lca.score
-                    self.characterized_inventories[(row, col, ps_col)] = (
-                        self.lca.characterized_inventory.copy()
-                    )
-                    self.elementary_flow_contributions[row, col, ps_col] = np.array(
-                        self.lca.characterized_inventory.sum(axis=1)
-                    ).ravel()
-                    self.process_contributions[row, col, ps_col] = (
-                        self.lca.characterized_inventory.sum(axis=0)
-                    )
+            supply = self._solve_demand_matrix(demand)
+            technosphere_flows = np.multiply(
+                supply, self.lca.technosphere_matrix.diagonal()[:, np.newaxis]
+            )
+            inventory = self.lca.biosphere_matrix @ supply
+            self._store_lci_results(supply, technosphere_flows, inventory, ps_col)
 
-    def update_lca_calculation_for_sankey(
-        self, scenario_index: int, func_unit: str, method_index: int
-    ):
+            (
+                self.lca_scores[:, :, ps_col],
+                self.elementary_flow_contributions[:, :, ps_col],
+                self.process_contributions[:, :, ps_col],
+            ) = self._lcia_calculation(supply, inventory)
+
+    def _biosphere_matrix(self, key: tuple) -> sparse.spmatrix:
+        """Return the biosphere matrix of the scenario in the `inventories` key."""
+        if "biosphere" not in self.scenario_samples:
+            return self.default_biosphere_matrix
+        idx, sample = self._scenario_sample("biosphere", key[1])
+        matrix = self.default_biosphere_matrix.copy()
+        matrix[idx["row"], idx["col"]] = sample
+        return matrix
+
+    def _build_characterized_inventory(self, key: tuple) -> sparse.spmatrix:
+        """Rebuild the characterized inventory for the (reference flow index,
+        method index, scenario index) `key`.
         """
-        Reuses the LCA object to prepare the LCA object for necessary calculations to be made before performing the
-        Graph Traversal calculations
+        row, col, ps_col = key
+        inventory = self.inventories[self._lci_key(self.func_units[row], ps_col)]
+        return self.method_matrices[col] * inventory
+
+    @staticmethod
+    def _lci_key(func_unit: dict, scenario: Optional[int] = None) -> tuple:
+        return str(func_unit), scenario
+
+    @staticmethod
+    def _lcia_key(row: int, col: int, scenario: Optional[int] = None) -> tuple:
+        return row, col, scenario
+
+    def _scenarios(self) -> list:
+        return list(range(self.total))
+
+    def update_lca_calculation_for_sankey(
+        self, scenario_index: int, func_unit: dict, method_index: int
+    ) -> None:
+        """Prepare the LCA object for the scenario, reference flow and impact
+        category, see `MLCA.update_lca_calculation_for_sankey`.
 
-        @param scenario_index: Index of the Scenario for which the calculation must be performed
-        @param func_unit: The functional unit for which the calculation must be performed
-        @param method_index: Index of the method for which the calculation must be performed
+        The technosphere matrix of the scenario is factorized again.
         """
-        self.current = scenario_index
-        self.update_matrices()
-        try:
-            self.lca.redo_lci(func_unit)
-        except:
-            # brightway25 compatibility
-            key = list(func_unit.keys())[0]
-            self.lca.redo_lci({bd.get_activity(key).id: func_unit[key]})
-        self.lca.characterization_matrix = self.method_matrices[method_index]
-        self.lca.lcia_calculation()
+        self.set_scenario(scenario_index)
         self.lca.decompose_technosphere()
+        super().update_lca_calculation_for_sankey(
+            scenario_index, func_unit, method_index
+        )
 
     def get_results_for_method(self, index: int = 0) -> pd.DataFrame:
         """Overrides the parent and returns a dataframe with the scenarios
@@ -285,23 +419,6 @@ class SuperstructureMLCA(MLCA):
         data = self.lca_scores[:, index, :]
         return pd.DataFrame(data, index=self.func_key_list, columns=self.scenario_names)
 
-    def _get_steps_to_index(self, index: int) -> list:
-        """Determine how many steps to take when given the index we want
-         to land on.
-
-        We can only iterate through the presample arrays in one direction, so
-         if we go from 2 to 1 we need to calculate the amount of steps to loop
-         around to 1.
-        """
-        if index < 0:
-            raise ValueError("Negative indexes are not allowed")
-        elif index >= self.total:
-            raise ValueError("Given index is not possible for current scenario dataset")
-        if index < self.current:
-            return [*range(self.current, self.total), *range(index)]
-        else:
-            return list(range(self.current, index))
-
     def lca_scores_to_dataframe(self) -> pd.DataFrame:
         """Returns a dataframe of LCA scores using FU labels as index and
         the product of methods and scenarios as columns.
@@ -2,6 +2,7 @@
 import time
 from logging import getLogger
 
+import numpy as np
 import pandas as pd
 
 from activity_browser.mod import bw2data as bd
@@ -60,14 +61,14 @@ def edit_superstructure_for_string(
     return text_list
 
 
-def guess_flow_type(row: pd.Series) -> str:
-    """Given a series of input- and output keys, make a guess on the flow type."""
-    if row.iat[0][0] == bd.config.biosphere:
-        return "biosphere"
-    elif row.iat[0] == row.iat[1]:
-        return "production"
-    else:
-        return "technosphere"
+def guess_flow_types(keys: pd.DataFrame) -> np.ndarray:
+    """Given a frame of input- and output keys, make a guess on the flow types."""
+    inputs, outputs = keys.iloc[:, 0], keys.iloc[:, 1]
+    return np.where(
+        inputs.str[0] == bd.config.biosphere,
+        "biosphere",
+        np.where(inputs == outputs, "production", "technosphere"),
+    )
 
 
 def _time_it_(func):
@@ -2,15 +2,16 @@ from collections import UserList
 from itertools import chain
 from typing import Iterable, List, NamedTuple, Optional
 
+import bw2data as bd
 import numpy as np
-
-from activity_browser.mod import bw2data as bd
-from activity_browser.mod.bw2data.backends import (ActivityDataset,
-                                                   ExchangeDataset)
-from activity_browser.mod.bw2data.parameters import (ActivityParameter,
-                                                     DatabaseParameter,
-                                                     ParameterizedExchange,
-                                                     ProjectParameter)
+from bw2data.parameters import (ActivityParameter, DatabaseParameter,
+                                ParameterizedExchange, ProjectParameter)
+
+try:
+    from bw2data.backends.peewee import ActivityDataset, ExchangeDataset
+except ModuleNotFoundError:
+    # we're running bw25
+    from bw2data.backends import ActivityDataset, ExchangeDataset
 
 """
 This script is a collection of simple NamedTuple classes as well as Iterators
@@ -4,6 +4,7 @@
 Each of these classes is either a parent for - or a sub-LCA results tab.
 """
 
+import os
 from collections import namedtuple
 from typing import List, Optional, Union
 from logging import getLogger
@@ -14,8 +15,8 @@ from PySide2.QtWidgets import (QApplication, QButtonGroup, QCheckBox,
                                QComboBox, QFileDialog, QGridLayout, QGroupBox,
                                QHBoxLayout, QLabel, QLineEdit, QMessageBox,
                                QPushButton, QRadioButton, QScrollArea,
-                               QTableView, QTabWidget, QToolBar, QVBoxLayout,
-                               QWidget)
+                               QSpinBox, QTableView, QTabWidget, QToolBar,
+                               QVBoxLayout, QWidget)
 from stats_arrays.errors import InvalidParamsError
 
 from activity_browser import signals
@@ -29,6 +30,7 @@ from ...ui.figures import (ContributionPlot, CorrelationPlot,
 from ...ui.icons import qicons
 from ...ui.style import header, horizontal_line, vertical_line
 from ...ui.tables import ContributionTable, InventoryTable, LCAResultsTable
+from ...ui.threading import ABThread
 from ...ui.web import SankeyNavigatorWidget
 from ...ui.widgets import CutoffMenu, SwitchComboBox
 from .base import BaseRightTab
@@ -1238,6 +1240,7 @@ class MonteCarloTab(NewAnalysisTab):
         self.export_widget = self.build_export(has_plot=True, has_table=True)
         self.layout.addWidget(self.export_widget)
         self.layout.setAlignment(QtCore.Qt.AlignTop)
+        self.worker_thread = MonteCarloWorkerThread(self)
         self.connect_signals()
         self.explain_text = """
             <p><b>Monte Carlo Analyses</b></p>
@@ -1253,6 +1256,7 @@ class MonteCarloTab(NewAnalysisTab):
 
     def connect_signals(self):
         self.button_run.clicked.connect(self.calculate_mc_lca)
+        self.worker_thread.finished.connect(self.parallel_mc_lca_finished)
         # signals.monte_carlo_ready.connect(self.update_mc)
         # self.combobox_fu.currentIndexChanged.connect(self.update_plot)
         self.combobox_methods.currentIndexChanged.connect(
@@ -1288,6 +1292,14 @@ class MonteCarloTab(NewAnalysisTab):
         )
         self.seed = QLineEdit("")
         self.seed.setFixedWidth(30)
+        self.label_workers = QLabel("Processes:")
+        self.label_workers.setToolTip(
+            "Number of processes to divide the iterations over. "
+            "Samples are reproducible for the same seed and number of processes."
+        )
+        self.workers = QSpinBox()
+        self.workers.setRange(1, os.cpu_count() or 1)
+        self.workers.setValue(1)
 
         self.hlayout_run = QHBoxLayout()
         self.hlayout_run.addWidget(self.scenario_label)
@@ -1297,6 +1309,8 @@ class MonteCarloTab(NewAnalysisTab):
         self.hlayout_run.addWidget(self.iterations)
         self.hlayout_run.addWidget(self.label_seed)
         self.hlayout_run.addWidget(self.seed)
+        self.hlayout_run.addWidget(self.label_workers)
+        self.hlayout_run.addWidget(self.workers)
         self.hlayout_run.addWidget(self.include_box)
         self.hlayout_run.addStretch(1)
         layout_mc.addLayout(self.hlayout_run)
@@ -1384,6 +1398,18 @@ class MonteCarloTab(NewAnalysisTab):
         }
 
         QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        if self.workers.value() > 1 and iterations > 1:
+            # Wait for the worker processes in a thread, see MonteCarloWorkerThread
+            self.button_run.setEnabled(False)
+            self.worker_thread.set_mc(
+                self.parent.mc,
+                iterations=iterations,
+                seed=seed,
+                workers=self.workers.value(),
+                **includes,
+            )
+            self.worker_thread.start()
+            return
         try:
             self.parent.mc.calculate(iterations=iterations, seed=seed, **includes)
             signals.monte_carlo_finished.emit()
@@ -1391,11 +1417,7 @@ class MonteCarloTab(NewAnalysisTab):
         except (
             InvalidParamsError
         ) as e:  # This can occur if uncertainty data is missing or otherwise broken
-            # print(e)
-            log.error(e)
-            QMessageBox.warning(
-                self, "Could not perform Monte Carlo simulation", str(e)
-            )
+            self.monte_carlo_failed(e)
         QApplication.restoreOverrideCursor()
 
         # a threaded way for this - unfortunatley this crashes as:
@@ -1452,6 +1474,22 @@ class MonteCarloTab(NewAnalysisTab):
         # self.plot.show()
         # self.export_widget.show()
 
+    @QtCore.Slot(name="parallelMcLcaFinished")
+    def parallel_mc_lca_finished(self):
+        QApplication.restoreOverrideCursor()
+        self.button_run.setEnabled(True)
+        if self.worker_thread.error is not None:
+            self.monte_carlo_failed(self.worker_thread.error)
+            return
+        signals.monte_carlo_finished.emit()
+        self.update_mc()
+
+    def monte_carlo_failed(self, error: Exception) -> None:
+        log.error(error)
+        QMessageBox.warning(
+            self, "Could not perform Monte Carlo simulation", str(error)
+        )
+
     def configure_scenario(self):
         super().configure_scenario()
         self.scenario_label.setVisible(self.has_scenarios)
@@ -1731,28 +1769,35 @@ class GSATab(NewAnalysisTab):
     #     filename = '_'.join((str(x) for x in fields if x is not None))
 
 
-class MonteCarloWorkerThread(QtCore.QThread):
-    """A worker for Monte Carlo simulations.
+class MonteCarloWorkerThread(ABThread):
+    """A worker waiting for a parallel Monte Carlo simulation, so the interface
+    stays responsive while the iterations are calculated in worker processes.
 
     Unfortunately, pyparadiso does not allow parallel calculations on Windows (crashes).
-    So this is for future reference in case this issue is solved..."""
+    So the serial simulation, which solves in the calling thread, is not run here."""
 
-    def __init__(self):
-        pass
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.mc = None
+        self.kwargs = {}
+        self.error = None
 
-    def set_mc(self, mc, iterations=20):
+    def set_mc(self, mc, **kwargs):
         self.mc = mc
-        self.iterations = iterations
-
-    def run(self):
-        log.info(f"Starting new Worker Thread. Iterations: {self.iterations}")
-        self.mc.calculate(iterations=self.iterations)
-        # res = bw.GraphTraversal().calculate(self.demand, self.method, self.cutoff, self.max_calc)
-        log.info("in thread {}".format(QtCore.QThread.currentThread()))
-        signals.monte_carlo_ready.emit(self.mc.cs_name)
+        self.kwargs = kwargs
 
+    def run_safely(self):
+        log.info(f"Starting new Worker Thread. Iterations: {self.kwargs['iterations']}")
+        self.error = None
+        try:
+            self.mc.calculate(**self.kwargs)
+        except Exception as e:
+            self.error = e
+            # InvalidParamsError can occur if uncertainty data is missing or
+            # otherwise broken, anything else is unexpected
+            if not isinstance(e, InvalidParamsError):
+                raise
 
-worker_thread = MonteCarloWorkerThread()
 
 # TODO review if can be removed
 
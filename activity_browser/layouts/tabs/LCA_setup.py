@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 from logging import getLogger
 
 import pandas as pd
@@ -14,6 +15,7 @@ from ...bwutils.superstructure import (SUPERSTRUCTURE, ABCSVImporter,
                                        SuperstructureManager, _time_it_,
                                        edit_superstructure_for_string,
                                        import_from_excel,
+                                       scenario_file_cache,
                                        scenario_names_from_df,
                                        scenario_replace_databases)
 from ...ui.icons import qicons
@@ -120,6 +122,15 @@ class LCASetupTab(QtWidgets.QWidget):
         self.calculate_button = QtWidgets.QPushButton(qicons.calculate, "Calculate")
         self.calculation_type = QtWidgets.QComboBox()
         self.calculation_type.addItems(["Standard LCA", "Scenario LCA"])
+        self.label_workers = QtWidgets.QLabel("Processes:")
+        self.label_workers.setToolTip(
+            "Number of processes to divide the scenarios over."
+        )
+        self.workers = QtWidgets.QSpinBox()
+        self.workers.setRange(1, os.cpu_count() or 1)
+        self.workers.setValue(1)
+        self.label_workers.hide()
+        self.workers.hide()
 
         name_row = QtWidgets.QHBoxLayout()
         name_row.addWidget(header("Calculation Setup:"))
@@ -133,6 +144,8 @@ class LCASetupTab(QtWidgets.QWidget):
         calc_row = QtWidgets.QHBoxLayout()
         calc_row.addWidget(self.calculate_button)
         calc_row.addWidget(self.calculation_type)
+        calc_row.addWidget(self.label_workers)
+        calc_row.addWidget(self.workers)
         calc_row.addStretch(1)
 
         container = QtWidgets.QVBoxLayout()
@@ -212,6 +225,7 @@ class LCASetupTab(QtWidgets.QWidget):
                 "cs_name": self.list_widget.name,
                 "calculation_type": "scenario",
                 "data": self.scenario_panel.scenario_dataframe(),
+                "workers": self.workers.value(),
             }
         else:
             return
@@ -250,9 +264,13 @@ class LCASetupTab(QtWidgets.QWidget):
         if index == self.DEFAULT:
             # Standard LCA
             self.scenario_panel.hide()
+            self.label_workers.hide()
+            self.workers.hide()
         elif index == self.SCENARIOS:
             # Scenario LCA
             self.scenario_panel.show()
+            self.label_workers.show()
+            self.workers.show()
         self.cs_panel.updateGeometry()
 
     def enable_calculations(self):
@@ -593,9 +611,16 @@ class ScenarioImportWidget(QtWidgets.QWidget):
                 log.debug("separator == '{}'".format(separator))
                 QtWidgets.QApplication.setOverrideCursor(Qt.WaitCursor)
                 log.info("Loading Scenario file. This may take a while for large files")
+                # Files that were imported before are not read and validated again
+                cache_key = scenario_file_cache.file_key(
+                    path, sheet=idx, separator=separator
+                )
+                cached = scenario_file_cache.load(cache_key)
                 # Try and read as a superstructure file
                 # Choose a different routine for reading the file dependent on file type
-                if file_type_suffix == ".feather":
+                if cached is not None:
+                    df = cached
+                elif file_type_suffix == ".feather":
                     df = ABFeatherImporter.read_file(path)
                 elif file_type_suffix.startswith(".xls"):
                     df = import_from_excel(path, idx)
@@ -606,7 +631,7 @@ class ScenarioImportWidget(QtWidgets.QWidget):
                     if df is None:
                         QtWidgets.QApplication.restoreOverrideCursor()
                         return
-                    self.sync_superstructure(df)
+                    self.sync_superstructure(df, cache_key, cached is not None)
                 # Read the file as a parameter scenario file if it is correspondingly arranged
                 elif len(df.columns.intersection({"Name", "Group"})) == 2:
                     # Try and read as parameter scenario file.
@@ -673,20 +698,30 @@ class ScenarioImportWidget(QtWidgets.QWidget):
             QtWidgets.QApplication.restoreOverrideCursor()
 
     @_time_it_
-    def sync_superstructure(self, df: pd.DataFrame) -> None:
+    def sync_superstructure(
+        self, df: pd.DataFrame, cache_key: str = None, validated: bool = False
+    ) -> None:
         """synchronizes the contents of either a single, or multiple scenario files to create a single scenario
-        dataframe"""
+        dataframe
+
+        A dataframe that is not yet `validated` is checked against the local databases first, and
+        cached under the `cache_key` of its file if it did not need relinking to other databases."""
         # TODO: Move the 'scenario_df' into the model itself.
-        QtWidgets.QApplication.restoreOverrideCursor()
-        df = self.scenario_db_check(df)
-        QtWidgets.QApplication.setOverrideCursor(Qt.WaitCursor)
-        df = SuperstructureManager.fill_empty_process_keys_in_exchanges(df)
-        SuperstructureManager.verify_scenario_process_keys(df)
-        df = SuperstructureManager.check_duplicates(df)
-        # TODO add the key checks here and field checks here.
-        # If we've cancelled the import then we don't want to load the dataframe
-        if df.empty:
-            return
+        if not validated:
+            QtWidgets.QApplication.restoreOverrideCursor()
+            checked = self.scenario_db_check(df)
+            QtWidgets.QApplication.setOverrideCursor(Qt.WaitCursor)
+            relinked = checked is not df
+            df = SuperstructureManager.fill_empty_process_keys_in_exchanges(checked)
+            SuperstructureManager.verify_scenario_process_keys(df)
+            df = SuperstructureManager.check_duplicates(df)
+            # TODO add the key checks here and field checks here.
+            # If we've cancelled the import then we don't want to load the dataframe
+            if df.empty:
+                return
+            # relinking depends on the choices made in the dialog, don't cache it
+            if cache_key is not None and not relinked:
+                scenario_file_cache.save(cache_key, df)
         self.scenario_df = df
         cols = scenario_names_from_df(self.scenario_df)
         self.table.model.sync(cols)
@@ -34,31 +34,25 @@ class SQLiteBackend(SQLiteBackend):
         # get all affected activities and exchanges that have QUpdater counterparts (i.e. have signals attached to them)
         acts = [
             (Activity(ActivityDataset.get_by_id(qact["id"])), qact)
-            for qact in qactivity_list
-            if qact["database"] == self.name
+            for qact in qactivity_list.find("database", self.name)
         ]
 
+        qexcs = {
+            qexc.identifier: qexc
+            for field in ("input_database", "output_database")
+            for qexc in qexchange_list.find(field, self.name)
+        }
         excs = [
             (Exchange(ExchangeDataset.get_by_id(qexc["id"])), qexc)
-            for qexc in qexchange_list
-            if qexc["input_database"] == self.name
-            or qexc["output_database"] == self.name
+            for qexc in qexcs.values()
         ]
 
         # execute the patched function for standard functionality
         patched[SQLiteBackend]["delete"](self, *args, **kwargs)
 
         # emit the deleted db, affected activities, and affected exchanges
-        [
-            qdb.emitLater("changed", self)
-            for qdb in qdatabase_list
-            if qdb["name"] == self.name
-        ]
-        [
-            qdb.emitLater("deleted", self)
-            for qdb in qdatabase_list
-            if qdb["name"] == self.name
-        ]
+        qdatabase_list.emitLater(self.name, "changed", self)
+        qdatabase_list.emitLater(self.name, "deleted", self)
 
         for act, qact in acts:
             qact.emitLater("changed", act)
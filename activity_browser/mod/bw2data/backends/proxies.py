@@ -16,14 +16,14 @@ class Exchanges(Exchanges):
 
     def delete(self):
         # find only the exchanges that have qexchange counterparts within ourselves
-        exc_query = ExchangeDataset.id << [qexc["id"] for qexc in qexchange_list]
+        exc_query = ExchangeDataset.id << list(qexchange_list.registry)
         exc_args = self._args + [exc_query]
         excs = [Exchange(doc) for doc in ExchangeDataset.select().where(*exc_args)]
 
         # find only the input or output activities that have qactivity counterparts
 
         # get all qactivity keys
-        act_keys = [(qact["database"], qact["code"]) for qact in qactivity_list]
+        act_keys = {(qact["database"], qact["code"]) for qact in qactivity_list}
 
         # gather affected output activities
 
@@ -61,32 +61,16 @@ class Exchanges(Exchanges):
 
         # emitting change through any existing exchange QUpdaters
         for exc in excs:
-            [
-                qexc.emitLater("changed", exc)
-                for qexc in qexchange_list
-                if qexc["id"] == exc._document.id
-            ]
-            [
-                qexc.emitLater("deleted", exc)
-                for qexc in qexchange_list
-                if qexc["id"] == exc._document.id
-            ]
+            qexchange_list.emitLater(exc._document.id, "changed", exc)
+            qexchange_list.emitLater(exc._document.id, "deleted", exc)
 
         # emitting change through any existing activity QUpdaters
         for act in acts:
-            [
-                qact.emitLater("changed", act)
-                for qact in qactivity_list
-                if qact["id"] == act._document.id
-            ]
+            qactivity_list.emitLater(act._document.id, "changed", act)
 
         # emitting change through any existing database QUpdaters
         for db_name in dbs:
-            [
-                qdb.emitLater("changed", Database(db_name))
-                for qdb in qdatabase_list
-                if qdb["name"] == db_name
-            ]
+            qdatabase_list.emitLater(db_name, "changed", Database(db_name))
 
 
 @patch_superclass
@@ -117,25 +101,17 @@ class Activity(Activity):
         # this is called already within the patched function, but needs to be recalled now the data is actually updated
         databases.set_modified(self["database"])
 
-        # should eventually be replaced
-        AB_metadata.update_metadata(self.key)
+        # buffered, the metadata is updated when it is read next
+        AB_metadata.update_many([self.key])
 
         # exchanges cannot be changed through the activity proxy save function
 
         # emitting change through any existing qactivities (should be 1 or None)
-        [
-            qact.emitLater("changed", self)
-            for qact in qactivity_list
-            if qact["id"] == self._document.id
-        ]
+        qactivity_list.emitLater(self._document.id, "changed", self)
 
         # emitting change through an existing qdatabases (should be 1 or None)
         db = Database(self["database"])
-        [
-            qdb.emitLater("changed", db)
-            for qdb in qdatabase_list
-            if qdb["name"] == self["database"]
-        ]
+        qdatabase_list.emitLater(self["database"], "changed", db)
 
     def delete(self) -> None:
         from activity_browser.bwutils.metadata import AB_metadata
@@ -145,30 +121,18 @@ class Activity(Activity):
 
         databases.set_modified(self["database"])
 
-        # this is leading to a lot of calls and should eventually be dealt with
-        AB_metadata.update_metadata(self.key)
+        # buffered, the metadata is updated when it is read next
+        AB_metadata.delete_many([self.key])
 
         # exchange deletions will emit for themselves
 
         # emitting change through any existing qactivities (should be 1 or None)
-        [
-            qact.emitLater("changed", self)
-            for qact in qactivity_list
-            if qact["id"] == self._document.id
-        ]
-        [
-            qact.emitLater("deleted", self)
-            for qact in qactivity_list
-            if qact["id"] == self._document.id
-        ]
+        qactivity_list.emitLater(self._document.id, "changed", self)
+        qactivity_list.emitLater(self._document.id, "deleted", self)
 
         # emitting change through an existing qdatabases (should be 1 or None)
         db = Database(self["database"])
-        [
-            qdb.emitLater("changed", db)
-            for qdb in qdatabase_list
-            if qdb["name"] == self["database"]
-        ]
+        qdatabase_list.emitLater(self["database"], "changed", db)
 
 
 @patch_superclass
@@ -203,11 +167,7 @@ class Exchange(Exchange):
         patched[Exchange]["save"](self)
 
         # emitting change through any existing qexchanges (should be 1 or None)
-        [
-            qexc.emitLater("changed", self)
-            for qexc in qexchange_list
-            if qexc["id"] == self._document.id
-        ]
+        qexchange_list.emitLater(self._document.id, "changed", self)
 
         # collecting unique activities and databases that have changed
         acts = set()
@@ -220,20 +180,12 @@ class Exchange(Exchange):
         # emitting change through any existing qactivities
         for activity in acts:
             dbs.add(activity["database"])
-            [
-                qact.emitLater("changed", activity)
-                for qact in qactivity_list
-                if qact["id"] == activity._document.id
-            ]
+            qactivity_list.emitLater(activity._document.id, "changed", activity)
 
         # emitting change through any existing qdatabases
         for db_name in dbs:
             db = Database(db_name)
-            [
-                qdb.emitLater("changed", db)
-                for qdb in qdatabase_list
-                if qdb["name"] == db_name
-            ]
+            qdatabase_list.emitLater(db_name, "changed", db)
 
         self.moved_IO.clear()
 
@@ -242,40 +194,16 @@ class Exchange(Exchange):
         patched[Exchange]["delete"](self)
 
         # emitting change and deletion through any existing qexchanges (should be 1 or None)
-        [
-            qexc.emitLater("changed", self)
-            for qexc in qexchange_list
-            if qexc["id"] == self._document.id
-        ]
-        [
-            qexc.emitLater("deleted", self)
-            for qexc in qexchange_list
-            if qexc["id"] == self._document.id
-        ]
+        qexchange_list.emitLater(self._document.id, "changed", self)
+        qexchange_list.emitLater(self._document.id, "deleted", self)
 
         # emitting change for any existing qactivities (should be 1 or None)
-        [
-            qact.emitLater("changed", self.input)
-            for qact in qactivity_list
-            if qact["id"] == self.input._document.id
-        ]
-        [
-            qact.emitLater("changed", self.output)
-            for qact in qactivity_list
-            if qact["id"] == self.output._document.id
-        ]
+        qactivity_list.emitLater(self.input._document.id, "changed", self.input)
+        qactivity_list.emitLater(self.output._document.id, "changed", self.output)
 
         # emitting change for related databases
         in_db = Database(self.input["database"])
-        [
-            qdb.emitLater("changed", in_db)
-            for qdb in qdatabase_list
-            if qdb["name"] == in_db.name
-        ]
+        qdatabase_list.emitLater(in_db.name, "changed", in_db)
 
         out_db = Database(self.output["database"])
-        [
-            qdb.emitLater("changed", out_db)
-            for qdb in qdatabase_list
-            if qdb["name"] == out_db.name
-        ]
+        qdatabase_list.emitLater(out_db.name, "changed", out_db)
@@ -28,27 +28,15 @@ class Method(Method):
         patched[Method]["write"](self, data, process)
 
         # emit for any corresponding qmethod that exists in qmethod_list (each method that has widgets connected to it)
-        [
-            qmthd.emitLater("changed", self)
-            for qmthd in qmethod_list
-            if qmthd["name"] == self.name
-        ]
+        qmethod_list.emitLater(self.name, "changed", self)
 
     def deregister(self):
         # execute the patched function for standard functionality
         patched[Method]["deregister"](self)
 
         # emit for any corresponding qmethod that exists in qmethod_list (each method that has widgets connected to it)
-        [
-            qmthd.emitLater("deleted", self)
-            for qmthd in qmethod_list
-            if qmthd["name"] == self.name
-        ]
-        [
-            qmthd.emitLater("changed", self)
-            for qmthd in qmethod_list
-            if qmthd["name"] == self.name
-        ]
+        qmethod_list.emitLater(self.name, "deleted", self)
+        qmethod_list.emitLater(self.name, "changed", self)
 
     # extending Brightway Functionality
     def load_dict(self) -> dict:
@@ -61,16 +61,8 @@ class PatchedParameterBase(ParameterBase):
             # call the database with the where *args supplied by the user
             for param in cls.select().where(*args):
                 # emit that any connected params will be changed and deleted
-                [
-                    qprm.emitLater("changed", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
-                [
-                    qprm.emitLater("deleted", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
+                qparameter_list.emitLater(param.key, "changed", param)
+                qparameter_list.emitLater(param.key, "deleted", param)
 
             # also emit the overall qparameters
             qparameters.emitLater("parameters_changed")
@@ -83,16 +75,8 @@ class PatchedParameterBase(ParameterBase):
             # collect al params from the database
             for param in cls.select():
                 # emit that any connected params will be changed and deleted
-                [
-                    qprm.emitLater("changed", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
-                [
-                    qprm.emitLater("deleted", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
+                qparameter_list.emitLater(param.key, "changed", param)
+                qparameter_list.emitLater(param.key, "deleted", param)
 
             # also emit the overall qparameters
             qparameters.emitLater("parameters_changed")
@@ -117,16 +101,8 @@ class PatchedParameterBase(ParameterBase):
             # call the database with the where *args supplied by the user
             for param in cls.select().where(*where_args):
                 # emit that any connected params will be changed
-                [
-                    qprm.emitLater("changed", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
-                [
-                    qprm.emitLater("deleted", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
+                qparameter_list.emitLater(param.key, "changed", param)
+                qparameter_list.emitLater(param.key, "deleted", param)
 
             # also emit the overall qparameters
             qparameters.emitLater("parameters_changed")
@@ -141,16 +117,8 @@ class PatchedParameterBase(ParameterBase):
         def execute():
             for param in cls.select():
                 # emit that any connected params will be changed
-                [
-                    qprm.emitLater("changed", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
-                [
-                    qprm.emitLater("deleted", param)
-                    for qprm in qparameter_list
-                    if qprm["key"] == param.key
-                ]
+                qparameter_list.emitLater(param.key, "changed", param)
+                qparameter_list.emitLater(param.key, "deleted", param)
 
             # also emit the overall qparameters
             qparameters.emitLater("parameters_changed")
@@ -179,11 +147,7 @@ class PatchedParameterBase(ParameterBase):
         patched[ParameterBase]["save"](self, **kwargs)
 
         # signal the changed parameter if it has signals connected to it
-        [
-            qprm.emitLater("changed", self)
-            for qprm in qparameter_list
-            if qprm["key"] == self.key
-        ]
+        qparameter_list.emitLater(self.key, "changed", self)
 
         # always signal through the qparameters if a parameter has changed
         qparameters.emitLater("parameters_changed")
@@ -197,6 +197,15 @@ class ABSettings(BaseSettings):
     def theme(self, new_theme: str) -> None:
         self.settings.update({"theme": new_theme})
 
+    @property
+    def persist_sankeys(self) -> bool:
+        """Returns whether calculated Sankeys are stored on disk"""
+        return self.settings.get("persist_sankeys", True)
+
+    @persist_sankeys.setter
+    def persist_sankeys(self, persist: bool) -> None:
+        self.settings.update({"persist_sankeys": persist})
+
 
 class ProjectSettings(BaseSettings):
     """
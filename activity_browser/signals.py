@@ -263,8 +263,8 @@ class QDatastore(QUpdater):
     instantiate a QDatastore and connect or connect to an already existing QDatastore.
 
     QDatastore objects are children of the persistent list-QObjects, which are described below, and can be used to
-    iterate over the existing QDatastores. QDatastores are initialized using keyword-arguments that can later be used to
-    match them to their corresponding Brightway counterpart. The QDatastore for an Activity will for example be
+    find or iterate over the existing QDatastores. QDatastores are initialized using keyword-arguments that can later be
+    used to match them to their corresponding Brightway counterpart. The QDatastore for an Activity will for example be
     initialized using the Activity Model Fields like "id", "database" and "code".
     """
 
@@ -274,6 +274,7 @@ class QDatastore(QUpdater):
     def __init__(self, parent=None, **kwargs):
         super().__init__(parent)
         self.fields = kwargs
+        self.identifier = None
         self.connected = 0
         self.cache = {}
 
@@ -291,124 +292,140 @@ class QDatastore(QUpdater):
     def disconnectNotify(self, signal):
         """
         When a disconnection is made from "changed" or "deleted", decrease connected value by one. If connected value is
-        zero, remove ourselves from the list-QObject and deleteLater.
+        zero, deleteLater, which also removes us from the list-QObject.
         """
         signal_name = signal.name().data().decode()
         if signal_name == "changed" or signal_name == "deleted":
             self.connected -= 1
 
         if self.connected == 0:
-            self.setParent(None)
             self.deleteLater()
 
+    def deleteLater(self):
+        """
+        Unregister from the list-QObject, so that we are no longer found or emitted through, and schedule deletion.
+        """
+        parent = self.parent()
+        if isinstance(parent, QDatastoreList):
+            parent.unregister(self)
+        self.setParent(None)
+        super().deleteLater()
 
-class QDatabaseList(QObject):
+
+class QDatastoreList(QObject):
     """
-    A QObject that has Database QUpdaters as its children. Iterate and match using the database name.
+    A QObject that has QDatastores as its children. The QDatastores are registered by an identifier (e.g. the database
+    name or the activity id), so the QDatastore of a Brightway object is found directly instead of by iterating over all
+    children. QDatastores can additionally be looked up by the values of the fields in INDEXED_FIELDS, e.g. all
+    activity QDatastores of a database. A QDatastore unregisters itself when it is scheduled for deletion.
     """
 
+    INDEXED_FIELDS = ()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.registry = {}
+        self.indexes = {field: {} for field in self.INDEXED_FIELDS}
+
     def __iter__(self):
-        for child in self.findChildren(QDatastore):
-            yield child
+        for qdatastore in list(self.registry.values()):
+            yield qdatastore
+
+    def __len__(self):
+        return len(self.registry)
+
+    def get(self, identifier):
+        """Return the QDatastore for this identifier, or None if there is none."""
+        return self.registry.get(identifier)
+
+    def find(self, field: str, value) -> list:
+        """Return the QDatastores of which this indexed field has this value."""
+        return list(self.indexes[field].get(value, {}).values())
+
+    def emitLater(self, identifier, signal_name: str, *args):
+        """Emit this signal through the QDatastore for this identifier, if any."""
+        qdatastore = self.registry.get(identifier)
+        if qdatastore is not None:
+            qdatastore.emitLater(signal_name, *args)
+
+    def _get_or_create(self, identifier, **kwargs):
+        qdatastore = self.registry.get(identifier)
+        if qdatastore is not None:
+            return qdatastore
+
+        qdatastore = QDatastore(self, **kwargs)
+        qdatastore.identifier = identifier
+        self.registry[identifier] = qdatastore
+        for field, index in self.indexes.items():
+            index.setdefault(qdatastore[field], {})[identifier] = qdatastore
+        return qdatastore
+
+    def unregister(self, qdatastore: QDatastore):
+        """Remove the QDatastore from the registry and the indexes."""
+        identifier = qdatastore.identifier
+        if self.registry.get(identifier) is not qdatastore:
+            return
+        del self.registry[identifier]
+        for field, index in self.indexes.items():
+            matches = index.get(qdatastore[field], {})
+            matches.pop(identifier, None)
+            if not matches:
+                index.pop(qdatastore[field], None)
+
+
+class QDatabaseList(QDatastoreList):
+    """
+    A QDatastoreList of Database QUpdaters, registered by the database name.
+    """
 
     def get_or_create(self, database):
         db_name = database if isinstance(database, str) else database.name
+        return self._get_or_create(db_name, name=db_name)
 
-        qdatabase = [
-            qdatabase for qdatabase in self.children() if qdatabase["name"] == db_name
-        ]
-
-        if qdatabase:
-            return qdatabase[0]
-        else:
-            return QDatastore(self, name=db_name)
 
-
-class QActivityList(QObject):
+class QActivityList(QDatastoreList):
     """
-    A QObject that has Activity QUpdaters as its children. Iterate and match using Activity model fields.
+    A QDatastoreList of Activity QUpdaters, registered by the Activity id and indexed by database.
     """
 
-    def __iter__(self):
-        for child in self.findChildren(QDatastore):
-            yield child
+    INDEXED_FIELDS = ("database",)
 
     def get_or_create(self, activity):
         activity = (
             activity if isinstance(activity, Activity) else get_activity(activity)
         )
         doc = activity._document
+        return self._get_or_create(doc.id, **doc.__data__)
 
-        qactivity = [
-            qactivity for qactivity in self.children() if qactivity["id"] == doc.id
-        ]
 
-        if qactivity:
-            return qactivity[0]
-        else:
-            return QDatastore(self, **doc.__data__)
-
-
-class QExchangeList(QObject):
+class QExchangeList(QDatastoreList):
     """
-    A QObject that has Exchange QUpdaters as its children. Iterate and match using Exchange model fields.
+    A QDatastoreList of Exchange QUpdaters, registered by the Exchange id and indexed by input and output database.
     """
 
-    def __iter__(self):
-        for child in self.findChildren(QDatastore):
-            yield child
+    INDEXED_FIELDS = ("input_database", "output_database")
 
     def get_or_create(self, exchange: Exchange):
         doc = exchange._document
-        qexchange = [
-            qexchange for qexchange in self.children() if qexchange["id"] == doc.id
-        ]
+        return self._get_or_create(doc.id, **doc.__data__)
 
-        if qexchange:
-            return qexchange[0]
-        else:
-            return QDatastore(self, **doc.__data__)
 
-
-class QMethodList(QObject):
+class QMethodList(QDatastoreList):
     """
-    A QObject that has Method QUpdaters as its children. Iterate and match using the Method name tuple.
+    A QDatastoreList of Method QUpdaters, registered by the Method name tuple.
     """
 
-    def __iter__(self):
-        for child in self.findChildren(QDatastore):
-            yield child
-
     def get_or_create(self, method: Method):
-        qmethod = [
-            qmethod for qmethod in self.children() if qmethod["name"] == method.name
-        ]
-
-        if qmethod:
-            return qmethod[0]
-        else:
-            return QDatastore(self, name=method.name)
+        return self._get_or_create(method.name, name=method.name)
 
 
-class QParameterList(QObject):
+class QParameterList(QDatastoreList):
     """
-    A QObject that has Parameter QUpdaters as its children. Iterate and match using the Parameter key:
-    Tuple(group, param_name).
+    A QDatastoreList of Parameter QUpdaters, registered by the Parameter key: Tuple(group, param_name).
     """
 
-    def __iter__(self):
-        for child in self.findChildren(QDatastore):
-            yield child
-
     def get_or_create(self, parameter: ParameterBase):
-        qparam = [
-            qparam for qparam in self.children() if qparam["key"] == parameter.key
-        ]
-
-        if qparam:
-            return qparam[0]
-        else:
-            return QDatastore(self, key=parameter.key)
+        return self._get_or_create(parameter.key, key=parameter.key)
 
 
 class QProjects(QUpdater):
@@ -515,13 +515,42 @@ const cartographer = function() {
         graph = new dagre.graphlib.Graph({ multigraph: true }).setGraph({});
 
         // nodes --> graph
-        data.nodes.forEach(buildGraphNode);
+        decodeItems(data.nodes).forEach(buildGraphNode);
         console.log("Nodes successfully loaded...");
 
         // edges --> graph
-        data.edges.forEach(buildGraphEdge);
+        decodeItems(data.edges).forEach(buildGraphEdge);
         console.log("Edges successfully loaded...")
 
+        drawGraph();
+    };
+
+    // Update the current graph with the added, changed and removed nodes and edges.
+    cartographer.update_graph_delta = function (json_delta) {
+        console.log("Updating Graph (delta)");
+        let delta = JSON.parse(json_delta);
+        heading.innerHTML = delta.title;
+
+        // edge widths are relative to the maximum impact, rescale the unchanged edges
+        if(is_sankey_mode && delta["max_impact"] !== max_impact) {
+            max_impact = delta["max_impact"];
+            graph.edges().forEach(function (e) {
+                let edge_data = graph.edge(e);
+                edge_data.weight = Math.abs(edge_data.impact / max_impact) * max_edge_width;
+            });
+        }
+
+        delta.removed_edges.forEach(function (e) { graph.removeEdge(e[0], e[1]); });
+        delta.removed_nodes.forEach(function (n) { graph.removeNode(n); });
+        decodeItems(delta.nodes).forEach(buildGraphNode);
+        decodeItems(delta.edges).forEach(buildGraphEdge);
+        console.log("Delta successfully loaded...", delta.removed_nodes.length, "nodes removed");
+
+        drawGraph();
+    };
+
+    // Render the graph and attach the event listeners to its elements.
+    const drawGraph = function () {
         //re-renders canvas with updated dimensions of the screen
         canvas.render();
         //draws graph into canvas
@@ -609,6 +638,7 @@ const cartographer = function() {
         if(is_sankey_mode) {
             edge_data.label = wrapText(e['product']
                 + '\n(' + roundNumber(e['ind_norm']*100) + '%)', max_string_length);
+            edge_data.impact = e["impact"];
             edge_data.weight = Math.abs(e["impact"] / max_impact ) * max_edge_width;
             let impact_or_benefit = "impact";
             if (e['impact'] < 0) {impact_or_benefit = "benefit"; console.log("BENEFIT");};
@@ -754,6 +784,21 @@ function wrapText(str, length) {
 //    return str.match(new RegExp('.{1,' + length + '}', 'g')).join("\n");
 }
 
+// Large lists of nodes or edges are sent as columns ({field: [values]}),
+// convert these back to a list of objects.
+function decodeItems(items) {
+    if (Array.isArray(items)) return items;
+    let fields = Object.keys(items);
+    let length = fields.length ? items[fields[0]].length : 0;
+    let objects = new Array(length);
+    for (let i = 0; i < length; i++) {
+        let object = {};
+        fields.forEach(function (field) { object[field] = items[field][i]; });
+        objects[i] = object;
+    }
+    return objects;
+}
+
 function roundNumber(number) {
 //    return number.toFixed(2)
     return number.toPrecision(3)
@@ -775,6 +820,7 @@ function formatEdgeText(product) {
 new QWebChannel(qt.webChannelTransport, function (channel) {
     window.bridge = channel.objects.bridge;
     window.bridge.graph_ready.connect(cartographer.update_graph);
+    window.bridge.graph_delta.connect(cartographer.update_graph_delta);
     window.bridge.style.connect(cartographer.update_svg_style);
 });
 
@@ -2,7 +2,7 @@ import json
 import os
 from abc import abstractmethod
 from copy import deepcopy
-from typing import Type
+from typing import Optional, Type
 from logging import getLogger
 
 from PySide2 import QtWebChannel, QtWebEngineWidgets, QtWidgets
@@ -29,12 +29,16 @@ class BaseNavigatorWidget(QtWidgets.QWidget):
 
         # Graph object subclassed from BaseGraph.
         self.graph: Type[BaseGraph]
+        # Graph data as last sent to the web page
+        self.payload = GraphPayload()
 
         # Setup JS / Qt interactions
         self.bridge = Bridge(self)
         self.channel = QtWebChannel.QWebChannel(self)
         self.channel.registerObject("bridge", self.bridge)
         self.view = QtWebEngineWidgets.QWebEngineView(self)
+        # the (re)loaded page has no graph yet, the next one is sent in full
+        self.view.loadFinished.connect(lambda ok: self.payload.reset())
         self.view.loadFinished.connect(self.load_finished_handler)
         self.view.setContextMenuPolicy(Qt.PreventContextMenu)
         self.view.page().setWebChannel(self.channel)
@@ -87,7 +91,17 @@ class BaseNavigatorWidget(QtWidgets.QWidget):
             signals.new_statusbar_message.emit("No data to go back to.")
 
     def send_json(self) -> None:
-        self.bridge.graph_ready.emit(self.graph.json_data)
+        """Send the graph to the web page.
+
+        Once the page shows a graph only the changes to it are sent, the full
+        graph is sent after the page was (re)loaded or when most of the graph
+        changed.
+        """
+        delta = self.payload.delta(self.graph.json_data)
+        if delta is not None:
+            self.bridge.graph_delta.emit(delta)
+        else:
+            self.bridge.graph_ready.emit(self.payload.full(self.graph.json_data))
         css_path = webutils.get_static_css_path(self.css_file)
         css_code = utils.read_file_text(css_path)
         style_element = "<style>" + css_code + "</style>"
@@ -129,6 +143,7 @@ def to_svg(svg):
 
 class Bridge(QObject):
     graph_ready = Signal(str)
+    graph_delta = Signal(str)
     update_graph = Signal(object)
     style = Signal(str)
 
@@ -157,6 +172,82 @@ class Bridge(QObject):
         to_svg(svg)
 
 
+class GraphPayload(object):
+    """Encodes the graph data that is sent to the web page.
+
+    Keeps the nodes and edges that were last sent, so that for an update of
+    the graph only the nodes and edges that were added, changed or removed
+    are sent (see `delta`). Nodes are identified by their 'id', edges by
+    their 'source_id' and 'target_id', like in the javascript graph.
+
+    Lists of nodes or edges with at least `COLUMNAR_THRESHOLD` items are sent
+    in a columnar layout, ``{field: [values]}``, instead of as a list of
+    objects, which avoids repeating the field names for every item.
+    """
+
+    COLUMNAR_THRESHOLD = 500
+
+    def __init__(self):
+        self.nodes = None  # {node id: node}
+        self.edges = None  # {(source id, target id): edge}
+
+    def reset(self) -> None:
+        """Forget the sent graph, the next graph is sent in full."""
+        self.nodes = None
+        self.edges = None
+
+    @staticmethod
+    def index(data: dict) -> (dict, dict):
+        nodes = {node["id"]: node for node in data["nodes"]}
+        edges = {(edge["source_id"], edge["target_id"]): edge for edge in data["edges"]}
+        return nodes, edges
+
+    @classmethod
+    def encode_items(cls, items: list):
+        """Return the items as a list, or in columnar layout if there are many."""
+        if len(items) < cls.COLUMNAR_THRESHOLD:
+            return items
+        fields = dict.fromkeys(field for item in items for field in item)
+        return {field: [item.get(field) for item in items] for field in fields}
+
+    def full(self, json_data: Optional[str]) -> Optional[str]:
+        """Return the payload of the complete graph."""
+        if not json_data:
+            self.reset()
+            return json_data
+        data = json.loads(json_data)
+        self.nodes, self.edges = self.index(data)
+        data["nodes"] = self.encode_items(list(self.nodes.values()))
+        data["edges"] = self.encode_items(list(self.edges.values()))
+        return json.dumps(data)
+
+    def delta(self, json_data: Optional[str]) -> Optional[str]:
+        """Return the payload of the changes since the last sent graph.
+
+        Returns None if the graph has to be sent in full instead: when no
+        graph was sent before, or when the changes are larger than the graph.
+        """
+        if self.nodes is None or not json_data:
+            return None
+        data = json.loads(json_data)
+        nodes, edges = self.index(data)
+
+        new_nodes = [n for i, n in nodes.items() if self.nodes.get(i) != n]
+        new_edges = [e for i, e in edges.items() if self.edges.get(i) != e]
+        removed_nodes = [i for i in self.nodes if i not in nodes]
+        removed_edges = [list(i) for i in self.edges if i not in edges]
+        changes = (new_nodes, new_edges, removed_nodes, removed_edges)
+        if sum(map(len, changes)) >= len(nodes) + len(edges):
+            return None
+
+        self.nodes, self.edges = nodes, edges
+        data["nodes"] = self.encode_items(new_nodes)
+        data["edges"] = self.encode_items(new_edges)
+        data["removed_nodes"] = removed_nodes
+        data["removed_edges"] = removed_edges
+        return json.dumps(data)
+
+
 class BaseGraph(object):
     def __init__(self):
         self.json_data = None
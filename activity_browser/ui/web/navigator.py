@@ -5,13 +5,17 @@ from copy import deepcopy
 from typing import Optional
 from logging import getLogger
 
-import networkx as nx
+import numpy as np
 from PySide2 import QtWidgets
 from PySide2.QtCore import Slot
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
 
 from activity_browser import signals
 from activity_browser.mod.bw2data import Database, get_activity
 
+from ...bwutils import AB_metadata
+from ...bwutils.adjacency import adjacency_index
 from ...bwutils.commontasks import identify_activity_type
 from .base import BaseGraph, BaseNavigatorWidget
 
@@ -239,11 +243,14 @@ class Graph(BaseGraph):
     A JSON representation of the graph (edges and nodes) enables its use in javascript/html/css.
     """
 
+    # fields of the activities shown in the graph
+    FIELDS = ["name", "reference product", "location"]
+
     def __init__(self):
         super().__init__()
         self.central_activity = None
-        self.nodes = None
-        self.edges = None
+        self.nodes = None  # activity keys
+        self.edges = None  # exchanges, see `AdjacencyIndex`
 
         # some settings
         self.direct_only = True  # for a graph expansion: add only direct up-/downstream nodes instead of all connections between the activities in the graph
@@ -266,41 +273,33 @@ class Graph(BaseGraph):
 
     @staticmethod
     def upstream_and_downstream_nodes(key: tuple) -> (list, list):
-        """Returns the upstream and downstream activity objects for a key."""
-        activity = get_activity(key)
-        upstream_nodes = [ex.input for ex in activity.technosphere()]
-        downstream_nodes = [ex.output for ex in activity.upstream()]
-        return upstream_nodes, downstream_nodes
+        """Returns the upstream and downstream activity keys for a key."""
+        up_exs, down_exs = Graph.upstream_and_downstream_exchanges(key)
+        return [ex["input"] for ex in up_exs], [ex["output"] for ex in down_exs]
 
     @staticmethod
     def upstream_and_downstream_exchanges(key: tuple) -> (list, list):
-        """Returns the upstream and downstream Exchange objects for a key.
+        """Returns the upstream and downstream exchanges for a key.
 
-        act.upstream refers to downstream exchanges; brightway is confused here)
+        Equivalent to act.technosphere() and act.upstream() (which refers to
+        downstream exchanges; brightway is confused here), read from the
+        `adjacency_index`.
         """
-        activity = get_activity(key)
-        return [ex for ex in activity.technosphere()], [
-            ex for ex in activity.upstream()
-        ]
+        return adjacency_index.inputs(key), adjacency_index.consumers(key)
 
     @staticmethod
     def inner_exchanges(nodes: list) -> list:
-        """Returns all exchanges (Exchange objects) between a list of nodes."""
-        node_keys = set(node.key for node in nodes)
-        exchanges = itertools.chain(node.technosphere() for node in nodes)
-        return [
-            ex
-            for ex in exchanges
-            if all(k in node_keys for k in (ex["input"], ex["output"]))
-        ]
+        """Returns all exchanges between a list of nodes."""
+        return adjacency_index.exchanges_between(nodes)
 
     def remove_outside_exchanges(self) -> None:
         """
         Ensures that all exchanges are exclusively between nodes of the graph
         (i.e. removes exchanges to previously existing nodes).
         """
+        nodes = set(self.nodes)
         self.edges = [
-            e for e in self.edges if all(k in self.nodes for k in (e.input, e.output))
+            e for e in self.edges if e["input"] in nodes and e["output"] in nodes
         ]
 
     def new_graph(self, key: tuple) -> None:
@@ -314,7 +313,7 @@ class Graph(BaseGraph):
 
         # add nodes
         up_nodes, down_nodes = Graph.upstream_and_downstream_nodes(key)
-        self.nodes = [self.central_activity] + up_nodes + down_nodes
+        self.nodes = [self.central_activity.key] + up_nodes + down_nodes
 
         # add edges
         # self.edges = self.inner_exchanges(self.nodes)
@@ -359,8 +358,7 @@ class Graph(BaseGraph):
         if key == self.central_activity.key:
             log.warning("Cannot remove central activity.")
             return
-        act = get_activity(key)
-        self.nodes.remove(act)
+        self.nodes.remove(key)
         if self.direct_only:
             self.remove_outside_exchanges()
         else:
@@ -373,36 +371,28 @@ class Graph(BaseGraph):
 
     def remove_orphaned_nodes(self) -> None:
         """
-        Remove orphaned nodes from graph using the networkx.
+        Remove orphaned nodes from graph.
         Orphaned nodes are defined as having no path to the central_activity.
         """
-
-        def format_as_weighted_edges(exchanges, activity_objects=False):
-            """Returns the exchanges as a list of weighted edges (from, to, weight) for networkx."""
-            if activity_objects:
-                return ((ex.input, ex.output, ex.amount) for ex in exchanges)
-            else:  # keys
-                return ((ex["input"], ex["output"], ex["amount"]) for ex in exchanges)
-
-        # construct networkx graph
-        G = nx.MultiGraph()
-        for node in self.nodes:
-            G.add_node(node.key)
-        G.add_weighted_edges_from(format_as_weighted_edges(self.edges))
-
-        # identify orphaned nodes
-        # checks each node in current dataset whether it is connected to central node
-        # adds node_id of orphaned nodes to list
-        orphaned_node_ids = (
-            node
-            for node in G.nodes
-            if not nx.has_path(G, node, self.central_activity.key)
+        # label the connected components of the (undirected) graph
+        position = {key: i for i, key in enumerate(dict.fromkeys(self.nodes))}
+        edges = [
+            (position[ex["input"]], position[ex["output"]])
+            for ex in self.edges
+            if ex["input"] in position and ex["output"] in position
+        ]
+        rows, cols = np.array(edges, dtype=np.int64).reshape(-1, 2).T
+        adjacency = sparse.coo_matrix(
+            (np.ones(len(edges)), (rows, cols)), shape=(len(position), len(position))
         )
-
-        count = 1
-        for count, key in enumerate(orphaned_node_ids, 1):
-            act = get_activity(key)
-            self.nodes.remove(act)
+        _, labels = connected_components(adjacency, directed=False)
+
+        # nodes in a different component than the central_activity are orphaned
+        orphaned = labels != labels[position[self.central_activity.key]]
+        count = int(orphaned.sum())
+        if count:
+            orphaned_keys = {key for key, i in position.items() if orphaned[i]}
+            self.nodes = [key for key in self.nodes if key not in orphaned_keys]
         log.info(f"Removed ORPHANED nodes: {count}")
 
         # update edges again to remove those that link to nodes that have been deleted
@@ -413,8 +403,8 @@ class Graph(BaseGraph):
         Make the JSON graph data from a list of nodes and edges.
 
         Args:
-            nodes: a list of nodes (Activity objects)
-            edges: a list of edges (Exchange objects)
+            nodes: a list of nodes (activity keys)
+            edges: a list of edges (exchanges)
         Returns:
             A JSON representation of this.
         """
@@ -422,10 +412,19 @@ class Graph(BaseGraph):
             log.info("Graph has no nodes (activities).")
             return
 
+        # the activities of all nodes and edges are read at once
+        records = AB_metadata.get_records(
+            itertools.chain(self.nodes, (exc["input"] for exc in self.edges)),
+            Graph.FIELDS,
+        )
         data = {
-            "nodes": [Graph.build_json_node(act) for act in self.nodes],
+            "nodes": [
+                Graph.build_json_node(key, records.get(key, {})) for key in self.nodes
+            ],
             "edges": [
-                Graph.build_json_edge(exc, self.flip_negative_edges)
+                Graph.build_json_edge(
+                    exc, records.get(exc["input"], {}), self.flip_negative_edges
+                )
                 for exc in self.edges
             ],
             "title": self.central_activity.get("reference product"),
@@ -435,11 +434,11 @@ class Graph(BaseGraph):
         return json.dumps(data)
 
     @staticmethod
-    def build_json_node(act) -> dict:
-        """Take an activity and return a valid JSON document."""
+    def build_json_node(key: tuple, act: dict) -> dict:
+        """Take an activity key and its data and return a valid JSON document."""
         return {
-            "db": act.key[0],
-            "id": act.key[1],
+            "db": key[0],
+            "id": key[1],
             "product": act.get("reference product") or act.get("name"),
             "name": act.get("name"),
             "location": act.get("location"),
@@ -447,23 +446,23 @@ class Graph(BaseGraph):
         }
 
     @staticmethod
-    def build_json_edge(exc, flip_negative: bool) -> dict:
-        """Take an exchange object and return a valid JSON document.
+    def build_json_edge(exc, product, flip_negative: bool) -> dict:
+        """Take an exchange and the data of its input activity
+        (``product``) and return a valid JSON document.
 
         ``flip_negative`` will change the direction of the edge to represent
         the correct physical flow direction. However, this is experimental,
         and may not be reflected in the actual display of the product/flow.
         """
-        product = exc.input
         reference = product.get("reference product") or product.get("name")
         amount = exc.get("amount")
-        from_act, to_act = exc.input, exc.output
+        from_key, to_key = exc["input"], exc["output"]
         if flip_negative and amount < 0:
-            from_act, to_act = to_act, from_act
+            from_key, to_key = to_key, from_key
             amount = abs(amount)
         return {
-            "source_id": from_act.key[1],
-            "target_id": to_act.key[1],
+            "source_id": from_key[1],
+            "target_id": to_key[1],
             "amount": amount,
             "unit": exc.get("unit"),
             "product": reference,
@@ -10,23 +10,16 @@ from PySide2 import QtWidgets
 from PySide2.QtCore import Slot
 from PySide2.QtWidgets import QComboBox
 
-from activity_browser import signals
+from activity_browser import ab_settings, signals
 from activity_browser.mod import bw2data as bd
-from activity_browser.mod.bw2data.backends import ActivityDataset
 
+from ...bwutils import AB_metadata
 from ...bwutils.commontasks import identify_activity_type
-from ...bwutils.superstructure.graph_traversal_with_scenario import \
-    GraphTraversalWithScenario
+from ...bwutils.graph_traversal import MatrixGraphTraversal
+from ...bwutils.result_cache import (database_fingerprint, method_fingerprint,
+                                     sankey_cache)
 from .base import BaseGraph, BaseNavigatorWidget
 
-try:
-    # test whether we're running bw25
-    from bw2calc.graph_traversal import \
-        AssumedDiagonalGraphTraversal as GraphTraversal
-except:
-    # fall back on regular bw
-    from bw2calc import GraphTraversal
-
 log = getLogger(__name__)
 
 
@@ -58,7 +51,6 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
     def __init__(self, cs_name, parent=None):
         super().__init__(parent, css_file="sankey_navigator.css")
 
-        self.cache = {}  # we cache the calculated data to improve responsiveness
         self.parent = parent
         self.has_scenarios = self.parent.has_scenarios
         self.cs = cs_name
@@ -210,9 +202,7 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         demand = self.func_units[demand_index]
         method = self.methods[method_index]
         scenario_index = None
-        scenario_lca = False
         if self.has_scenarios:
-            scenario_lca = True
             scenario_index = self.scenario_cb.currentIndex()
         cutoff = self.cutoff_sb.value()
         max_calc = self.max_calc_sb.value()
@@ -222,7 +212,6 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
             demand_index=demand_index,
             method_index=method_index,
             scenario_index=scenario_index,
-            scenario_lca=scenario_lca,
             cut_off=cutoff,
             max_calc=max_calc,
         )
@@ -234,17 +223,18 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         demand_index: int = None,
         method_index: int = None,
         scenario_index: int = None,
-        scenario_lca: bool = False,
         cut_off=0.05,
         max_calc=100,
     ) -> None:
         """Calculate LCA, do graph traversal, get JSON graph data for this, and send to javascript."""
 
-        # the cache key consists of demand/method/scenario indices (index of item in the relevant tables),
-        # the cutoff, max_calc.
-        # together, these are unique.
-        cache_key = (demand_index, method_index, scenario_index, cut_off, max_calc)
-        if data := self.cache.get(cache_key, False):
+        # the cache key consists of the calculation (or the databases and method), the reference flow,
+        # method, scenario, cutoff and max_calc. The calculated data is shared by all Sankeys.
+        cache_key = self.traversal_key(
+            demand, method, method_index, scenario_index, cut_off, max_calc
+        )
+        sankey_cache.persist = ab_settings.persist_sankeys
+        if data := sankey_cache.get(cache_key):
             # this Sankey is already cached, generate the Sankey with the cached data
             log.debug(f"CACHED sankey for: {demand}, {method}, key: {cache_key}")
             self.graph.new_graph(data)
@@ -255,24 +245,19 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         start = time.time()
         log.debug(f"CALCULATE sankey for: {demand}, {method}, key: {cache_key}")
         try:
-            if scenario_lca:
+            if method_index is not None:
+                # reuse the (factorized) LCA of the calculation setup results
                 self.parent.mlca.update_lca_calculation_for_sankey(
                     scenario_index, demand, method_index
                 )
-                data = GraphTraversalWithScenario(self.parent.mlca).calculate(
-                    demand, method, cutoff=cut_off, max_calc=max_calc
-                )
+                lca = self.parent.mlca.lca
             else:
-                try:
-                    data = GraphTraversal().calculate(
-                        demand, method, cutoff=cut_off, max_calc=max_calc
-                    )
-                except:
-                    lca = bc.LCA(demand, method)
-                    data = GraphTraversal().calculate(
-                        lca, cutoff=cut_off, max_calc=max_calc
-                    )
-                    data["lca"] = lca
+                lca = bc.LCA(demand, method)
+                lca.lci(factorize=True)
+                lca.lcia()
+            data = MatrixGraphTraversal().calculate(
+                lca, cutoff=cut_off, max_calc=max_calc
+            )
             # store the metadata from this calculation
             data["metadata"] = {
                 "demand": list(data["lca"].demand.items())[0],
@@ -290,13 +275,42 @@ class SankeyNavigatorWidget(BaseNavigatorWidget):
         )
 
         # cache the generated Sankey data
-        self.cache[cache_key] = data
+        sankey_cache.put(cache_key, data)
 
         # generate the new Sankey
         self.graph.new_graph(data)
         self.has_sankey = bool(self.graph.json_data)
         self.send_json()
 
+    def traversal_key(
+        self,
+        demand: dict,
+        method: tuple,
+        method_index: int,
+        scenario_index: int,
+        cut_off: float,
+        max_calc: float,
+    ) -> str:
+        """Return the key identifying the Sankey in the `sankey_cache`."""
+        act, amount = next(iter(demand.items()))
+        if method_index is not None and self.parent.mlca.calculation_key:
+            # the calculation key covers the databases, methods and scenarios
+            calculation = self.parent.mlca.calculation_key
+        else:
+            calculation = database_fingerprint(), method_fingerprint(method)
+        scenario = None
+        if scenario_index is not None:
+            scenario = self.scenarios[scenario_index]
+        return sankey_cache.traversal_key(
+            calculation,
+            getattr(act, "key", act),
+            amount,
+            method,
+            scenario,
+            cut_off,
+            max_calc,
+        )
+
     def set_database(self, name):
         """Saves the currently selected database for graphing a random activity"""
         self.selected_db = name
@@ -325,22 +339,40 @@ class Graph(BaseGraph):
         self.json_data = Graph.get_json_data(data)
         self.update()
 
+    # fields of the activities shown in the graph
+    FIELDS = ["name", "reference product", "location", "unit"]
+
     @staticmethod
     def get_json_data(data) -> str:
-        """Transform bw.Graphtraversal() output to JSON data."""
+        """Transform bw.Graphtraversal() output to JSON data.
+
+        The metadata of all activities in the graph is read at once.
+        """
         meta = data["metadata"]
         lca_score = meta["score"]
         lcia_unit = meta["unit"]
         demand = meta["demand"]
         reverse_activity_dict = {v: k for k, v in meta["act_dict"]}
 
-        build_json_node = Graph.compose_node_builder(lca_score, lcia_unit, demand[0])
+        indices = [idx for idx in data["nodes"] if idx != -1]
+        keys = dict(
+            zip(
+                indices,
+                AB_metadata.get_keys(reverse_activity_dict[idx] for idx in indices),
+            )
+        )
+        records = AB_metadata.get_records(keys.values(), Graph.FIELDS)
+        demand_key = getattr(demand[0], "key", demand[0])
+        if isinstance(demand_key, int):
+            demand_key = AB_metadata.get_keys([demand_key])[0]
+
+        build_json_node = Graph.compose_node_builder(lca_score, lcia_unit, demand_key)
         build_json_edge = Graph.compose_edge_builder(
-            reverse_activity_dict, lca_score, lcia_unit
+            keys, records, lca_score, lcia_unit
         )
 
         valid_nodes = (
-            (bd.get_activity(reverse_activity_dict[idx]), v)
+            (keys[idx], records.get(keys[idx], {}), v)
             for idx, v in data["nodes"].items()
             if idx != -1
         )
@@ -351,7 +383,7 @@ class Graph(BaseGraph):
         )
 
         json_data = {
-            "nodes": [build_json_node(act, v) for act, v in valid_nodes],
+            "nodes": [build_json_node(key, act, v) for key, act, v in valid_nodes],
             "edges": [build_json_edge(edge) for edge in valid_edges],
             "title": Graph.build_title(demand, lca_score, lcia_unit),
             "max_impact": max(abs(n["cum"]) for n in data["nodes"].values()),
@@ -384,10 +416,10 @@ class Graph(BaseGraph):
         Inspired by https://stackoverflow.com/a/7045809
         """
 
-        def build_json_node(act, values: dict) -> dict:
+        def build_json_node(key: tuple, act: dict, values: dict) -> dict:
             return {
-                "db": act.key[0],
-                "id": act.key[1],
+                "db": key[0],
+                "id": key[1],
                 "product": act.get("reference product") or act.get("name"),
                 "name": act.get("name"),
                 "location": act.get("location"),
@@ -397,19 +429,23 @@ class Graph(BaseGraph):
                 "ind_norm": values.get("ind") / lca_score,
                 "cum": values.get("cum"),
                 "cum_norm": values.get("cum") / lca_score,
-                "class": "demand" if act == demand else identify_activity_type(act),
+                "class": "demand" if key == demand else identify_activity_type(act),
             }
 
         return build_json_node
 
     @staticmethod
-    def compose_edge_builder(reverse_dict: dict, lca_score: float, lcia_unit: str):
-        """Build a function which turns graph edges into valid JSON documents."""
+    def compose_edge_builder(
+        keys: dict, records: dict, lca_score: float, lcia_unit: str
+    ):
+        """Build a function which turns graph edges into valid JSON documents,
+        `keys` are the activity keys of the nodes and `records` their metadata.
+        """
 
         def build_json_edge(edge: dict) -> dict:
-            p = bd.get_activity(reverse_dict[edge["from"]])
-            from_key = id_to_key(reverse_dict[edge["from"]])
-            to_key = id_to_key(reverse_dict[edge["to"]])
+            from_key = keys[edge["from"]]
+            to_key = keys[edge["to"]]
+            p = records.get(from_key, {})
             return {
                 "source_id": from_key[1],
                 "target_id": to_key[1],
@@ -430,9 +466,3 @@ class Graph(BaseGraph):
             }
 
         return build_json_edge
-
-
-def id_to_key(id):
-    if isinstance(id, tuple):
-        return id
-    return ActivityDataset.get_by_id(id).database, ActivityDataset.get_by_id(id).code
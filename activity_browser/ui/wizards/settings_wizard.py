@@ -90,6 +90,12 @@ class SettingsPage(QtWidgets.QWizardPage):
             "theme_cbox", self.theme_combo, "currentText"
         )
 
+        # Sankey storage
+        self.persist_sankeys_checkbox = QtWidgets.QCheckBox(
+            "Store calculated Sankey diagrams in the project"
+        )
+        self.persist_sankeys_checkbox.setChecked(ab_settings.persist_sankeys)
+
         # Startup options
         self.startup_groupbox = QtWidgets.QGroupBox("Startup Options")
         self.startup_layout = QtWidgets.QGridLayout()
@@ -105,8 +111,15 @@ class SettingsPage(QtWidgets.QWizardPage):
 
         self.startup_groupbox.setLayout(self.startup_layout)
 
+        # Calculation options
+        self.calculation_groupbox = QtWidgets.QGroupBox("Calculation Options")
+        self.calculation_layout = QtWidgets.QVBoxLayout()
+        self.calculation_layout.addWidget(self.persist_sankeys_checkbox)
+        self.calculation_groupbox.setLayout(self.calculation_layout)
+
         self.layout = QtWidgets.QVBoxLayout()
         self.layout.addWidget(self.startup_groupbox)
+        self.layout.addWidget(self.calculation_groupbox)
         self.layout.addStretch()
         self.layout.addWidget(self.restore_defaults_button)
         self.setLayout(self.layout)
@@ -119,6 +132,7 @@ class SettingsPage(QtWidgets.QWizardPage):
         self.bwdir_remove_button.clicked.connect(self.bwdir_remove)
         self.bwdir.currentTextChanged.connect(self.bwdir_change)
         self.theme_combo.currentTextChanged.connect(self.theme_change)
+        self.persist_sankeys_checkbox.toggled.connect(self.persist_sankeys_change)
         self.restore_defaults_button.clicked.connect(self.restore_defaults)
 
     def bw_projects(self, path: str):
@@ -179,6 +193,12 @@ class SettingsPage(QtWidgets.QWizardPage):
             ab_settings.theme = theme
             self.changed()
 
+    def persist_sankeys_change(self, persist: bool):
+        """Change whether calculated Sankeys are stored on disk."""
+        if ab_settings.persist_sankeys != persist:
+            ab_settings.persist_sankeys = persist
+            self.changed()
+
     def bwdir_browse(self):
         """
         Executes on emission of a signal from the browse button
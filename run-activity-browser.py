@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 from activity_browser import run_activity_browser
 
-run_activity_browser()
+if __name__ == "__main__":
+    run_activity_browser()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import os
+
+import bw2data as bd
+import numpy as np
+import pandas as pd
+import pytest
+
+from activity_browser.bwutils.metadata import AB_metadata
+
+
+def exchange(key: tuple, amount: float, kind: str) -> dict:
+    return {"input": key, "amount": amount, "type": kind}
+
+
+@pytest.fixture()
+def pool_project(lca_project):
+    """The test project, also registered in the data directory.
+
+    Worker processes read the projects from the data directory, while the
+    temporary directory of the test session keeps them in memory only. The
+    'default' project is created up front, as every worker would otherwise
+    try to create it when importing bw2data.
+    """
+    bd.projects.db.change_path(os.path.join(bd.projects.base_dir, "projects.db"))
+    bd.projects.set_current("default")
+    bd.projects.set_current(lca_project)
+    yield lca_project
+
+
+@pytest.fixture()
+def lca_project(ab_app):
+    """A clean project with a small technosphere, containing a loop and a
+    market, a biosphere, two impact categories and the calculation setup
+    'lca_test' with three reference flows.
+
+    The project is removed again afterwards, switching back to the project
+    of the application.
+    """
+    previous = bd.projects.current
+    bd.projects.set_current("bwutils_test")
+    bd.Database("biosphere3").write(
+        {
+            ("biosphere3", "co2"): {
+                "name": "carbon dioxide",
+                "categories": ("air",),
+                "type": "emission",
+                "unit": "kilogram",
+            },
+            ("biosphere3", "ch4"): {
+                "name": "methane",
+                "categories": ("air",),
+                "type": "emission",
+                "unit": "kilogram",
+            },
+            ("biosphere3", "pb"): {
+                "name": "lead",
+                "categories": ("water", "surface water"),
+                "type": "emission",
+                "unit": "kilogram",
+            },
+        }
+    )
+    bd.Database("lca_test").write(
+        {
+            ("lca_test", "electricity"): {
+                "name": "electricity production",
+                "reference product": "electricity",
+                "location": "DE",
+                "unit": "kilowatt hour",
+                "type": "process",
+                "exchanges": [
+                    exchange(("lca_test", "electricity"), 1, "production"),
+                    exchange(("lca_test", "coal"), 0.4, "technosphere"),
+                    exchange(("lca_test", "steel market"), 0.01, "technosphere"),
+                    exchange(("biosphere3", "co2"), 0.9, "biosphere"),
+                    exchange(("biosphere3", "ch4"), 0.002, "biosphere"),
+                ],
+            },
+            ("lca_test", "coal"): {
+                "name": "coal mining",
+                "reference product": "coal",
+                "location": "PL",
+                "unit": "kilogram",
+                "type": "process",
+                "exchanges": [
+                    exchange(("lca_test", "coal"), 1, "production"),
+                    exchange(("lca_test", "electricity"), 0.05, "technosphere"),
+                    exchange(("biosphere3", "ch4"), 0.01, "biosphere"),
+                    exchange(("biosphere3", "pb"), 0.0001, "biosphere"),
+                ],
+            },
+            ("lca_test", "steel market"): {
+                "name": "market for steel",
+                "reference product": "steel",
+                "location": "GLO",
+                "unit": "kilogram",
+                "type": "process",
+                "exchanges": [
+                    exchange(("lca_test", "steel market"), 1, "production"),
+                    exchange(("lca_test", "steel"), 1.02, "technosphere"),
+                ],
+            },
+            ("lca_test", "steel"): {
+                "name": "steel production",
+                "reference product": "steel",
+                "location": "NL",
+                "unit": "kilogram",
+                "type": "process",
+                "exchanges": [
+                    exchange(("lca_test", "steel"), 1, "production"),
+                    exchange(("lca_test", "electricity"), 2.5, "technosphere"),
+                    exchange(("lca_test", "coal"), 0.8, "technosphere"),
+                    exchange(("biosphere3", "co2"), 1.6, "biosphere"),
+                    exchange(("biosphere3", "pb"), 0.002, "biosphere"),
+                ],
+            },
+        }
+    )
+    climate = bd.Method(("lca_test", "climate change"))
+    climate.register(unit="kg CO2-eq")
+    climate.write([(("biosphere3", "co2"), 1), (("biosphere3", "ch4"), 28)])
+    toxicity = bd.Method(("lca_test", "toxicity"))
+    toxicity.register(unit="CTUe")
+    toxicity.write([(("biosphere3", "pb"), 450), (("biosphere3", "co2"), 0.01)])
+
+    bd.calculation_setups["lca_test"] = {
+        "inv": [
+            {("lca_test", "electricity"): 1},
+            {("lca_test", "steel market"): 2},
+            {("lca_test", "coal"): 10},
+        ],
+        "ia": [("lca_test", "climate change"), ("lca_test", "toxicity")],
+    }
+    AB_metadata.reset_metadata()
+    yield bd.projects.current
+    bd.projects.set_current(previous)
+    bd.projects.delete_project("bwutils_test", delete_dir=True)
+    AB_metadata.reset_metadata()
+
+
+@pytest.fixture()
+def scenario_data(lca_project) -> pd.DataFrame:
+    """Scenario data for the test project, with three scenarios changing
+    technosphere, production and biosphere flows. Absent values fall back to
+    the amounts in the database.
+    """
+    index = pd.MultiIndex.from_tuples(
+        [
+            (("lca_test", "coal"), ("lca_test", "electricity"), "technosphere"),
+            (("lca_test", "steel"), ("lca_test", "steel market"), "technosphere"),
+            (("lca_test", "steel"), ("lca_test", "steel"), "production"),
+            (("biosphere3", "co2"), ("lca_test", "steel"), "biosphere"),
+            (("biosphere3", "ch4"), ("lca_test", "coal"), "biosphere"),
+        ]
+    )
+    return pd.DataFrame(
+        [
+            [0.4, 0.2, 0.1],
+            [1.02, np.nan, 1.1],
+            [1, 1, 1.25],
+            [1.6, 0.8, np.nan],
+            [0.01, 0.03, 0.0],
+        ],
+        index=index,
+        columns=["baseline", "transition", "renewable"],
+    )
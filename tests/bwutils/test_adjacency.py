@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+import pytest
+
+from activity_browser.bwutils.adjacency import AdjacencyIndex
+
+
+@pytest.fixture()
+def index(lca_project):
+    """The test project with a substitution exchange and a second database
+    consuming from the first.
+    """
+    steel = bd.get_activity(("lca_test", "steel"))
+    steel.new_exchange(
+        input=("lca_test", "coal"), amount=0.1, type="substitution", unit="kilogram"
+    ).save()
+    bd.Database("consumers").write(
+        {
+            ("consumers", "car"): {
+                "name": "car production",
+                "unit": "unit",
+                "exchanges": [
+                    {"input": ("consumers", "car"), "amount": 1, "type": "production"},
+                    {
+                        "input": ("lca_test", "steel market"),
+                        "amount": 900,
+                        "type": "technosphere",
+                        "unit": "kilogram",
+                    },
+                    {
+                        "input": ("lca_test", "electricity"),
+                        "amount": 250,
+                        "type": "technosphere",
+                    },
+                ],
+            },
+        }
+    )
+    return AdjacencyIndex()
+
+
+def as_edges(exchanges) -> list:
+    """The exchanges in the format of the `AdjacencyIndex`."""
+    edges = []
+    for exc in exchanges:
+        edge = {
+            "id": exc._document.id,
+            "input": exc.input.key,
+            "output": exc.output.key,
+            "amount": exc["amount"],
+        }
+        if exc.get("unit") is not None:
+            edge["unit"] = exc["unit"]
+        edges.append(edge)
+    return sorted(edges, key=lambda edge: edge["id"])
+
+
+def all_activities() -> list:
+    return [act for db in ("lca_test", "consumers") for act in bd.Database(db)]
+
+
+def test_inputs_match_technosphere(index):
+    for act in all_activities():
+        edges = sorted(index.inputs(act.key), key=lambda edge: edge["id"])
+        assert edges == as_edges(act.technosphere())
+
+
+def test_consumers_match_upstream(index):
+    for act in all_activities():
+        assert index.consumers(act.key) == as_edges(act.upstream())
+
+
+def test_unknown_activity(index):
+    assert index.inputs(("lca_test", "unknown")) == []
+    assert index.consumers(("lca_test", "unknown")) == []
+
+
+def test_modified_database_is_indexed_again(index):
+    index.consumers(("lca_test", "coal"))
+    car = bd.get_activity(("consumers", "car"))
+    car.new_exchange(input=("lca_test", "coal"), amount=5, type="technosphere").save()
+    exchanges = {exc.input.key: exc for exc in car.technosphere()}
+    exchanges[("lca_test", "electricity")]["amount"] = 300
+    exchanges[("lca_test", "electricity")].save()
+    coal = bd.get_activity(("lca_test", "coal"))
+
+    assert index.consumers(coal.key) == as_edges(coal.upstream())
+    assert index.inputs(car.key) == as_edges(car.technosphere())
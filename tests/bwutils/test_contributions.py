@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import bw2data as bd
+import pandas as pd
+import pytest
+from bw2analyzer import ContributionAnalysis
+
+from activity_browser.bwutils import MLCA, Contributions
+from activity_browser.bwutils.metadata import AB_metadata
+
+
+@pytest.fixture()
+def contributions(lca_project):
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+    return Contributions(mlca)
+
+
+def groupby_aggregation(
+    contributions: Contributions, data: np.ndarray, inventory: str, parameters
+) -> tuple:
+    """Aggregate the contribution array by joining it with the metadata and
+    summing the groups, as `aggregate_by_parameters` used to.
+    """
+    rev_index, keys, fields = contributions.aggregate_data[inventory]
+    df = pd.DataFrame(data).T
+    columns = list(range(data.shape[0]))
+    df.index = pd.MultiIndex.from_tuples(rev_index.values())
+    metadata = AB_metadata.get_metadata(list(keys), fields)
+    joined = metadata.join(df)
+    joined.reset_index(inplace=True, drop=True)
+    aggregated = joined.groupby(parameters)[columns].sum()
+    return aggregated.T.values, dict(enumerate(aggregated.index))
+
+
+@pytest.mark.parametrize(
+    "inventory, kind, parameters",
+    [
+        ("technosphere", "process", "location"),
+        ("technosphere", "process", "reference product"),
+        ("technosphere", "process", ["unit", "database"]),
+        ("biosphere", "elementary_flow", "categories"),
+        ("biosphere", "elementary_flow", "name"),
+    ],
+)
+def test_aggregation_matches_groupby(contributions, inventory, kind, parameters):
+    """Aggregating with the sparse grouping matrix gives the groups and sums
+    of the metadata groupby.
+    """
+    func_unit = contributions.mlca.func_key_list[1]
+    data = contributions.get_contributions(kind, functional_unit=func_unit)
+    aggregated, mask_index, mask = contributions.aggregate_by_parameters(
+        data, inventory, parameters
+    )
+    expected, expected_index = groupby_aggregation(
+        contributions, data, inventory, parameters
+    )
+
+    assert mask_index == expected_index
+    assert list(mask) == list(expected_index.values())
+    assert np.allclose(aggregated, expected)
+
+
+def test_aggregation_matrix_is_cached(contributions):
+    matrix, mask_index = contributions.aggregation_matrix("technosphere", "location")
+
+    assert contributions.aggregation_matrix("technosphere", "location")[0] is matrix
+    assert matrix.shape == (len(contributions.mlca.rev_activity_dict), len(mask_index))
+    assert np.array_equal(matrix.sum(axis=1).A1, np.ones(matrix.shape[0]))
+
+
+def test_aggregation_matrix_follows_metadata(contributions):
+    """The aggregation matrices are rebuilt after the metadata changed."""
+    matrix, mask_index = contributions.aggregation_matrix("technosphere", "location")
+    key = next(iter(contributions.mlca.rev_activity_dict.values()))
+    act = bd.get_activity(key)
+    act["location"] = "XYZ"
+    act.save()
+    AB_metadata.update_metadata(key)
+
+    new_matrix, new_index = contributions.aggregation_matrix("technosphere", "location")
+    assert new_matrix is not matrix
+    assert "XYZ" in new_index.values()
+    assert "XYZ" not in mask_index.values()
+
+
+@pytest.mark.parametrize(
+    "limit, limit_type", [(3, "number"), (50, "number"), (0.05, "percent")]
+)
+def test_top_contributions_match_sort_array(limit, limit_type):
+    """The top contributions of all rows equal those `sort_array` selects
+    row by row.
+    """
+    data = np.random.default_rng(42).normal(size=(6, 40))
+    data[2] = 0
+    indices, values, counts = Contributions.top_contributions(data, limit, limit_type)
+
+    for row in range(data.shape[0]):
+        expected = ContributionAnalysis().sort_array(data[row], limit, limit_type)
+        count = counts[row]
+        assert count == len(expected)
+        if row == 2:
+            # which of the equal contributions are selected is arbitrary
+            assert not values[row, :count].any()
+            continue
+        assert np.array_equal(indices[row, :count], expected[:, 1].astype(int))
+        assert np.array_equal(values[row, :count], expected[:, 0])
+
+
+def test_top_contributions_limits():
+    data = np.arange(12, dtype=float).reshape(3, 4)
+
+    with pytest.raises(ValueError):
+        Contributions.top_contributions(data, 2, "index")
+    with pytest.raises(ValueError):
+        Contributions.top_contributions(data, 1.5, "percent")
+    indices, values, counts = Contributions.top_contributions(data, 0, "number")
+    assert indices.shape == values.shape == (3, 0)
+    assert counts.tolist() == [0, 0, 0]
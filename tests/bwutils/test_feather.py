@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from activity_browser.bwutils.feather import read_frame, read_metadata, write_frame
+
+
+@pytest.fixture()
+def frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "key": [("lca_test", "coal"), ("biosphere3", "pb")],
+            "categories": [np.nan, ("water", "surface water")],
+            "production amount": [1, ""],
+            "comment": ["mined", np.nan],
+            "amount": [1.5, np.nan],
+            "unit": pd.Categorical(["kilogram", "kilogram"]),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "index",
+    [
+        None,
+        pd.MultiIndex.from_tuples([("lca_test", "coal"), ("biosphere3", "pb")]),
+        pd.Index(
+            [("lca_test", "coal"), ("biosphere3", "pb")],
+            name="key",
+            tupleize_cols=False,
+        ),
+    ],
+)
+def test_frame_round_trip(tmp_path, frame, index):
+    """Tuples, mixed columns, categoricals and the index are restored."""
+    if index is not None:
+        frame.index = index
+    path = str(tmp_path / "frame.feather")
+    write_frame(path, frame, modified="2024-01-01T00:00:00", systems=["ISIC"])
+
+    assert read_metadata(path) == {
+        "modified": "2024-01-01T00:00:00",
+        "systems": ["ISIC"],
+    }
+    pd.testing.assert_frame_equal(read_frame(path), frame)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+from bw2calc import GraphTraversal
+
+from activity_browser.bwutils import MLCA
+from activity_browser.bwutils.graph_traversal import MatrixGraphTraversal
+
+
+@pytest.mark.parametrize("cutoff, max_calc", [(0.005, 100), (0.1, 100), (0, 5)])
+def test_traversal_matches_brightway(lca_project, cutoff, max_calc):
+    """Traversing the MLCA results gives the graph of brightway's traversal
+    for every reference flow and impact category.
+    """
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+    for row, func_unit in enumerate(mlca.func_units):
+        for col, method in enumerate(mlca.methods):
+            mlca.update_lca_calculation_for_sankey(None, func_unit, col)
+            result = MatrixGraphTraversal().calculate(
+                mlca.lca, cutoff=cutoff, max_calc=max_calc
+            )
+            expected = GraphTraversal().calculate(
+                func_unit, method, cutoff=cutoff, max_calc=max_calc
+            )
+
+            assert np.isclose(mlca.lca.score, mlca.lca_scores[row, col])
+            assert result["counter"] == expected["counter"]
+            assert result["nodes"].keys() == expected["nodes"].keys()
+            for node, data in expected["nodes"].items():
+                assert np.isclose(result["nodes"][node]["cum"], data["cum"])
+                assert np.isclose(result["nodes"][node]["amount"], data["amount"])
+            assert [(e["from"], e["to"]) for e in result["edges"]] == [
+                (e["from"], e["to"]) for e in expected["edges"]
+            ]
+            assert np.allclose(
+                [e["impact"] for e in result["edges"]],
+                [e["impact"] for e in expected["edges"]],
+            )
+
+
+def test_traversal_of_cached_results(lca_project):
+    """Results loaded from the cache load their LCI data for the traversal."""
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+    cached = MLCA("lca_test", mlca.results_to_arrays())
+    func_unit = mlca.func_units[1]
+    for calculation in (mlca, cached):
+        calculation.update_lca_calculation_for_sankey(None, func_unit, 0)
+    result = MatrixGraphTraversal().calculate(cached.lca, cutoff=0.005)
+    expected = MatrixGraphTraversal().calculate(mlca.lca, cutoff=0.005)
+
+    assert np.isclose(cached.lca.score, mlca.lca_scores[1, 0])
+    assert result["nodes"].keys() == expected["nodes"].keys()
+    assert len(result["edges"]) == len(expected["edges"])
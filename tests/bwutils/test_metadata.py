@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+import pandas as pd
+
+from activity_browser.bwutils.metadata import AB_metadata, MetaDataStore
+
+
+def loaded(db_name: str) -> pd.DataFrame:
+    """The metadata of the database, read by a new store."""
+    store = MetaDataStore()
+    store.add_metadata([db_name])
+    return store.expand(store.dataframe)
+
+
+def no_query(*args, **kwargs):
+    raise AssertionError("Metadata was read from the database")
+
+
+def assert_metadata_equal(left: pd.DataFrame, right: pd.DataFrame) -> None:
+    pd.testing.assert_frame_equal(
+        left.sort_index().sort_index(axis=1),
+        right.sort_index().sort_index(axis=1),
+        check_dtype=False,
+    )
+
+
+def test_single_query_matches_activities(lca_project):
+    """Metadata read with a single query equals the metadata built from the
+    activities of the databases, including unpacked classifications.
+    """
+    coal = bd.get_activity(("lca_test", "coal"))
+    coal["classifications"] = [
+        ("CPC", "11010: Hard coal"),
+        ("ISIC rev.4 ecoinvent", "0510:Mining of hard coal"),
+    ]
+    coal.save()
+    store = MetaDataStore()
+    store.add_metadata(["lca_test", "biosphere3"])
+
+    dfs = []
+    for db_name in ["lca_test", "biosphere3"]:
+        df = pd.DataFrame(bd.Database(db_name))
+        df["key"] = df.loc[:, ["database", "code"]].apply(tuple, axis=1)
+        df.index = pd.MultiIndex.from_tuples(df["key"])
+        dfs.append(df)
+    expected = pd.concat(dfs, sort=False).fillna("")
+    expected = expected.drop(columns=MetaDataStore.BLOB_FIELDS, errors="ignore")
+    expected["ISIC rev.4 ecoinvent"] = ""
+    expected.at[("lca_test", "coal"), "ISIC rev.4 ecoinvent"] = (
+        "0510:Mining of hard coal"
+    )
+
+    assert_metadata_equal(store.expand(store.dataframe), expected)
+
+
+def test_compact_round_trip():
+    """Compacting drops the blob fields and stores repetitive strings as
+    categoricals, expanding gives back the plain metadata.
+    """
+    df = pd.DataFrame(
+        {
+            "name": ["carbon dioxide", "methane", "lead", "carbon monoxide"],
+            "unit": ["kilogram"] * 4,
+            "categories": [("air",), ("air",), ("water",), ("air",)],
+            "comment": ["a", "long", "description", ""],
+            "properties": [{"carbon": 0.27}, {}, {}, {}],
+        },
+        index=pd.MultiIndex.from_tuples(
+            [("biosphere3", code) for code in ["co2", "ch4", "pb", "co"]]
+        ),
+    )
+    compact = MetaDataStore().compact(df)
+
+    assert list(compact.columns) == ["name", "unit", "categories"]
+    assert isinstance(compact["unit"].dtype, pd.CategoricalDtype)
+    assert compact["name"].dtype == object
+    assert compact["categories"].iloc[0] is compact["categories"].iloc[3]
+    pd.testing.assert_frame_equal(
+        MetaDataStore.expand(compact), df[["name", "unit", "categories"]]
+    )
+    row = compact.loc[("biosphere3", "pb")]
+    assert MetaDataStore.expand(row) is row
+
+
+def test_buffered_updates(lca_project):
+    """Updates and deletions are applied on the next read of the dataframe,
+    resulting in the metadata of a fresh read of the database.
+    """
+    db = bd.Database("lca_test")
+    db.new_activity("scrap", name="scrap steel", unit="kilogram").save()
+    store = MetaDataStore()
+    store.add_metadata(["lca_test"])
+
+    coal = bd.get_activity(("lca_test", "coal"))
+    coal["name"] = "hard coal mining"
+    coal.save()
+    db.new_activity("ore", name="iron ore mining", unit="kilogram").save()
+    bd.get_activity(("lca_test", "scrap")).delete()
+    store.update_many([("lca_test", "coal"), ("lca_test", "ore")])
+    store.delete_many([("lca_test", "scrap")])
+
+    # nothing is changed until the metadata is read
+    assert len(store._pending) == 3
+    assert ("lca_test", "scrap") in store._dataframe.index
+    assert ("lca_test", "ore") not in store._dataframe.index
+
+    df = store.expand(store.dataframe)
+    assert not store._pending
+    assert df.loc[("lca_test", "coal"), "name"] == "hard coal mining"
+    assert ("lca_test", "ore") in df.index
+    assert ("lca_test", "scrap") not in df.index
+    assert_metadata_equal(df, loaded("lca_test"))
+
+
+def test_flush_skips_unloaded_databases(lca_project):
+    """Updates of databases that are not in the metadata are dropped."""
+    store = MetaDataStore()
+    store.add_metadata(["lca_test"])
+    before = store.dataframe.copy()
+    store.update_many([("biosphere3", "co2")])
+    store.flush()
+
+    assert not store._pending
+    assert "biosphere3" not in store.databases
+    pd.testing.assert_frame_equal(store.dataframe, before)
+
+
+def test_snapshot_round_trip(lca_project, monkeypatch):
+    """A new store reads the metadata from the snapshot of the database."""
+    expected = loaded("lca_test")
+    monkeypatch.setattr(MetaDataStore, "_load_database", no_query)
+    store = MetaDataStore()
+    store.add_metadata(["lca_test"])
+
+    assert_metadata_equal(store.expand(store.dataframe), expected)
+
+
+def test_compact_round_trip():
+    """Compacting drops the blob fields and stores repetitive strings as
+    categoricals, expanding gives back the plain metadata.
+    """
+    df = pd.DataFrame(
+        {
+            "name": ["carbon dioxide", "methane", "lead", "carbon monoxide"],
+            "unit": ["kilogram"] * 4,
+            "categories": [("air",), ("air",), ("water",), ("air",)],
+            "comment": ["a", "long", "description", ""],
+            "properties": [{"carbon": 0.27}, {}, {}, {}],
+        },
+        index=pd.MultiIndex.from_tuples(
+            [("biosphere3", code) for code in ["co2", "ch4", "pb", "co"]]
+        ),
+    )
+    compact = MetaDataStore().compact(df)
+
+    assert list(compact.columns) == ["name", "unit", "categories"]
+    assert isinstance(compact["unit"].dtype, pd.CategoricalDtype)
+    assert compact["name"].dtype == object
+    assert compact["categories"].iloc[0] is compact["categories"].iloc[3]
+    pd.testing.assert_frame_equal(
+        MetaDataStore.expand(compact), df[["name", "unit", "categories"]]
+    )
+    row = compact.loc[("biosphere3", "pb")]
+    assert MetaDataStore.expand(row) is row
+
+
+def test_snapshot_invalidated_by_modification(lca_project, monkeypatch):
+    """Snapshots of databases modified since are not used."""
+    # the application keeps the metadata of the database up to date itself
+    AB_metadata.add_metadata(["lca_test"])
+    coal = bd.get_activity(("lca_test", "coal"))
+    coal["name"] = "hard coal mining"
+    coal.save()
+    store = MetaDataStore()
+    store.modified["lca_test"] = bd.databases["lca_test"]["modified"]
+
+    assert store._read_snapshot("lca_test") is None
+    df = loaded("lca_test")
+    assert df.loc[("lca_test", "coal"), "name"] == "hard coal mining"
+
+    # the metadata read after the modification is stored instead
+    monkeypatch.setattr(MetaDataStore, "_load_database", no_query)
+    assert_metadata_equal(loaded("lca_test"), df)
+
+
+def test_get_labels(lca_project):
+    """Labels equal joining the metadata fields of each key, and follow
+    updates of the metadata.
+    """
+    store = MetaDataStore()
+    store.add_metadata(["lca_test", "biosphere3"])
+    fields = ["name", "location", "categories"]
+    keys = [("lca_test", "coal"), ("biosphere3", "pb"), ("lca_test", "unknown"), "x"]
+    labels = store.get_labels(keys, fields, separator=" / ")
+
+    assert labels.keys() == {("lca_test", "coal"), ("biosphere3", "pb")}
+    for key, label in labels.items():
+        values = store.get_metadata([key], fields).iloc[0]
+        assert label == " / ".join(str(value) for value in values)
+
+    coal = bd.get_activity(("lca_test", "coal"))
+    coal["name"] = "hard coal mining"
+    coal.save()
+    store.update_many([coal.key])
+
+    assert store.get_labels([coal.key], ["name"]) == {coal.key: "hard coal mining"}
+
+
+def test_get_keys(lca_project):
+    """Activity ids are converted into keys, other values are kept."""
+    store = MetaDataStore()
+    activities = list(bd.Database("lca_test"))
+    ids = [act._document.id for act in activities] + ["total", ("lca_test", "coal")]
+
+    assert store.get_keys(ids) == [act.key for act in activities] + [
+        "total",
+        ("lca_test", "coal"),
+    ]
+    assert len(store._keys) == len(activities)
+
+    store.delete_many([activities[0].key])
+    assert not store._keys
+
+
+def test_get_records(lca_project):
+    """Records are read from the metadata or, for databases that are not in
+    the metadata, from the database itself.
+    """
+    store = MetaDataStore()
+    store.add_metadata(["lca_test"])
+    fields = ["name", "location", "categories", "unit"]
+    keys = [("lca_test", "coal"), ("biosphere3", "pb"), ("lca_test", "unknown")]
+    records = store.get_records(keys, fields)
+
+    assert records.keys() == {("lca_test", "coal"), ("biosphere3", "pb")}
+    assert "biosphere3" not in store.databases
+    for key, record in records.items():
+        act = bd.get_activity(key)
+        assert record == {field: act.get(field) or None for field in fields}
+    assert records[("lca_test", "coal")]["categories"] is None
+    assert records[("biosphere3", "pb")]["categories"] == ("water", "surface water")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+import numpy as np
+import pytest
+from bw2data.parameters import ActivityParameter, ProjectParameter
+
+from activity_browser.bwutils import MonteCarloLCA
+from activity_browser.bwutils.sensitivity_analysis import get_X
+
+
+@pytest.fixture()
+def uncertain_project(lca_project):
+    """The test project with lognormal uncertainty on all technosphere and
+    biosphere exchanges.
+    """
+    for act in bd.Database("lca_test"):
+        for exc in act.exchanges():
+            if exc["type"] == "production":
+                continue
+            exc["uncertainty type"] = 2
+            exc["loc"] = np.log(exc["amount"])
+            exc["scale"] = 0.1
+            exc.save()
+    yield lca_project
+
+
+@pytest.fixture()
+def parameterized_project(lca_project):
+    """The test project with the steel production inputs depending on the
+    uncertain project parameter 'share'.
+    """
+    ProjectParameter.create(
+        name="share",
+        amount=2.0,
+        data={"uncertainty type": 4, "minimum": 1.0, "maximum": 3.0},
+    )
+    ActivityParameter.create(
+        group="steel_group",
+        database="lca_test",
+        code="steel",
+        name="intensity",
+        formula="share * 1.25",
+    )
+    steel = bd.get_activity(("lca_test", "steel"))
+    formulas = {
+        ("lca_test", "electricity"): "intensity",
+        ("lca_test", "coal"): "share * 0.4",
+    }
+    for exc in steel.technosphere():
+        exc["formula"] = formulas[exc.input.key]
+        exc.save()
+    bd.parameters.add_exchanges_to_group("steel_group", steel)
+    bd.parameters.recalculate()
+    yield lca_project
+
+
+def test_parallel_matches_serial_chunks(uncertain_project, pool_project):
+    """A pool of workers gives the results of calculating the chunks of
+    iterations one after the other with the seeds derived for them.
+    """
+    mc = MonteCarloLCA("lca_test")
+    mc.calculate(iterations=5, seed=42, workers=2, parameters=False)
+    seeds = [
+        int(child.generate_state(1)[0]) for child in np.random.SeedSequence(42).spawn(2)
+    ]
+    serial = []
+    for iterations, seed in zip((3, 2), seeds):
+        chunk = MonteCarloLCA("lca_test")
+        chunk.calculate(iterations=iterations, seed=seed, parameters=False)
+        serial.append(chunk.results)
+
+    assert mc.results.shape == (5, 3, 2)
+    assert np.allclose(mc.results, np.concatenate(serial))
+    assert mc.A_values.shape[0] == mc.B_values.shape[0] == 5
+    assert not np.allclose(mc.results[0], mc.results[1])
+    # the LCI data of the parent is loaded as after a serial calculation
+    assert mc.A_structure.shape == mc.lca.technosphere_matrix.shape
+    assert mc.lca.activity_dict_rev == chunk.lca.activity_dict_rev
+    assert mc.lca.biosphere_dict_rev == chunk.lca.biosphere_dict_rev
+
+
+def test_parameters_are_placed_on_their_exchanges(parameterized_project):
+    """The recalculated amounts of the parameterized exchanges end up at the
+    positions of these exchanges in the technosphere matrix.
+    """
+    mc = MonteCarloLCA("lca_test")
+    mc.calculate(iterations=3, seed=42, technosphere=False, biosphere=False, cf=False)
+    share = next(v for v in mc.parameter_data.values() if v["name"] == "share")
+    steel = mc.lca.activity_dict[("lca_test", "steel")]
+    electricity = mc.lca.product_dict[("lca_test", "electricity")]
+    coal = mc.lca.product_dict[("lca_test", "coal")]
+
+    columns = mc.exchange_columns([(electricity, steel), (coal, steel)])
+    values = get_X(mc.A_values, columns)
+
+    assert len(set(share["values"])) == 3
+    assert np.allclose(values[:, 0], -1.25 * np.array(share["values"]))
+    assert np.allclose(values[:, 1], -0.4 * np.array(share["values"]))
+
+
+def test_matrix_values_rebuild_matrices(uncertain_project):
+    """The stored values and structure give the matrices of each iteration."""
+    mc = MonteCarloLCA("lca_test")
+    mc.calculate(iterations=2, seed=42, parameters=False)
+    for matrix, structure, values in [
+        (mc.lca.technosphere_matrix, mc.A_structure, mc.A_values),
+        (mc.lca.biosphere_matrix, mc.B_structure, mc.B_values),
+    ]:
+        last = structure.copy().astype(np.float64)
+        last.data = values[-1].astype(np.float64)
+        assert np.allclose(last.toarray(), matrix.toarray(), rtol=1e-6)
+        assert not np.allclose(values[0], values[1])
+
+    # Electricity production does not emit lead
+    lead = mc.lca.biosphere_dict[("biosphere3", "pb")]
+    electricity = mc.lca.activity_dict[("lca_test", "electricity")]
+    with pytest.raises(ValueError):
+        mc.exchange_columns([(lead, electricity)], biosphere=True)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+import bw2calc as bc
+import bw2data as bd
+import numpy as np
+import pytest
+
+from activity_browser.bwutils import MLCA
+from activity_browser.bwutils.multilca import LazyMatrixStore
+
+
+def per_column_results(cs: dict) -> tuple:
+    """Calculate the supply arrays and scores of a calculation setup the way
+    MLCA used to, with a `redo_lci` call per reference flow.
+    """
+    lca = bc.LCA(demand=cs["inv"][0], method=cs["ia"][0])
+    lca.lci(factorize=True)
+    lca.lcia()
+    supply, scores = [], np.zeros((len(cs["inv"]), len(cs["ia"])))
+    for row, func_unit in enumerate(cs["inv"]):
+        lca.redo_lci(func_unit)
+        supply.append(lca.supply_array.copy())
+        for col, method in enumerate(cs["ia"]):
+            lca.switch_method(method)
+            lca.redo_lcia(func_unit)
+            scores[row, col] = lca.score
+    return np.column_stack(supply), scores
+
+
+def test_solve_matches_per_column_lci(lca_project):
+    """All reference flows solved at once give the supply arrays of solving
+    them one by one.
+    """
+    mlca = MLCA("lca_test")
+    demand = mlca._build_demand_matrix()
+    supply, _ = per_column_results(bd.calculation_setups["lca_test"])
+
+    assert np.allclose(mlca._solve_demand_matrix(demand), supply)
+
+
+def test_solve_falls_back_to_per_column(lca_project):
+    """Solvers without support for 2-dimensional right-hand sides are called
+    once per column.
+    """
+    mlca = MLCA("lca_test")
+    demand = mlca._build_demand_matrix()
+    expected = mlca._solve_demand_matrix(demand)
+    solver, calls = mlca.lca.solver, []
+
+    def vector_solver(rhs):
+        calls.append(rhs.shape)
+        if rhs.ndim > 1:
+            raise TypeError("only 1-dimensional right-hand sides")
+        return solver(rhs)
+
+    mlca.lca.solver = vector_solver
+
+    assert np.allclose(mlca._solve_demand_matrix(demand), expected)
+    assert calls == [demand.shape] + [(demand.shape[0],)] * demand.shape[1]
+
+
+def test_mlca_matches_per_column_lca(lca_project):
+    """MLCA results equal the results of separate LCA calculations."""
+    cs = bd.calculation_setups["lca_test"]
+    supply, scores = per_column_results(cs)
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+
+    assert np.allclose(mlca.lca_scores, scores)
+    for col, func_unit in enumerate(cs["inv"]):
+        key = str(func_unit)
+        assert np.allclose(mlca.scaling_factors[key], supply[:, col])
+        assert np.allclose(
+            mlca.inventory[key], mlca.lca.biosphere_matrix @ supply[:, col]
+        )
+
+
+def test_stacked_lcia_matches_per_method_lcia(lca_project):
+    """The stacked characterization gives the scores and contributions of a
+    separate LCIA per reference flow and impact category.
+    """
+    cs = bd.calculation_setups["lca_test"]
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+
+    lca = bc.LCA(demand=cs["inv"][0], method=cs["ia"][0])
+    lca.lci(factorize=True)
+    lca.lcia()
+    for row, func_unit in enumerate(cs["inv"]):
+        lca.redo_lci(func_unit)
+        for col, method in enumerate(cs["ia"]):
+            lca.switch_method(method)
+            lca.redo_lcia(func_unit)
+            characterized = lca.characterized_inventory
+            assert np.isclose(mlca.lca_scores[row, col], lca.score)
+            assert np.allclose(
+                mlca.elementary_flow_contributions[row, col],
+                np.asarray(characterized.sum(axis=1)).ravel(),
+            )
+            assert np.allclose(
+                mlca.process_contributions[row, col],
+                np.asarray(characterized.sum(axis=0)).ravel(),
+            )
+
+
+def test_inventories_are_built_on_request(lca_project):
+    """The (characterized) inventories equal those of a separate LCA."""
+    cs = bd.calculation_setups["lca_test"]
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+
+    lca = bc.LCA(demand=cs["inv"][0], method=cs["ia"][0])
+    lca.lci(factorize=True)
+    lca.lcia()
+    for row, func_unit in enumerate(cs["inv"]):
+        lca.redo_lci(func_unit)
+        assert np.allclose(
+            mlca.inventories[str(func_unit)].toarray(), lca.inventory.toarray()
+        )
+        for col, method in enumerate(cs["ia"]):
+            lca.switch_method(method)
+            lca.redo_lcia(func_unit)
+            assert np.allclose(
+                mlca.characterized_inventories[row, col].toarray(),
+                lca.characterized_inventory.toarray(),
+            )
+
+
+def test_lazy_matrix_store():
+    """Only registered keys are built, and only the most recently used values
+    are kept.
+    """
+    built = []
+
+    def builder(key):
+        built.append(key)
+        return key * 2
+
+    store = LazyMatrixStore(builder, maxsize=2)
+    store.register(1, 2, 3)
+
+    assert list(store) == [1, 2, 3] and len(store) == 3
+    assert 4 not in store
+    with pytest.raises(KeyError):
+        store[4]
+    values = [store[key] for key in (1, 2, 1, 3, 1, 2)]
+
+    assert values == [2, 4, 2, 6, 2, 4]
+    # 2 is evicted by 3, after which 1 is still cached
+    assert built == [1, 2, 3, 2]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from activity_browser.bwutils import parallel
+
+
+def test_workers_do_not_import_qt():
+    """Worker processes import the module of the function they run, which
+    must not import Qt or build the application.
+    """
+    code = (
+        "import sys; import activity_browser.bwutils.parallel; "
+        "print(sorted(m for m in sys.modules if m.startswith('PySide2')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_solve_in_pool():
+    matrix = np.array([[2.0, 0.0], [-1.0, 1.0]])
+    demand = np.eye(2)
+    with parallel.process_pool(1) as pool:
+        supply = pool.submit(parallel.solve, np.linalg.inv(matrix).dot, demand)
+        assert np.allclose(matrix @ supply.result(), demand)
+
+
+def test_solve_propagates_solver_errors():
+    """Only unsupported 2-dimensional right-hand sides are solved column by
+    column, other errors of the solver propagate.
+    """
+
+    def singular(demand):
+        raise RuntimeError("Factor is exactly singular")
+
+    with pytest.raises(RuntimeError):
+        parallel.solve(singular, np.eye(2))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+import numpy as np
+import pytest
+from bw2data.parameters import (
+    ActivityParameter,
+    DatabaseParameter,
+    ExchangeDataset,
+    Group,
+    ProjectParameter,
+)
+
+from activity_browser.bwutils.manager import (
+    MonteCarloParameterManager,
+    ParameterManager,
+)
+from activity_browser.bwutils.utils import Indices
+
+
+@pytest.fixture()
+def parameterized(lca_project):
+    """Parameterize the steel production in the test project, with one
+    formula that can only be evaluated by the interpreter (`min`) and one
+    that can only be evaluated per sample (a conditional expression).
+    """
+    ProjectParameter.create(name="share", amount=2.0)
+    ProjectParameter.create(name="grid", formula="share * 3 + sqrt(share)")
+    DatabaseParameter.create(
+        database="lca_test", name="efficiency", formula="grid / 10"
+    )
+    for name, formula in [
+        ("capped", "min(efficiency, 0.6)"),
+        ("switch", "capped * 2 if share > 1.5 else capped / 2"),
+    ]:
+        ActivityParameter.create(
+            group="steel_group",
+            database="lca_test",
+            code="steel",
+            name=name,
+            formula=formula,
+        )
+    steel = bd.get_activity(("lca_test", "steel"))
+    formulas = {
+        ("lca_test", "electricity"): "switch * efficiency",
+        ("lca_test", "coal"): "grid / (1 + exp(-efficiency))",
+    }
+    for exc in steel.technosphere():
+        exc["formula"] = formulas[exc.input.key]
+        exc.save()
+    bd.parameters.add_exchanges_to_group("steel_group", steel)
+    bd.parameters.recalculate()
+    return ParameterManager()
+
+
+def uncompiled(manager: ParameterManager) -> None:
+    """Drop the compiled code of all formulas, leaving every formula to the
+    asteval interpreter.
+    """
+    compiled = manager.compiled
+    for scope in [compiled.project, *compiled.databases.values()]:
+        for name, formula in scope.formulas.items():
+            scope.formulas[name] = formula._replace(code=None)
+    for scope, database, exchanges in compiled.groups:
+        for name, formula in scope.formulas.items():
+            scope.formulas[name] = formula._replace(code=None)
+        exchanges[:] = [formula._replace(code=None) for formula in exchanges]
+
+
+def test_calculate_matches_brightway(parameterized):
+    """The compiled formulas give the exchange amounts brightway stores."""
+    expected = [
+        ExchangeDataset.get_by_id(pk).data["amount"]
+        for p in parameterized.initial.act_by_group_db
+        for pk in parameterized.initial.exc_by_group(p.group)
+    ]
+
+    assert np.allclose(parameterized.calculate(), expected)
+
+
+def test_uncompilable_formula_falls_back(parameterized):
+    """Formulas using non element-wise functions are not compiled."""
+    scope = parameterized.compiled.groups[0][0]
+
+    assert scope.formulas["capped"].code is None
+    assert scope.formulas["switch"].code is not None
+    assert parameterized.compiled.project.formulas["grid"].code is not None
+
+
+def test_samples_match_interpreter(parameterized):
+    """Evaluating many samples at once equals evaluating each sample with
+    the interpreter, including conditional formulas of which the branch
+    differs per sample.
+    """
+    names = [p.name for p in parameterized.parameters]
+    samples = np.tile([p.amount for p in parameterized.parameters], (4, 1)).astype(
+        float
+    )
+    samples[:, names.index("share")] = [0.5, 1.4, 1.6, 20]
+    result = parameterized.compiled.evaluate(samples)
+
+    uncompiled(parameterized)
+    expected = parameterized.compiled.evaluate(samples)
+
+    assert result.shape == (4, len(parameterized.indices))
+    assert np.allclose(result, expected)
+    assert not np.allclose(result[0], result[-1])
+
+
+def test_recalculate_after_database_change(parameterized):
+    """A new manager picks up parameters changed in the database."""
+    before = parameterized.calculate()
+    ProjectParameter.update(amount=0.5).where(
+        ProjectParameter.name == "share"
+    ).execute()
+    Group.update(fresh=False).where(Group.name == "project").execute()
+    bd.parameters.recalculate()
+    manager = ParameterManager()
+    expected = [
+        ExchangeDataset.get_by_id(pk).data["amount"]
+        for p in manager.initial.act_by_group_db
+        for pk in manager.initial.exc_by_group(p.group)
+    ]
+
+    assert np.allclose(manager.calculate(), expected)
+    assert not np.allclose(manager.calculate(), before)
+
+
+@pytest.mark.parametrize(
+    "formula",
+    [
+        "share.__class__",
+        "(1).real",
+        "exp.__call__(share)",
+        "[share][0]",
+        "(lambda: share)()",
+        "__import__('os')",
+        "min(share, key=abs)",
+    ],
+)
+def test_compile_rejects_unsafe_syntax(parameterized, formula):
+    """Attribute access and any other syntax beyond arithmetic is left to the
+    interpreter.
+    """
+    assert parameterized.compiled.compile(formula, {"share"}).code is None
+
+
+def test_sample_matrix(parameterized):
+    """`sample_matrix` leaves the parameters untouched, `recalculate` returns
+    the same amounts formatted like the `tech_params` of brightway.
+    """
+    ProjectParameter.update(
+        data={"uncertainty type": 4, "minimum": 1, "maximum": 3}
+    ).where(ProjectParameter.name == "share").execute()
+    sampler = MonteCarloParameterManager(seed=7)
+    before = [p.amount for p in sampler.parameters]
+    amounts = sampler.sample_matrix(5)
+
+    assert amounts.shape == (5, len(sampler.indices))
+    assert [p.amount for p in sampler.parameters] == before
+    assert len(np.unique(amounts[:, 0])) == 5
+
+    params = MonteCarloParameterManager(seed=7).recalculate(5)
+    assert params.dtype == Indices.array_dtype
+    assert np.allclose(params["amount"], amounts)
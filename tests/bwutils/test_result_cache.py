@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import os
+
+import bw2calc as bc
+import bw2data as bd
+import numpy as np
+import pandas as pd
+
+from activity_browser.bwutils import MLCA
+from activity_browser.bwutils.result_cache import (
+    LCAResultCache,
+    SankeyCache,
+    method_fingerprint,
+)
+
+
+def test_results_round_trip(lca_project, monkeypatch):
+    """Cached results load into an MLCA as if it had been calculated, the LCI
+    data is only loaded once it is needed.
+    """
+    cache = LCAResultCache()
+    key = cache.calculation_key("lca_test")
+    assert cache.load(key) is None
+
+    mlca = MLCA("lca_test")
+    mlca.calculate()
+    cache.save(key, mlca.results_to_arrays())
+    loads = []
+    load_lci = MLCA.load_lci
+    monkeypatch.setattr(
+        MLCA, "load_lci", lambda self: loads.append(self) or load_lci(self)
+    )
+    cached = MLCA("lca_test", cache.load(key))
+
+    assert not loads
+    assert not cached.lca_scores.flags.writeable
+    assert cached.rev_activity_dict == mlca.rev_activity_dict
+    assert cached.rev_product_dict == mlca.rev_product_dict
+    assert cached.rev_biosphere_dict == mlca.rev_biosphere_dict
+    assert np.allclose(cached.lca_scores, mlca.lca_scores)
+    assert np.allclose(
+        cached.elementary_flow_contributions, mlca.elementary_flow_contributions
+    )
+    assert np.allclose(cached.process_contributions, mlca.process_contributions)
+    for func_unit in mlca.func_units:
+        key = str(func_unit)
+        assert np.allclose(cached.scaling_factors[key], mlca.scaling_factors[key])
+        assert np.allclose(cached.inventory[key], mlca.inventory[key])
+        assert np.allclose(
+            cached.inventories[key].toarray(), mlca.inventories[key].toarray()
+        )
+    assert len(loads) == 1
+
+    # calculating again replaces the read-only results
+    cached.calculate()
+    assert np.allclose(cached.lca_scores, mlca.lca_scores)
+
+
+def test_key_changes_with_database(lca_project):
+    key = LCAResultCache.calculation_key("lca_test")
+    steel = bd.get_activity(("lca_test", "steel"))
+    exc = next(iter(steel.technosphere()))
+    exc["amount"] *= 2
+    exc.save()
+
+    assert LCAResultCache.calculation_key("lca_test") != key
+
+
+def test_key_changes_with_method(lca_project):
+    key = LCAResultCache.calculation_key("lca_test")
+    bd.Method(("lca_test", "toxicity")).write(
+        [(("biosphere3", "pb"), 500), (("biosphere3", "co2"), 0.01)]
+    )
+
+    assert LCAResultCache.calculation_key("lca_test") != key
+
+
+def test_method_fingerprint_is_memoized(lca_project, monkeypatch):
+    """The processed file of a method is only read again once modified."""
+    method = ("lca_test", "toxicity")
+    fingerprint = method_fingerprint(method)
+    monkeypatch.setattr("builtins.open", None)
+    assert method_fingerprint(method) == fingerprint
+
+    monkeypatch.undo()
+    bd.Method(method).write([(("biosphere3", "pb"), 500)])
+    assert method_fingerprint(method) != fingerprint
+
+
+def test_key_changes_with_scenario_data(lca_project):
+    df = pd.DataFrame(
+        {"from key": [("lca_test", "coal")], "to key": [("lca_test", "steel")]}
+    )
+    df["scenario"] = 0.8
+    key = LCAResultCache.calculation_key("lca_test", df)
+    assert LCAResultCache.calculation_key("lca_test", df.copy()) == key
+    df.loc[0, "scenario"] = 0.9
+
+    assert LCAResultCache.calculation_key("lca_test", df) != key
+    assert LCAResultCache.calculation_key("lca_test") != key
+
+
+def test_sankey_arrays_round_trip(lca_project):
+    """A traversal converted to arrays and back holds the nodes and edges of
+    the traversal, identified by their activity keys.
+    """
+    demand = {("lca_test", "steel market"): 2}
+    method = ("lca_test", "climate change")
+    data = bc.GraphTraversal().calculate(demand, method, cutoff=0.001, max_calc=50)
+    lca = data.pop("lca")
+    data["metadata"] = {
+        "demand": list(lca.demand.items())[0],
+        "score": lca.score,
+        "unit": bd.methods[method]["unit"],
+        "act_dict": lca.activity_dict.items(),
+    }
+    restored = SankeyCache.from_arrays(SankeyCache.to_arrays(data))
+
+    def by_key(traversal: dict) -> tuple:
+        keys = {i: key for key, i in traversal["metadata"]["act_dict"]}
+        keys[-1] = None
+        nodes = {keys[i]: node for i, node in traversal["nodes"].items()}
+        edges = {(keys[e["from"]], keys[e["to"]]): e for e in traversal["edges"]}
+        return nodes, edges
+
+    nodes, edges = by_key(data)
+    restored_nodes, restored_edges = by_key(restored)
+    assert len(nodes) > 2 and len(edges) > 2
+    assert restored_nodes == nodes
+    assert restored_edges.keys() == edges.keys()
+    for key, edge in edges.items():
+        for field in ("amount", "exc_amount", "impact"):
+            assert restored_edges[key][field] == edge[field]
+    assert restored["counter"] == data["counter"]
+    assert restored["metadata"]["demand"] == (("lca_test", "steel market"), 2.0)
+    assert restored["metadata"]["score"] == lca.score
+    assert restored["metadata"]["unit"] == "kg CO2-eq"
+
+
+def test_sankey_cache(lca_project):
+    data = {
+        "nodes": {-1: {"amount": 1.0, "cum": 2.0, "ind": 0.0}},
+        "edges": [],
+        "counter": 1,
+        "metadata": {
+            "demand": (("lca_test", "coal"), 1.0),
+            "score": 2.0,
+            "unit": "kg",
+            "act_dict": [],
+        },
+    }
+    key = SankeyCache.traversal_key("calculation", ("lca_test", "coal"), 0.05)
+    SankeyCache().put(key, data)
+
+    assert SankeyCache().get(key) == SankeyCache.from_arrays(
+        SankeyCache.to_arrays(data)
+    )
+    memory = SankeyCache(persist=False)
+    assert memory.get(key) is None
+    memory.put("other", data)
+    assert memory.get("other") is not None
+    assert not os.path.isfile(os.path.join(memory.directory, "other.npz"))
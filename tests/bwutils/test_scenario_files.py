@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+import bw2data as bd
+import numpy as np
+import pandas as pd
+import pytest
+
+from activity_browser.bwutils.errors import ScenarioDatabaseNotFoundError
+from activity_browser.bwutils.metadata import AB_metadata
+from activity_browser.bwutils.superstructure import dataframe
+from activity_browser.bwutils.superstructure.dataframe import (
+    relink_lookups,
+    scenario_replace_databases,
+)
+from activity_browser.bwutils.superstructure.file_cache import ScenarioFileCache
+
+
+def exchange_row(source: tuple, source_fields: tuple, target: tuple, kind: str) -> dict:
+    """A row of a scenario file, with the fields of the output activity
+    taken from the test project.
+    """
+    name, product, location, categories = source_fields
+    return {
+        "from activity name": name,
+        "from reference product": product,
+        "from location": location,
+        "from categories": categories,
+        "from database": source[0],
+        "from key": source,
+        "to activity name": "steel production",
+        "to reference product": "steel",
+        "to location": "NL",
+        "to categories": np.nan,
+        "to database": target[0],
+        "to key": target,
+        "flow type": kind,
+        "scenario": 1.0,
+    }
+
+
+def test_relink_lookups(lca_project):
+    AB_metadata.add_metadata(["lca_test", "biosphere3"])
+    technosphere, biosphere = relink_lookups(AB_metadata.dataframe, {"lca_test"})
+
+    assert technosphere[("lca_test", "coal mining", "coal", "PL")] == (
+        "lca_test",
+        "coal",
+    )
+    assert len(technosphere) == 4
+    assert all(key[0] == "lca_test" for key in technosphere)
+
+    _, biosphere = relink_lookups(AB_metadata.dataframe, {"biosphere3"})
+    assert biosphere[("biosphere3", "lead", ("water", "surface water"))] == (
+        "biosphere3",
+        "pb",
+    )
+
+
+def test_replace_databases(lca_project):
+    """Exchanges of the replaced databases are linked to the activities with
+    the same fields in the replacement databases.
+    """
+    df = pd.DataFrame(
+        [
+            exchange_row(
+                ("old", "c1"),
+                ("coal mining", "coal", "PL", np.nan),
+                ("old", "s1"),
+                "technosphere",
+            ),
+            exchange_row(
+                ("old_bio", "b1"),
+                ("lead", np.nan, np.nan, "('water', 'surface water')"),
+                ("old", "s1"),
+                "biosphere",
+            ),
+        ]
+    )
+    relinked = scenario_replace_databases(
+        df.copy(), {"old": "lca_test", "old_bio": "biosphere3"}
+    )
+
+    assert relinked["from key"].tolist() == [("lca_test", "coal"), ("biosphere3", "pb")]
+    assert relinked["to key"].tolist() == [("lca_test", "steel")] * 2
+    assert relinked["from database"].tolist() == ["lca_test", "biosphere3"]
+
+
+def test_replace_databases_reports_missing(lca_project, monkeypatch):
+    """Exchanges that cannot be relinked are reported, and stop the import."""
+    popup = mock.MagicMock()
+    monkeypatch.setattr(dataframe.ABPopup, "abCritical", popup)
+    df = pd.DataFrame(
+        [
+            exchange_row(
+                ("old", "c1"),
+                ("lignite mining", "lignite", "DE", np.nan),
+                ("old", "s1"),
+                "technosphere",
+            ),
+        ]
+    )
+
+    with pytest.raises(ScenarioDatabaseNotFoundError):
+        scenario_replace_databases(df, {"old": "lca_test"})
+    assert popup.call_args[0][0] == "Activity not found"
+
+
+def scenario_file(tmp_path, content: str = "a,b\n1,2\n") -> str:
+    path = tmp_path / "scenarios.csv"
+    path.write_text(content)
+    return str(path)
+
+
+def test_file_key(tmp_path):
+    """The key changes with the contents of the file and the read options."""
+    path = scenario_file(tmp_path)
+    key = ScenarioFileCache.file_key(path, sheet=0, separator=",")
+
+    assert ScenarioFileCache.file_key(path, separator=",", sheet=0) == key
+    assert ScenarioFileCache.file_key(path, sheet=0, separator=";") != key
+    assert ScenarioFileCache.file_key(scenario_file(tmp_path, "a,b\n1,3\n")) != (
+        ScenarioFileCache.file_key(scenario_file(tmp_path))
+    )
+
+
+def test_file_cache_round_trip(lca_project):
+    """A cached scenario file is returned until one of its databases is
+    modified.
+    """
+    df = pd.DataFrame(
+        [
+            exchange_row(
+                ("lca_test", "coal"),
+                ("coal mining", "coal", "PL", np.nan),
+                ("lca_test", "steel"),
+                "technosphere",
+            ),
+            exchange_row(
+                ("biosphere3", "pb"),
+                ("lead", np.nan, np.nan, ("water", "surface water")),
+                ("lca_test", "steel"),
+                "biosphere",
+            ),
+        ]
+    )
+    cache = ScenarioFileCache()
+    assert cache.load("scenarios") is None
+    cache.save("scenarios", df)
+
+    pd.testing.assert_frame_equal(cache.load("scenarios"), df)
+
+    bd.Database("biosphere3").new_activity("zn", name="zinc").save()
+    assert cache.load("scenarios") is None
+
+
+def test_file_cache_prune(lca_project):
+    df = pd.DataFrame([{"from database": "lca_test", "to database": "lca_test"}])
+    cache = ScenarioFileCache(max_entries=2)
+    for key in ("first", "second", "third"):
+        cache.save(key, df)
+
+    assert cache.load("first") is None
+    assert cache.load("third") is not None
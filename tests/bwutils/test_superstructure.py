@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+import bw2calc as bc
+import bw2data as bd
+import numpy as np
+import pandas as pd
+import pytest
+
+from activity_browser.bwutils.errors import ScenarioExchangeNotFoundError
+from activity_browser.bwutils.superstructure import mlca as superstructure_mlca
+from activity_browser.bwutils.superstructure.dataframe import (
+    filter_databases_indexed_superstructure,
+)
+from activity_browser.bwutils.superstructure.mlca import SuperstructureMLCA
+from activity_browser.bwutils.superstructure.utils import guess_flow_types
+
+
+def scenario_matrices(lca: bc.LCA, df, scenario: str) -> tuple:
+    """Return the technosphere and biosphere matrices of the LCA with the
+    (non-absent) values of the scenario filled in.
+    """
+    technosphere = lca.technosphere_matrix.tolil()
+    biosphere = lca.biosphere_matrix.tolil()
+    for (source, target, kind), value in df[scenario].items():
+        if np.isnan(value):
+            continue
+        col = lca.activity_dict[target]
+        if kind == "biosphere":
+            biosphere[lca.biosphere_dict[source], col] = value
+        else:
+            sign = -1 if kind == "technosphere" else 1
+            technosphere[lca.product_dict[source], col] = sign * value
+    return technosphere.tocsr(), biosphere.tocsr()
+
+
+def test_scenarios_match_modified_matrices(scenario_data):
+    """The results of every scenario equal an LCA of which the matrices hold
+    the scenario values.
+    """
+    cs = bd.calculation_setups["lca_test"]
+    mlca = SuperstructureMLCA("lca_test", scenario_data)
+    mlca.calculate()
+
+    lca = bc.LCA(demand=cs["inv"][0], method=cs["ia"][0])
+    lca.lci()
+    defaults = lca.technosphere_matrix, lca.biosphere_matrix
+    for s, scenario in enumerate(scenario_data.columns):
+        lca.technosphere_matrix, lca.biosphere_matrix = defaults
+        (
+            lca.technosphere_matrix,
+            lca.biosphere_matrix,
+        ) = scenario_matrices(lca, scenario_data, scenario)
+        for row, func_unit in enumerate(cs["inv"]):
+            lca.build_demand_array(func_unit)
+            lca.lci_calculation()
+            for col, method in enumerate(cs["ia"]):
+                lca.switch_method(method)
+                lca.lcia_calculation()
+                assert np.isclose(mlca.lca_scores[row, col, s], lca.score)
+    assert not np.allclose(mlca.lca_scores[..., 0], mlca.lca_scores[..., 2])
+
+
+def test_set_scenario_directly(scenario_data):
+    """Setting a scenario gives the same matrices no matter which scenario
+    was set before.
+    """
+    mlca = SuperstructureMLCA("lca_test", scenario_data)
+    matrices = []
+    for index in (1, 2, 0):
+        mlca.set_scenario(index)
+        matrices.append(mlca.lca.technosphere_matrix.toarray())
+    mlca.set_scenario(2)
+    mlca.set_scenario(1)
+
+    assert mlca.current == 1
+    assert np.allclose(mlca.lca.technosphere_matrix.toarray(), matrices[0])
+    assert not np.allclose(matrices[0], matrices[1])
+    assert not np.allclose(matrices[0], matrices[2])
+
+
+def test_cached_results(scenario_data):
+    """Scenario results loaded from the cache only prepare the scenarios
+    once they are needed.
+    """
+    mlca = SuperstructureMLCA("lca_test", scenario_data)
+    mlca.calculate()
+    cached = SuperstructureMLCA("lca_test", scenario_data, mlca.results_to_arrays())
+
+    assert "scenario_samples" not in vars(cached)
+    assert np.allclose(cached.lca_scores, mlca.lca_scores)
+    key = mlca._lci_key(mlca.func_units[0], 2)
+    assert np.allclose(
+        cached.inventories[key].toarray(), mlca.inventories[key].toarray()
+    )
+    cached.set_scenario(2)
+    mlca.set_scenario(2)
+    assert np.allclose(
+        cached.lca.technosphere_matrix.toarray(), mlca.lca.technosphere_matrix.toarray()
+    )
+
+
+def test_pool_matches_serial(scenario_data, pool_project):
+    """Calculating the scenarios in worker processes gives the results of
+    calculating them one after the other.
+    """
+    serial = SuperstructureMLCA("lca_test", scenario_data)
+    serial.calculate()
+    pool = SuperstructureMLCA("lca_test", scenario_data)
+    pool.calculate(workers=2)
+
+    assert np.allclose(pool.lca_scores, serial.lca_scores)
+    assert np.allclose(
+        pool.elementary_flow_contributions, serial.elementary_flow_contributions
+    )
+    assert np.allclose(pool.process_contributions, serial.process_contributions)
+    assert pool.scaling_factors.keys() == serial.scaling_factors.keys()
+    for key, supply in serial.scaling_factors.items():
+        assert np.allclose(pool.scaling_factors[key], supply)
+        assert np.allclose(pool.inventory[key], serial.inventory[key])
+        assert np.allclose(
+            pool.inventories[key].toarray(), serial.inventories[key].toarray()
+        )
+
+
+def test_indices_to_matrix(scenario_data):
+    """The exchanges are mapped to the rows, columns and types of the
+    matrices, as a lookup per exchange would.
+    """
+    mlca = SuperstructureMLCA("lca_test", scenario_data)
+    lca = mlca.lca
+    expected = [
+        (
+            (lca.biosphere_dict if kind == "biosphere" else lca.product_dict)[source],
+            lca.activity_dict[target],
+            bd.utils.TYPE_DICTIONARY[kind],
+        )
+        for source, target, kind in scenario_data.index
+    ]
+
+    assert mlca.matrix_indices.tolist() == expected
+
+
+def test_matrix_indices_are_cached(scenario_data, monkeypatch):
+    """The matrix indices of the same scenario exchanges are only looked up
+    again after one of the databases was modified.
+    """
+    first = SuperstructureMLCA("lca_test", scenario_data)
+    lookups = []
+    indices_to_matrix = SuperstructureMLCA.indices_to_matrix
+    monkeypatch.setattr(
+        SuperstructureMLCA,
+        "indices_to_matrix",
+        lambda self: lookups.append(self) or indices_to_matrix(self),
+    )
+    cached = SuperstructureMLCA("lca_test", scenario_data)
+
+    assert not lookups
+    assert cached.matrix_indices.tolist() == first.matrix_indices.tolist()
+
+    bd.Database("biosphere3").new_activity("zn", name="zinc").save()
+    SuperstructureMLCA("lca_test", scenario_data)
+    assert len(lookups) == 1
+
+
+def test_indices_to_matrix_unknown_key(scenario_data, monkeypatch):
+    """Exchanges of which a key is not in the matrices are reported."""
+    popups = []
+    monkeypatch.setattr(
+        superstructure_mlca.ABPopup,
+        "abCritical",
+        lambda *args: popups.append(args) or mock.MagicMock(),
+    )
+    missing = pd.DataFrame(
+        [[0.5, 0.5, 0.5]],
+        index=pd.MultiIndex.from_tuples(
+            [(("lca_test", "missing"), ("lca_test", "steel"), "technosphere")]
+        ),
+        columns=scenario_data.columns,
+    )
+
+    with pytest.raises(ScenarioExchangeNotFoundError):
+        SuperstructureMLCA("lca_test", pd.concat([scenario_data, missing]))
+    assert popups[0][0] == "Scenario Key Error"
+
+
+def test_filter_databases(scenario_data):
+    """Only exchanges with an output in the included databases are kept."""
+    other = scenario_data.iloc[:2].copy()
+    other.index = pd.MultiIndex.from_tuples(
+        [(source, ("other", target[1]), kind) for source, target, kind in other.index]
+    )
+    df = pd.concat([scenario_data, other])
+    filtered = filter_databases_indexed_superstructure(df, {"lca_test"})
+
+    pd.testing.assert_frame_equal(filtered, scenario_data)
+
+
+def test_guess_flow_types():
+    keys = pd.DataFrame(
+        {
+            "from key": [
+                ("biosphere3", "co2"),
+                ("lca_test", "steel"),
+                ("lca_test", "coal"),
+            ],
+            "to key": [("lca_test", "steel")] * 3,
+        }
+    )
+
+    assert guess_flow_types(keys).tolist() == [
+        "biosphere",
+        "production",
+        "technosphere",
+    ]
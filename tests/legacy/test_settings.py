@@ -60,6 +60,14 @@ def test_ab_unknown_startup(ab_settings):
     assert ab_settings.startup_project == ABSettings.get_default_project_name()
 
 
+def test_ab_persist_sankeys(ab_settings):
+    """Sankeys are stored on disk unless disabled."""
+    assert ab_settings.persist_sankeys is True
+    ab_settings.persist_sankeys = False
+    ab_settings.write_settings()
+    assert ABSettings("test_ab.json").persist_sankeys is False
+
+
 def test_project_default_keys(project_settings):
     defaults = project_settings.get_default_settings()
     assert not {"plugins_list", "read-only-databases"}.symmetric_difference(defaults)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import bw2data as bd
+
+from activity_browser.signals import QActivityList, QDatabaseList, qactivity_list
+
+
+def test_register_and_find():
+    """QDatastores are registered once per identifier and indexed by field."""
+    qlist = QActivityList()
+    first = qlist._get_or_create(1, id=1, database="db_1", code="a")
+    second = qlist._get_or_create(2, id=2, database="db_1", code="b")
+    third = qlist._get_or_create(3, id=3, database="db_2", code="a")
+
+    assert qlist._get_or_create(1, id=1, database="db_1", code="a") is first
+    assert qlist.get(2) is second
+    assert qlist.get(4) is None
+    assert len(qlist) == 3
+    assert set(qlist) == {first, second, third}
+    assert set(qlist.find("database", "db_1")) == {first, second}
+    assert qlist.find("database", "db_3") == []
+
+
+def test_unregister():
+    """Deleted QDatastores can no longer be found."""
+    qlist = QActivityList()
+    first = qlist._get_or_create(1, id=1, database="db_1", code="a")
+    second = qlist._get_or_create(2, id=2, database="db_1", code="b")
+    third = qlist._get_or_create(3, id=3, database="db_2", code="a")
+
+    first.deleteLater()
+    assert qlist.get(1) is None
+    assert first.parent() is None
+    assert qlist.find("database", "db_1") == [second]
+
+    qlist.unregister(third)
+    qlist.unregister(third)
+    assert qlist.find("database", "db_2") == []
+    assert "db_2" not in qlist.indexes["database"]
+    assert len(qlist) == 1
+
+    # a new QDatastore is created for an identifier that was unregistered
+    assert qlist._get_or_create(1, id=1, database="db_1", code="a") is not first
+
+
+def test_emit_later():
+    """Signals are only emitted through the QDatastore of the identifier."""
+    qlist = QDatabaseList()
+    qdatabase = qlist.get_or_create("db_1")
+    emitted = []
+    qdatabase.emitLater = lambda *args: emitted.append(args)
+
+    qlist.emitLater("db_1", "changed", "data")
+    qlist.emitLater("db_2", "changed", "data")
+
+    assert emitted == [("changed", "data")]
+
+
+def test_connect_registers_activity(ab_app):
+    """Connecting to an activity registers its QDatastore, disconnecting the
+    last slot unregisters it.
+    """
+    act = next(iter(bd.Database(next(iter(bd.databases)))))
+    identifier = act._document.id
+
+    def slot(*args):
+        pass
+
+    act.changed.connect(slot)
+    qdatastore = qactivity_list.get(identifier)
+    assert qdatastore is not None
+    assert qdatastore in qactivity_list.find("database", act["database"])
+
+    act.changed.disconnect(slot)
+    assert qactivity_list.get(identifier) is None
+    assert qdatastore not in qactivity_list.find("database", act["database"])
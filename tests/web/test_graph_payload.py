@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from activity_browser.ui.web.base import GraphPayload
+
+
+def graph(nodes: list, edges: list, title: str = "graph") -> str:
+    """The json data of a graph with the given node ids and (source, target,
+    amount) edges.
+    """
+    return json.dumps(
+        {
+            "title": title,
+            "nodes": [{"id": i, "name": f"activity {i}"} for i in nodes],
+            "edges": [
+                {"source_id": s, "target_id": t, "amount": a} for s, t, a in edges
+            ],
+        }
+    )
+
+
+def decode(items) -> list:
+    """Return the items of a list or columnar layout as a list."""
+    if isinstance(items, list):
+        return items
+    fields = list(items)
+    return [dict(zip(fields, values)) for values in zip(*items.values())]
+
+
+def apply(previous: dict, payload: dict) -> dict:
+    """Apply a delta payload to the previous graph, like the web page does."""
+    nodes = {node["id"]: node for node in previous["nodes"]}
+    edges = {(e["source_id"], e["target_id"]): e for e in previous["edges"]}
+    for i in payload["removed_nodes"]:
+        del nodes[i]
+    for source, target in payload["removed_edges"]:
+        del edges[(source, target)]
+    nodes.update((node["id"], node) for node in decode(payload["nodes"]))
+    edges.update(
+        ((e["source_id"], e["target_id"]), e) for e in decode(payload["edges"])
+    )
+    return {"nodes": list(nodes.values()), "edges": list(edges.values())}
+
+
+def canonical(data: dict) -> tuple:
+    return (
+        sorted(json.dumps(n, sort_keys=True) for n in decode(data["nodes"])),
+        sorted(json.dumps(e, sort_keys=True) for e in decode(data["edges"])),
+    )
+
+
+def test_first_graph_is_sent_in_full():
+    payload = GraphPayload()
+    first = graph([1, 2], [(1, 2, 0.5)])
+
+    assert payload.delta(first) is None
+    assert json.loads(payload.full(first)) == json.loads(first)
+
+
+def test_delta_matches_full_payload():
+    """Applying the delta to the previous graph gives the new graph."""
+    payload = GraphPayload()
+    nodes = list(range(20))
+    edges = [(i, i + 1, 1.0) for i in range(19)]
+    previous = json.loads(payload.full(graph(nodes, edges)))
+
+    # expand node 19, remove node 0 and change the amount of an edge
+    new_nodes = nodes[1:] + [20, 21]
+    new_edges = [(i, i + 1, 1.0) for i in range(1, 19)] + [(19, 20, 2), (19, 21, 3)]
+    new_edges[4] = (5, 6, 0.25)
+    current = graph(new_nodes, new_edges, title="expanded")
+    delta = json.loads(payload.delta(current))
+
+    assert delta["title"] == "expanded"
+    assert delta["removed_nodes"] == [0]
+    assert delta["removed_edges"] == [[0, 1]]
+    assert len(delta["nodes"]) == 2
+    assert len(delta["edges"]) == 3
+    assert canonical(apply(previous, delta)) == canonical(json.loads(current))
+    assert canonical(json.loads(GraphPayload().full(current))) == canonical(
+        json.loads(current)
+    )
+
+
+def test_unchanged_graph_has_empty_delta():
+    payload = GraphPayload()
+    data = graph([1, 2, 3], [(1, 2, 1), (2, 3, 1)])
+    payload.full(data)
+    delta = json.loads(payload.delta(data))
+
+    assert delta["nodes"] == delta["edges"] == []
+    assert delta["removed_nodes"] == delta["removed_edges"] == []
+
+
+def test_large_changes_are_sent_in_full():
+    payload = GraphPayload()
+    payload.full(graph([1, 2, 3], [(1, 2, 1), (2, 3, 1)]))
+
+    assert payload.delta(graph([4, 5], [(4, 5, 1)])) is None
+    payload.reset()
+    assert payload.delta(graph([1, 2, 3], [(1, 2, 1)])) is None
+
+
+def test_columnar_layout(monkeypatch):
+    """Many nodes or edges are sent as columns, which decode to the items."""
+    monkeypatch.setattr(GraphPayload, "COLUMNAR_THRESHOLD", 3)
+    payload = GraphPayload()
+    data = graph([1, 2, 3, 4], [(1, 2, 1), (2, 3, 1)])
+    full = json.loads(payload.full(data))
+
+    assert full["nodes"] == {
+        "id": [1, 2, 3, 4],
+        "name": ["activity 1", "activity 2", "activity 3", "activity 4"],
+    }
+    assert isinstance(full["edges"], list)
+    assert canonical(full) == canonical(json.loads(data))
+
+
+@pytest.mark.parametrize("json_data", [None, ""])
+def test_empty_graph(json_data):
+    payload = GraphPayload()
+    payload.full(graph([1], []))
+
+    assert payload.full(json_data) == json_data
+    assert payload.nodes is None